@@ -1,4 +1,6 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from apps.core.models import TimeStampedModel
@@ -6,10 +8,18 @@ from apps.posts.models import Post
 
 
 class PostComment(TimeStampedModel):
+    # (field, weight) pairs that make up searchVector.
+    SEARCH_FIELDS = [('_comment', 'A')]
+
     post = models.ForeignKey(Post, related_name='postComments', on_delete=models.CASCADE)
     parent = models.ForeignKey('self', null=True, on_delete=models.CASCADE, related_name='parentComments')
+    depth = models.PositiveSmallIntegerField(default=0)
+    replyCount = models.PositiveIntegerField(default=0)
     likes = models.ManyToManyField(User, related_name='postCommentLikes', blank=True)
     dislikes = models.ManyToManyField(User, related_name='postCommentDislikes', blank=True)
+    likeCount = models.PositiveIntegerField(default=0)
+    dislikeCount = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='creatorPostComments')
     _comment = models.TextField()
     isRemoved = models.BooleanField(
@@ -21,6 +31,20 @@ class PostComment(TimeStampedModel):
     )
     isNestingPermitted = models.BooleanField(default=False)
     mentionedUsers = models.ManyToManyField(User, blank=True, related_name='postCommentMentionedUsers')
+    searchVector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'], name='comment_post_new_idx'),
+            models.Index(fields=['post', '-score', '-id'], name='comment_post_top_idx'),
+            models.Index(fields=['post', 'depth'], name='comment_post_depth_idx'),
+            GinIndex(fields=['searchVector'], name='comment_search_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            self.depth = self.parent.depth + 1 if self.parent_id else 0
+        super(PostComment, self).save(*args, **kwargs)
 
     @property
     def comment(self):
@@ -0,0 +1,42 @@
+from rest_framework import serializers
+
+from apps.comments.models import PostComment
+from apps.core.votestate import attachViewerStates
+from apps.profiles.serializers import UserSummarySerializerVersion1
+
+
+class PostCommentSerializerVersion1(serializers.ModelSerializer):
+    comment = serializers.CharField(read_only=True)
+    creator = UserSummarySerializerVersion1(read_only=True)
+    # Filled by attachViewerStates for an authenticated request, None otherwise.
+    viewerVote = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PostComment
+        fields = [
+            'id',
+            'post',
+            'parent',
+            'depth',
+            'replyCount',
+            'creator',
+            'comment',
+            'isRemoved',
+            'likeCount',
+            'dislikeCount',
+            'score',
+            'viewerVote',
+            'created',
+            'edited',
+        ]
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return queryset.select_related('creator__profile')
+
+    @classmethod
+    def attachViewerStates(cls, instances, request=None):
+        return attachViewerStates(PostComment, instances, request)
+
+    def get_viewerVote(self, instance):
+        return getattr(instance, 'viewerVote', None)
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.comments.models import PostComment
+from apps.comments.utils import processCommentMentions, publishNewComment
+from apps.core.search import refreshSearchVector, searchFieldsChanged
+from apps.core.tasks import enqueue
+from apps.posts.utils import refreshPostRanking
+
+
+@receiver(post_save, sender=PostComment)
+def countNewComment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        refreshPostRanking(instance.post_id, commentCount=F('commentCount') + 1)
+        if instance.parent_id:
+            PostComment.objects.filter(pk=instance.parent_id).update(replyCount=F('replyCount') + 1)
+
+
+@receiver(post_save, sender=PostComment)
+def indexComment(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and searchFieldsChanged(PostComment, update_fields):
+        refreshSearchVector(PostComment, instance.pk)
+
+
+@receiver(post_save, sender=PostComment)
+def queueMentions(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Resolving mentions and notifying followers happens after commit, off the request path.
+    if not raw and (update_fields is None or '_comment' in update_fields):
+        enqueue(processCommentMentions, instance.pk, created)
+
+
+@receiver(post_save, sender=PostComment)
+def queueLiveComment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.LIVE_UPDATES_ENABLED:
+        enqueue(publishNewComment, instance.pk)
+
+
+@receiver(post_delete, sender=PostComment)
+def countDeletedComment(sender, instance, **kwargs):
+    refreshPostRanking(instance.post_id, commentCount=Greatest(F('commentCount') - 1, 0))
+    if instance.parent_id:
+        PostComment.objects.filter(pk=instance.parent_id).update(replyCount=Greatest(F('replyCount') - 1, 0))
@@ -1,3 +1,82 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from apps.comments.models import PostComment
+from apps.communities.models import Community
+from apps.core.testing import QueryBudgetMixin
+from apps.posts.models import Post
+from apps.profiles.models import Profile
+
+
+@override_settings(TASK_BACKEND='SYNC')
+class CommentQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create_user(f'commenter{index}') for index in range(5)]
+        for user in users:
+            Profile.objects.create(user=user, favouriteCommunities=[], mutedCommunities=[])
+        community = Community.objects.create(name='budget')
+        cls.user = users[0]
+        cls.post = Post.objects.create(community=community, creator=cls.user, title='Budget', content='Budget')
+        # Every commenter replies on several levels, so a query per comment, author or level would exceed the budget.
+        for user in users:
+            parent = None
+            for _ in range(4):
+                parent = PostComment.objects.create(post=cls.post, creator=user, parent=parent, _comment='Budget')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def testCommentListIsWithinQueryBudget(self):
+        for sort in ('NEW', 'TOP'):
+            response = self.assertWithinQueryBudget(
+                f'{reverse("comments:post-comments-v1", args=[self.post.pk])}?sort={sort}', secure=True
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 20)
+
+    def testThreadIsWithinQueryBudget(self):
+        for sort in ('TOP', 'NEW', 'OLD'):
+            response = self.assertWithinQueryBudget(
+                f'{reverse("comments:post-thread-v1", args=[self.post.pk])}?sort={sort}&depth=10', secure=True
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), 5)
+
+    def testThreadContinuationIsWithinQueryBudget(self):
+        url = reverse('comments:post-thread-v1', args=[self.post.pk])
+        more = self.client.get(f'{url}?depth=2', secure=True).json()[0]['replies'][0]['replies'][0]['more']
+        response = self.assertWithinQueryBudget(f'{url}?more={more}', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+
+@override_settings(TASK_BACKEND='SYNC')
+class DraftPostCommentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('drafter')
+        cls.other = User.objects.create_user('reader')
+        for user in (cls.creator, cls.other):
+            Profile.objects.create(user=user, favouriteCommunities=[], mutedCommunities=[])
+        community = Community.objects.create(name='drafts')
+        cls.post = Post.objects.create(
+            community=community, creator=cls.creator, title='Draft', content='Draft', status=Post.Status.DRAFT
+        )
+        PostComment.objects.create(post=cls.post, creator=cls.creator, _comment='Draft')
+
+    def assertVisibleOnlyToCreator(self, url):
+        self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+        self.client.force_login(self.creator)
+        self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+
+    def testCommentsOfDraftsAreHidden(self):
+        self.assertVisibleOnlyToCreator(reverse('comments:post-comments-v1', args=[self.post.pk]))
+
+    def testThreadsOfDraftsAreHidden(self):
+        self.assertVisibleOnlyToCreator(reverse('comments:post-thread-v1', args=[self.post.pk]))
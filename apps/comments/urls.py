@@ -1,7 +1,11 @@
+from django.urls import path
+
 from apps.comments.views import *
 
 app_name = 'comments'
 
 urlpatterns = [
-
+    path('v1/post/<int:postId>/comments/', PostCommentsApiEventVersion1.as_view(), name='post-comments-v1'),
+    path('v1/post/<int:postId>/thread/', PostCommentThreadApiEventVersion1.as_view(), name='post-thread-v1'),
+    path('v1/comment/<int:commentId>/vote/', PostCommentVoteApiEventVersion1.as_view(), name='comment-vote-v1'),
 ]
@@ -1,4 +1,22 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When, Window
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import NotFound
+
 from apps.comments.models import PostComment
+from apps.comments.serializers import PostCommentSerializerVersion1
+from apps.core.live import postChannel, publishLiveEvent
+from apps.core.pagination import decodeCursor, encodeCursor, keysetFilter, parseOrdering, parsePosition
+from apps.posts.models import Post
+from apps.profiles.models import Notification
+from apps.profiles.utils import notifyUsers
+
+# u/name, not preceded by a word character or a slash so URLs such as example.com/u/name do not count.
+MENTION_PATTERN = re.compile(r'(?<![\w/])u/([\w.@+-]{1,150})')
 
 
 def addMentionedUserToPostComment(postComment: PostComment, userId: int):
@@ -15,3 +33,185 @@ def removeMentionedUserFromPostComment(postComment: PostComment, userId: int):
     except ValueError:
         return postComment
     return postComment
+
+
+def parseMentions(text: str):
+    # Distinct usernames in order of first mention, capped so one comment cannot fan out to everyone.
+    usernames = dict.fromkeys(match.rstrip('.') for match in MENTION_PATTERN.findall(text or ''))
+    return list(usernames)[:settings.MAX_MENTIONS_PER_COMMENT]
+
+
+def syncMentionedUsers(postComment: PostComment):
+    """
+    Makes mentionedUsers match the u/name mentions in the comment body: one query resolves every username, then the
+    difference with the current rows is applied as one bulk insert and one delete. Returns the ids of newly mentioned
+    users.
+    """
+    usernames = parseMentions(postComment._comment)
+    mentionedIds = set(
+        User.objects.filter(username__in=usernames).exclude(pk=postComment.creator_id).values_list('pk', flat=True)
+    ) if usernames else set()
+
+    through = PostComment.mentionedUsers.through
+    currentIds = set(through.objects.filter(postcomment_id=postComment.pk).values_list('user_id', flat=True))
+    addedIds = mentionedIds - currentIds
+    removedIds = currentIds - mentionedIds
+    with transaction.atomic():
+        if addedIds:
+            through.objects.bulk_create(
+                [through(postcomment_id=postComment.pk, user_id=userId) for userId in addedIds], ignore_conflicts=True
+            )
+        if removedIds:
+            through.objects.filter(postcomment_id=postComment.pk, user_id__in=removedIds).delete()
+    return addedIds
+
+
+def processCommentMentions(postCommentId: int, created: bool):
+    """
+    Background half of saving a comment: syncs its mentions and notifies newly mentioned users and, for a new comment,
+    the post's followers.
+    """
+    postComment = PostComment.objects.filter(pk=postCommentId).only('pk', 'post_id', 'creator_id', '_comment').first()
+    if postComment is None:
+        return
+    mentionedIds = syncMentionedUsers(postComment)
+    # Mentions go first, so someone both mentioned and following the post gets the MENTION notification.
+    notifyUsers(postComment, Notification.Kind.MENTION, mentionedIds)
+    if created:
+        followerIds = Post.followers.through.objects.filter(post_id=postComment.post_id).exclude(
+            user_id=postComment.creator_id
+        ).values_list('user_id', flat=True)
+        notifyUsers(postComment, Notification.Kind.POST_REPLY, followerIds.iterator())
+
+
+def publishNewComment(postCommentId: int):
+    # Live subscribers of the post get the comment as the comments API would serialize it.
+    postComment = PostCommentSerializerVersion1.prefetchPlan(PostComment.objects).filter(pk=postCommentId).first()
+    if postComment is not None:
+        publishLiveEvent(postChannel(postComment.post_id), {
+            'type': 'comment', **PostCommentSerializerVersion1(postComment).data,
+        })
+
+
+class ThreadSort(models.TextChoices):
+    TOP = 'TOP'
+    NEW = 'NEW'
+    OLD = 'OLD'
+
+
+# Sibling order of each sort, matching the (post, -score, -id) and (post, -created, -id) indexes.
+THREAD_ORDERINGS = {
+    ThreadSort.TOP: ('-score', '-id'),
+    ThreadSort.NEW: ('-created', '-id'),
+    ThreadSort.OLD: ('created', 'id'),
+}
+
+THREAD_FIELDS = [
+    'post_id', 'parent_id', 'depth', 'replyCount', 'creator_id', '_comment', 'isRemoved', 'likeCount',
+    'dislikeCount', 'score', 'created', 'edited',
+]
+
+
+def _moreReplies(parentId, start: int, count: int, after=None):
+    # `after` is the sort position of the last sibling shown, so the continuation is a keyset rather than an OFFSET.
+    return {'more': encodeCursor([parentId, start, after]), 'count': count}
+
+
+def _parseContinuation(continuation: str, fields):
+    position = decodeCursor(continuation)[0]
+    if len(position) != 3:
+        raise NotFound('Invalid cursor')
+    parentId, start, after = position
+    if not (
+        (parentId is None or type(parentId) is int) and type(start) is int and start >= 0
+        and (after is None or isinstance(after, list))
+    ):
+        raise NotFound('Invalid cursor')
+    return parentId, start, parsePosition(PostComment, [field for field, _ in fields], after) if after else None
+
+
+def _replyCaps(roots, children, limit: int):
+    """
+    Walks the tree fetched so far in display order, counting each comment of the deepest level as followed by all of
+    its replies, and returns how many replies of each such comment can still fall within the first `limit` comments.
+    """
+    caps = {}
+    position = 0
+
+    def walk(comments):
+        nonlocal position
+        for comment in comments:
+            position += 1
+            if position >= limit:
+                return
+            if comment.pk in children:
+                walk(children[comment.pk])
+            elif comment.replyCount:
+                caps[comment.pk] = min(comment.replyCount, limit - position)
+                position += comment.replyCount
+            if position >= limit:
+                return
+
+    walk(roots)
+    return caps
+
+
+def getThread(
+    post, sort: ThreadSort = ThreadSort.TOP, maxDepth: int = 8, limit: int = 200, continuation: str = None,
+    queryset=None,
+):
+    """
+    Returns up to `limit` comments of the post as a tree at most `maxDepth` levels deep. The tree is fetched one
+    level per query, each level ranking siblings with ROW_NUMBER and keeping only the replies that can still be among
+    the first `limit` comments, so no query returns more than `limit` rows however large the thread is. Each node is
+    {'comment': PostComment, 'replies': [...]}; pruned siblings and subtrees are replaced by {'more': token,
+    'count': n}, and passing the token back as `continuation` (with the same sort) resumes the thread after the last
+    sibling shown. `queryset` may add select_related or annotations to the comments.
+    """
+    ordering = THREAD_ORDERINGS[sort]
+    fields = parseOrdering(ordering)
+    parentId, start, after = _parseContinuation(continuation, fields) if continuation else (None, 0, None)
+    queryset = PostComment.objects.all() if queryset is None else queryset
+    comments = queryset.filter(post=post).only(*THREAD_FIELDS)
+    siblings = comments.filter(parent_id=parentId) if parentId is not None else comments.filter(parent__isnull=True)
+    if after is not None:
+        siblings = siblings.filter(keysetFilter(fields, after))
+    roots = list(siblings.order_by(*ordering)[:limit])
+
+    children = {}
+    for _ in range(maxDepth - 1):
+        caps = _replyCaps(roots, children, limit)
+        if not caps:
+            break
+        replies = comments.filter(parent_id__in=caps).annotate(
+            siblingRank=Window(RowNumber(), partition_by=F('parent_id'), order_by=ordering)
+        ).filter(siblingRank__lte=Case(*[When(parent_id=pk, then=Value(cap)) for pk, cap in caps.items()]))
+        for pk in caps:
+            children[pk] = []
+        for comment in replies.order_by(*ordering):
+            children[comment.parent_id].append(comment)
+
+    remaining = limit
+
+    def build(parentId, siblings, start: int, after, total: int, levels: int):
+        nonlocal remaining
+        nodes = []
+        index = start
+        for comment in siblings:
+            if remaining <= 0:
+                break
+            remaining -= 1
+            index += 1
+            after = [getattr(comment, field) for field, _ in fields]
+            if levels > 1:
+                replies = build(comment.pk, children.get(comment.pk, []), 0, None, comment.replyCount, levels - 1)
+            else:
+                replies = [_moreReplies(comment.pk, 0, comment.replyCount)] if comment.replyCount else []
+            nodes.append({'comment': comment, 'replies': replies})
+        if index < total:
+            nodes.append(_moreReplies(parentId, index, total - index, after))
+        return nodes
+
+    # A short first level is the whole of it; otherwise what is left of it takes one COUNT.
+    total = start + (len(roots) if len(roots) < limit else siblings.count())
+    return build(parentId, roots, start, after, total, maxDepth)
@@ -0,0 +1,107 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.comments.models import PostComment
+from apps.comments.serializers import PostCommentSerializerVersion1
+from apps.comments.utils import ThreadSort, getThread
+from apps.communities.permissions import getPermissionResolver
+from apps.core.events import recordVote
+from apps.core.mixins import PrefetchPlanMixin
+from apps.core.ratelimit import ActionRateThrottle, RateLimitAction, checkRateLimit
+from apps.core.serializers import VoteSerializerVersion1
+from apps.core.utils import VoteType
+from apps.posts.models import Post
+
+COMMENT_ORDERINGS = {
+    'NEW': ('-created', '-id'),
+    'TOP': ('-score', '-id'),
+}
+
+
+def getViewablePost(request, postId):
+    post = get_object_or_404(Post.objects.select_related('community'), pk=postId)
+    # Drafts only exist for their creator.
+    if post.status == Post.Status.DRAFT and post.creator_id != request.user.pk:
+        raise NotFound()
+    if not getPermissionResolver(request).canView(post.community):
+        raise PermissionDenied()
+    return post
+
+
+class PostCommentsApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    queryBudget = 7
+    serializer_class = PostCommentSerializerVersion1
+
+    def get_queryset(self):
+        sort = self.request.query_params.get('sort', 'NEW').upper()
+        if sort not in COMMENT_ORDERINGS:
+            raise ValidationError({'sort': f'Expected one of {", ".join(COMMENT_ORDERINGS)}.'})
+
+        post = getViewablePost(self.request, self.kwargs['postId'])
+        return PostComment.objects.filter(post=post).order_by(*COMMENT_ORDERINGS[sort])
+
+
+class PostCommentThreadApiEventVersion1(APIView):
+    maxDepth = 10
+    maxLimit = 500
+    # getThread runs one query per level below the first.
+    queryBudget = 7 + maxDepth
+
+    def get(self, request, postId):
+        sort = request.query_params.get('sort', ThreadSort.TOP).upper()
+        if sort not in ThreadSort.values:
+            raise ValidationError({'sort': f'Expected one of {", ".join(ThreadSort.values)}.'})
+        try:
+            depth = min(max(int(request.query_params.get('depth', 8)), 1), self.maxDepth)
+            limit = min(max(int(request.query_params.get('limit', 200)), 1), self.maxLimit)
+        except ValueError:
+            raise ValidationError('depth and limit must be integers.')
+
+        post = getViewablePost(request, postId)
+        comments = PostCommentSerializerVersion1.prefetchPlan(PostComment.objects.all(), request)
+        thread = getThread(post, ThreadSort(sort), depth, limit, request.query_params.get('more'), comments)
+        PostCommentSerializerVersion1.attachViewerStates(self.collectComments(thread), request)
+        return Response(self.serializeThread(thread))
+
+    def collectComments(self, nodes):
+        for node in nodes:
+            if 'comment' in node:
+                yield node['comment']
+                yield from self.collectComments(node['replies'])
+
+    def serializeThread(self, nodes):
+        serialized = []
+        for node in nodes:
+            if 'more' in node:
+                serialized.append(node)
+                continue
+            data = PostCommentSerializerVersion1(node['comment']).data
+            data['replies'] = self.serializeThread(node['replies'])
+            serialized.append(data)
+        return serialized
+
+
+class PostCommentVoteApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ActionRateThrottle]
+    rateLimitAction = RateLimitAction.VOTE
+    queryBudget = 4
+
+    def post(self, request, commentId):
+        serializer = VoteSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        vote = VoteType(serializer.validated_data['vote'])
+        comment = get_object_or_404(PostComment.objects.select_related('post__community'), pk=commentId)
+        if not getPermissionResolver(request).canView(comment.post.community):
+            raise PermissionDenied()
+        if comment.post.status == Post.Status.DRAFT:
+            raise NotFound()
+        if comment.post.status == Post.Status.ARCHIVED:
+            raise PermissionDenied('Archived posts can no longer be voted on.')
+        checkRateLimit(request, RateLimitAction.VOTE, comment.post.community)
+        recordVote(PostComment, comment.pk, request.user.pk, vote)
+        return Response({'vote': vote}, status=status.HTTP_202_ACCEPTED)
@@ -3,6 +3,7 @@ from django.contrib import admin
 from apps.communities.models import (
     Community,
     CommunityMember,
+    CommunityNeighbours,
     CommunityInvite,
     CommunityMemberRequest,
     CommunityPage,
@@ -12,6 +13,7 @@ from apps.communities.models import (
 
 admin.site.register(Community)
 admin.site.register(CommunityMember)
+admin.site.register(CommunityNeighbours)
 admin.site.register(CommunityInvite)
 admin.site.register(CommunityMemberRequest)
 admin.site.register(CommunityPage)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.communities.recommender import computeRelatedCommunities
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the related communities of every public and restricted community from shared members, '
+        'favourites and commenters.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--top-k', type=int, help='Neighbours kept per community, RELATED_COMMUNITIES_TOP_K by default.')
+
+    def handle(self, *args, **options):
+        sketched, written = computeRelatedCommunities(options['top_k'], options['batch_size'])
+        self.stdout.write(f'Sketched {sketched} communities, updated {written} neighbour list(s)')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.communities.moderation import expireMutes
+
+
+class Command(BaseCommand):
+    help = 'Reinstates community members whose mute has expired. Meant to run from cron every few minutes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Members per transaction, COMMUNITY_MODERATION_BATCH_SIZE by default.')
+
+    def handle(self, *args, **options):
+        expired = expireMutes(options['batch_size'])
+        self.stdout.write(f'Reinstated {expired} muted member(s)')
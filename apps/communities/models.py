@@ -1,8 +1,13 @@
 from colorfield.fields import ColorField
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 
+from apps.core.images import validateImage
 from apps.core.models import TimeStampedModel
 
 
@@ -15,9 +20,10 @@ class Community(TimeStampedModel):
     name = models.CharField(max_length=32, unique=True)
     header = models.CharField(max_length=256, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
-    banner = models.ImageField(upload_to='community-banner/', blank=True, null=True)
-    logo = models.ImageField(upload_to='community-logo/', blank=True, null=True)
-    relatedCommunities = ArrayField(models.CharField(max_length=8192), blank=True)
+    banner = models.ImageField(upload_to='community-banner/', blank=True, null=True, validators=[validateImage])
+    logo = models.ImageField(upload_to='community-logo/', blank=True, null=True, validators=[validateImage])
+    bannerVariants = models.JSONField(default=dict, blank=True, editable=False)
+    logoVariants = models.JSONField(default=dict, blank=True, editable=False)
     communityType = models.CharField(
         choices=Type.choices,
         max_length=16,
@@ -32,6 +38,19 @@ class Community(TimeStampedModel):
         default=False,
         help_text='Posts after a period of X months will be archived automatically'
     )
+    searchVector = SearchVectorField(null=True, editable=False)
+
+    # (field, weight) pairs that make up searchVector.
+    SEARCH_FIELDS = [('name', 'A'), ('header', 'B'), ('description', 'C')]
+    # (image field, variant kind); each image field has a <field>Variants map filled by apps.core.images.
+    IMAGE_FIELDS = [('banner', 'banner'), ('logo', 'logo')]
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['searchVector'], name='community_search_idx'),
+            # Serves the LIKE 'prefix%' lookups of the community name autocomplete.
+            models.Index(OpClass(Lower('name'), name='varchar_pattern_ops'), name='community_name_prefix_idx'),
+        ]
 
     @property
     def admins(self):
@@ -46,6 +65,20 @@ class Community(TimeStampedModel):
         return self.communityMembers.filter(memberType=CommunityMember.MemberTypes.MEMBER)
 
 
+class CommunityNeighbours(models.Model):
+    """
+    The communities most similar to `community`, best first, as computed offline by
+    apps.communities.recommender.computeRelatedCommunities. Keyed by the community so a lookup is one primary key read.
+    """
+    community = models.OneToOneField(Community, on_delete=models.CASCADE, primary_key=True, related_name='neighbours')
+    communityIds = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    scores = ArrayField(models.FloatField(), default=list, blank=True)
+    computed = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{len(self.communityIds)} communities related to {self.community_id}'
+
+
 class CommunityMember(TimeStampedModel):
     class MemberTypes(models.TextChoices):
         ADMIN = 'ADMIN'
@@ -79,6 +112,19 @@ class CommunityMember(TimeStampedModel):
             <b>BANNED</b>: Forbidden for any activity in a group forever.
         '''
     )
+    # When a MUTED member becomes ACTIVE again; apps.communities.moderation.expireMutes lifts expired mutes.
+    mutedUntil = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['community', 'user'], name='community_member_unique'),
+        ]
+        indexes = [
+            # Member lists and counts by status, e.g. the ACTIVE members behind memberCount.
+            models.Index(fields=['community', 'status'], name='community_member_status_idx'),
+            # Only the (few) muted rows, in expiry order, for the sweeper.
+            models.Index(fields=['mutedUntil'], condition=Q(status='MUTED'), name='community_member_muted_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} added to {self.community.name} as {self.memberType}'
@@ -94,6 +140,11 @@ class CommunityInvite(TimeStampedModel):
     invitee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='communityInvitee')
     inviteAs = models.CharField(choices=InviteAs.choices, default=InviteAs.MEMBER, max_length=16)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['community', 'invitee'], name='community_invite_unique'),
+        ]
+
     def __str__(self):
         return f'{self.inviter.username} has invited {self.invitee.username} to join {self.community.name} as {self.inviteAs}'
 
@@ -103,6 +154,14 @@ class CommunityMemberRequest(TimeStampedModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='communityMemberRequestedUser')
     isApproved = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['community', 'user'], name='community_member_request_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['community', 'isApproved'], name='member_request_approved_idx'),
+        ]
+
 
 class CommunityPage(TimeStampedModel):
     community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='communityPages')
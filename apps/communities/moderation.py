@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.communities.models import CommunityInvite, CommunityMember, CommunityMemberRequest
+from apps.communities.permissions import MODERATOR_TYPES, invalidateManyMemberships
+from apps.communities.utils import communityCache
+
+
+def inviteUsers(communityId: int, inviterId: int, usernames, inviteAs: CommunityInvite.InviteAs):
+    """
+    Invites the named users who are neither members nor invited yet, with one INSERT. A concurrent invite of the same
+    user is skipped by community_invite_unique. Returns the ids of the invited users.
+    """
+    members = CommunityMember.objects.filter(community_id=communityId, user=OuterRef('pk'))
+    invites = CommunityInvite.objects.filter(community_id=communityId, invitee=OuterRef('pk'))
+    inviteeIds = list(
+        User.objects.filter(username__in=usernames, is_active=True).exclude(pk=inviterId).exclude(
+            Exists(members)
+        ).exclude(Exists(invites)).values_list('pk', flat=True)
+    )
+    CommunityInvite.objects.bulk_create(
+        [
+            CommunityInvite(community_id=communityId, inviter_id=inviterId, invitee_id=inviteeId, inviteAs=inviteAs)
+            for inviteeId in inviteeIds
+        ],
+        ignore_conflicts=True,
+    )
+    return inviteeIds
+
+
+def decideMemberRequests(communityId: int, approve: bool, requestIds=None, batchSize: int = None):
+    """
+    Approves or rejects the community's pending membership requests: those in requestIds, or all of them. They are
+    decided in keyset batches, each in its own short transaction. Approving a batch adds the missing memberships with
+    one INSERT and marks the requests approved with one UPDATE; rejecting deletes them. A user who is already a
+    member, banned or muted keeps that membership. Returns the number of requests decided.
+    """
+    batchSize = batchSize or settings.COMMUNITY_MODERATION_BATCH_SIZE
+    pending = CommunityMemberRequest.objects.filter(community_id=communityId, isApproved=False)
+    if requestIds is not None:
+        pending = pending.filter(pk__in=requestIds)
+
+    decided, lastPk = 0, 0
+    while True:
+        with transaction.atomic():
+            rows = list(pending.filter(pk__gt=lastPk).order_by('pk').select_for_update(skip_locked=True).values_list(
+                'pk', 'user_id'
+            )[:batchSize])
+            if not rows:
+                break
+            lastPk = rows[-1][0]
+            batch = CommunityMemberRequest.objects.filter(pk__in=[pk for pk, _ in rows])
+            if approve:
+                userIds = [userId for _, userId in rows]
+                CommunityMember.objects.bulk_create(
+                    [CommunityMember(community_id=communityId, user_id=userId) for userId in userIds],
+                    ignore_conflicts=True,
+                )
+                batch.update(isApproved=True)
+                invalidateManyMemberships(userIds)
+            else:
+                batch.delete()
+        decided += len(rows)
+
+    if approve and decided:
+        # The cached payload carries memberCount.
+        communityCache.invalidate(communityId)
+    return decided
+
+
+def setMemberStatus(communityId: int, userIds, status: CommunityMember.Status, mutedUntil=None,
+                    canTargetModerators: bool = False):
+    """
+    Bans, mutes or reinstates the community's members among userIds with one UPDATE. Admins are never affected, and
+    moderators only when canTargetModerators. mutedUntil is kept for MUTED and cleared otherwise. Returns the ids of
+    the users that were changed.
+    """
+    protected = {CommunityMember.MemberTypes.ADMIN} if canTargetModerators else MODERATOR_TYPES
+    with transaction.atomic():
+        targets = CommunityMember.objects.filter(community_id=communityId, user_id__in=userIds).exclude(
+            memberType__in=protected
+        )
+        changedIds = list(targets.select_for_update().values_list('user_id', flat=True))
+        targets.update(
+            status=status,
+            mutedUntil=mutedUntil if status == CommunityMember.Status.MUTED else None,
+            modified=timezone.now(),
+        )
+        invalidateManyMemberships(changedIds)
+    if changedIds:
+        communityCache.invalidate(communityId)
+    return changedIds
+
+
+def expireMutes(batchSize: int = None):
+    """
+    Reinstates members whose mute has run out, a batch per transaction through community_member_muted_idx. Mutes
+    without an end date are left alone. Returns the number of members reinstated.
+    """
+    batchSize = batchSize or settings.COMMUNITY_MODERATION_BATCH_SIZE
+    now = timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(CommunityMember.objects.filter(
+                status=CommunityMember.Status.MUTED, mutedUntil__lte=now
+            ).order_by('mutedUntil', 'pk').select_for_update(skip_locked=True).values_list(
+                'pk', 'user_id', 'community_id'
+            )[:batchSize])
+            if not rows:
+                break
+            CommunityMember.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+                status=CommunityMember.Status.ACTIVE, mutedUntil=None, modified=now
+            )
+            invalidateManyMemberships({userId for _, userId, _ in rows})
+            for communityId in {communityId for _, _, communityId in rows}:
+                communityCache.invalidate(communityId)
+        expired += len(rows)
+    return expired
@@ -0,0 +1,165 @@
+from collections import defaultdict, namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import PermissionDenied
+
+from apps.communities.models import Community, CommunityMember
+
+CommunityPermissions = namedtuple('CommunityPermissions', ['canView', 'canPost', 'canModerate'])
+
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 60
+MODERATOR_TYPES = {CommunityMember.MemberTypes.ADMIN, CommunityMember.MemberTypes.MODERATOR}
+
+
+def membershipCacheKey(userId: int):
+    return f'community-memberships:{userId}'
+
+
+def invalidateMemberships(userId: int):
+    transaction.on_commit(lambda: cache.delete(membershipCacheKey(userId)))
+
+
+def invalidateManyMemberships(userIds):
+    # One cache round trip for a batch of users, e.g. after a bulk approval or ban.
+    keys = [membershipCacheKey(userId) for userId in userIds]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def loadMemberships(userIds):
+    """
+    {userId: {communityId: (memberType, status)}} for every user, from the cache where possible and with one query
+    for the rest.
+    """
+    userIds = set(userIds)
+    cached = cache.get_many([membershipCacheKey(userId) for userId in userIds])
+    memberships = {
+        userId: cached[membershipCacheKey(userId)] for userId in userIds if membershipCacheKey(userId) in cached
+    }
+
+    missing = userIds - memberships.keys()
+    if missing:
+        loaded = defaultdict(dict)
+        rows = CommunityMember.objects.filter(user_id__in=missing).values_list(
+            'user_id', 'community_id', 'memberType', 'status'
+        )
+        for userId, communityId, memberType, status in rows:
+            loaded[userId][communityId] = (memberType, status)
+        fresh = {userId: loaded.get(userId, {}) for userId in missing}
+        cache.set_many({membershipCacheKey(userId): value for userId, value in fresh.items()}, MEMBERSHIP_CACHE_TIMEOUT)
+        memberships.update(fresh)
+    return memberships
+
+
+def decidePermissions(communityType: str, membership, isAuthenticated: bool = True):
+    if communityType is None:
+        return CommunityPermissions(False, False, False)
+    memberType, status = membership or (None, None)
+    isBanned = status == CommunityMember.Status.BANNED
+    isActive = status == CommunityMember.Status.ACTIVE
+
+    if communityType == Community.Type.PRIVATE:
+        canView = membership is not None and not isBanned
+    else:
+        canView = True
+
+    if not isAuthenticated or isBanned or status == CommunityMember.Status.MUTED:
+        canPost = False
+    elif communityType == Community.Type.PUBLIC:
+        canPost = True
+    else:
+        canPost = isActive
+
+    canModerate = isActive and memberType in MODERATOR_TYPES
+    return CommunityPermissions(canView, canPost, canModerate)
+
+
+def resolvePermissions(pairs):
+    """
+    Answers many (user, community) pairs at once: one cache round trip (plus at most one query) for the memberships
+    and, only when communities are given as ids, one query for their types.
+    """
+    pairs = list(pairs)
+    communityTypes = {}
+    unknownIds = set()
+    for _, community in pairs:
+        if isinstance(community, Community):
+            communityTypes[community.pk] = community.communityType
+        else:
+            unknownIds.add(community)
+    unknownIds -= communityTypes.keys()
+    if unknownIds:
+        communityTypes.update(Community.objects.filter(pk__in=unknownIds).values_list('pk', 'communityType'))
+
+    userIds = {user.pk for user, _ in pairs if user.is_authenticated}
+    memberships = loadMemberships(userIds) if userIds else {}
+
+    permissions = {}
+    for user, community in pairs:
+        communityId = community.pk if isinstance(community, Community) else community
+        membership = memberships.get(user.pk, {}).get(communityId) if user.is_authenticated else None
+        permissions[(user.pk, communityId)] = decidePermissions(
+            communityTypes.get(communityId), membership, user.is_authenticated
+        )
+    return permissions
+
+
+class CommunityPermissionResolver:
+    """
+    Permissions of one user across communities, backed by a single load of the user's memberships. Use
+    getPermissionResolver(request) to share one resolver per request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._memberships = None
+
+    @property
+    def memberships(self):
+        if self._memberships is None:
+            self._memberships = loadMemberships([self.user.pk])[self.user.pk] if self.user.is_authenticated else {}
+        return self._memberships
+
+    def permissions(self, community: Community):
+        return decidePermissions(community.communityType, self.memberships.get(community.pk), self.user.is_authenticated)
+
+    def canView(self, community: Community):
+        return self.permissions(community).canView
+
+    def canPost(self, community: Community):
+        return self.permissions(community).canPost
+
+    def canModerate(self, community: Community):
+        return self.permissions(community).canModerate
+
+    def resolve(self, communities):
+        return {community.pk: self.permissions(community) for community in communities}
+
+    def hiddenFilter(self, prefix: str = ''):
+        """
+        Q matching rows of PRIVATE communities the user may not view; `prefix` reaches the community from another
+        model, e.g. 'post__' for comments.
+        """
+        visible = [
+            communityId for communityId, (_, status) in self.memberships.items()
+            if status != CommunityMember.Status.BANNED
+        ]
+        return Q(**{f'{prefix}community__communityType': Community.Type.PRIVATE}) & ~Q(
+            **{f'{prefix}community_id__in': visible}
+        )
+
+
+def getPermissionResolver(request):
+    if not hasattr(request, '_communityPermissionResolver'):
+        request._communityPermissionResolver = CommunityPermissionResolver(request.user)
+    return request._communityPermissionResolver
+
+
+def getModeratedCommunity(request, communityName):
+    community = get_object_or_404(Community, name=communityName)
+    if not getPermissionResolver(request).canModerate(community):
+        raise PermissionDenied()
+    return community
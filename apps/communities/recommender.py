@@ -0,0 +1,206 @@
+import operator
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.comments.models import PostComment
+from apps.communities.models import Community, CommunityMember, CommunityNeighbours
+from apps.communities.utils import communityCache
+from apps.profiles.models import Profile
+
+MASK64 = (1 << 64) - 1
+EMPTY = MASK64
+# Each signal gets its own token per user, so a user who both joined and commented in two communities counts twice.
+SIGNALS = {'member': 0, 'favourite': 1, 'comment': 2}
+# Buckets shared by more communities than this are skipped rather than compared pair by pair.
+MAX_BUCKET_SIZE = 500
+
+
+def mix64(value: int):
+    # splitmix64's finaliser: a cheap, well spread 64 bit hash of an integer.
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+class MinHashSketches:
+    """
+    One permutation MinHash: every token is hashed once into one of numHashes bins and each community keeps the
+    smallest hash seen per bin, so adding a token costs one hash however long the signature is. Signatures are arrays
+    of 64 bit integers, numHashes * 8 bytes per community, and the tokens themselves are never kept.
+    """
+
+    def __init__(self, numHashes: int):
+        self.numHashes = numHashes
+        self.sketches = {}
+
+    def add(self, communityId: int, token: int):
+        hashed = mix64(token)
+        position, value = hashed % self.numHashes, hashed // self.numHashes
+        sketch = self.sketches.get(communityId)
+        if sketch is None:
+            sketch = self.sketches[communityId] = array('Q', [EMPTY]) * self.numHashes
+        if value < sketch[position]:
+            sketch[position] = value
+
+    def densify(self, sketch):
+        """
+        Fills the bins no token fell into from the nearest filled bin to their right, mixed with the distance to it
+        (rotation densification), so small communities still get comparable signatures.
+        """
+        if EMPTY not in sketch:
+            return sketch
+        signature = array('Q', sketch)
+        nearest, distance = None, 0
+        for index in reversed(range(2 * self.numHashes)):
+            position = index % self.numHashes
+            if sketch[position] != EMPTY:
+                nearest, distance = sketch[position], 0
+                continue
+            distance += 1
+            if nearest is not None and index < self.numHashes:
+                signature[position] = mix64(nearest * self.numHashes + distance)
+        return signature
+
+    def signatures(self):
+        return {communityId: self.densify(sketch) for communityId, sketch in self.sketches.items()}
+
+
+def similarity(first, second):
+    # The share of equal bins estimates the Jaccard similarity of the two token sets.
+    return sum(map(operator.eq, first, second)) / len(first)
+
+
+def iterateRows(queryset, fields, batchSize: int):
+    # Keyset batches by primary key, so the scan holds no cursor or lock for long and memory stays flat.
+    lastPk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=lastPk).order_by('pk').values_list('pk', *fields)[:batchSize])
+        if not batch:
+            return
+        lastPk = batch[-1][0]
+        for row in batch:
+            yield row[1:]
+
+
+def streamCommunityTokens(communityIds: set, batchSize: int = 1000):
+    """
+    (communityId, token) for every active membership, favourite and recent comment in the given communities. A token
+    stands for one user through one signal.
+    """
+    stride = len(SIGNALS)
+    memberships = CommunityMember.objects.filter(status=CommunityMember.Status.ACTIVE)
+    for communityId, userId in iterateRows(memberships, ['community_id', 'user_id'], batchSize):
+        if communityId in communityIds:
+            yield communityId, userId * stride + SIGNALS['member']
+
+    idsByName = dict(Community.objects.filter(pk__in=communityIds).values_list('name', 'pk'))
+    for userId, favourites in iterateRows(Profile.objects.all(), ['user_id', 'favouriteCommunities'], batchSize):
+        for name in favourites or ():
+            if name in idsByName:
+                yield idsByName[name], userId * stride + SIGNALS['favourite']
+
+    since = timezone.now() - timedelta(days=settings.RELATED_COMMUNITIES_COMMENT_DAYS)
+    comments = PostComment.objects.filter(created__gte=since)
+    for communityId, userId in iterateRows(comments, ['post__community_id', 'creator_id'], batchSize):
+        if communityId in communityIds:
+            yield communityId, userId * stride + SIGNALS['comment']
+
+
+def _offer(best: dict, communityId: int, score: float, topK: int):
+    if len(best) < topK:
+        best[communityId] = score
+        return
+    worst = min(best, key=best.get)
+    if score > best[worst]:
+        del best[worst]
+        best[communityId] = score
+
+
+def findNeighbours(signatures: dict, topK: int, rows: int, minScore: float):
+    """
+    {communityId: {relatedId: score}} with at most topK entries each. Signatures are cut into bands of `rows` values
+    and only communities sharing a whole band are compared, one band at a time, so neither the candidate pairs nor
+    the band index ever exist for all bands at once.
+    """
+    best = defaultdict(dict)
+    numHashes = len(next(iter(signatures.values()))) if signatures else 0
+    for start in range(0, numHashes - rows + 1, rows):
+        buckets = defaultdict(list)
+        for communityId, signature in signatures.items():
+            buckets[signature[start:start + rows].tobytes()].append(communityId)
+        for members in buckets.values():
+            if len(members) < 2 or len(members) > MAX_BUCKET_SIZE:
+                continue
+            for index, first in enumerate(members):
+                for second in members[index + 1:]:
+                    if second in best[first]:
+                        continue
+                    score = similarity(signatures[first], signatures[second])
+                    if score >= minScore:
+                        _offer(best[first], second, score, topK)
+                        _offer(best[second], first, score, topK)
+    return best
+
+
+def storeNeighbours(communityIds, neighbours: dict, startedAt, batchSize: int = 1000):
+    """
+    Writes the neighbour lists that changed, upserting in batches, and drops the rows of communities that were not
+    part of this run. Returns the number of rows written.
+    """
+    written = 0
+    communityIds = sorted(communityIds)
+    for start in range(0, len(communityIds), batchSize):
+        batch = communityIds[start:start + batchSize]
+        existing = CommunityNeighbours.objects.in_bulk(batch)
+        changed = []
+        for communityId in batch:
+            ranked = sorted(neighbours.get(communityId, {}).items(), key=lambda item: (-item[1], item[0]))
+            relatedIds = [relatedId for relatedId, _ in ranked]
+            scores = [round(score, 4) for _, score in ranked]
+            current = existing.get(communityId)
+            if current and current.communityIds == relatedIds and current.scores == scores:
+                continue
+            changed.append(CommunityNeighbours(community_id=communityId, communityIds=relatedIds, scores=scores))
+        CommunityNeighbours.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['community'],
+            update_fields=['communityIds', 'scores', 'computed'],
+        )
+        CommunityNeighbours.objects.filter(pk__in=batch).update(computed=timezone.now())
+        for row in changed:
+            communityCache.invalidate(row.community_id)
+        written += len(changed)
+
+    stale = list(CommunityNeighbours.objects.filter(computed__lt=startedAt).values_list('pk', flat=True))
+    CommunityNeighbours.objects.filter(pk__in=stale).delete()
+    for communityId in stale:
+        communityCache.invalidate(communityId)
+    return written
+
+
+def computeRelatedCommunities(topK: int = None, batchSize: int = 1000):
+    """
+    Recomputes the related communities of every PUBLIC and RESTRICTED community from one streaming pass over
+    memberships, favourites and recent comments. Private communities are neither given nor suggested as neighbours.
+    Returns (communities sketched, rows written).
+    """
+    startedAt = timezone.now()
+    communityIds = set(Community.objects.exclude(communityType=Community.Type.PRIVATE).values_list('pk', flat=True))
+    sketches = MinHashSketches(settings.RELATED_COMMUNITIES_HASHES)
+    for communityId, token in streamCommunityTokens(communityIds, batchSize):
+        sketches.add(communityId, token)
+
+    signatures = sketches.signatures()
+    neighbours = findNeighbours(
+        signatures,
+        topK or settings.RELATED_COMMUNITIES_TOP_K,
+        settings.RELATED_COMMUNITIES_BAND_ROWS,
+        settings.RELATED_COMMUNITIES_MIN_SCORE,
+    )
+    return len(signatures), storeNeighbours(communityIds, neighbours, startedAt, batchSize)
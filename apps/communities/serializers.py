@@ -0,0 +1,128 @@
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from apps.communities.models import (
+    Community,
+    CommunityFlair,
+    CommunityInvite,
+    CommunityMember,
+    CommunityMemberRequest,
+    CommunityPage,
+    CommunityRule,
+)
+from apps.core.serializers import ImageVariantsField
+
+
+class CommunitySummarySerializerVersion1(serializers.ModelSerializer):
+    logoVariants = ImageVariantsField()
+
+    class Meta:
+        model = Community
+        fields = ['id', 'name', 'logo', 'logoVariants']
+
+
+class CommunitySerializerVersion1(serializers.ModelSerializer):
+    memberCount = serializers.IntegerField(read_only=True)
+    bannerVariants = ImageVariantsField()
+    logoVariants = ImageVariantsField()
+
+    class Meta:
+        model = Community
+        fields = [
+            'id',
+            'name',
+            'header',
+            'description',
+            'banner',
+            'bannerVariants',
+            'logo',
+            'logoVariants',
+            'communityType',
+            'archivePosts',
+            'memberCount',
+            'created',
+        ]
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        members = CommunityMember.objects.filter(
+            community=OuterRef('pk'), status=CommunityMember.Status.ACTIVE
+        ).order_by().values('community').annotate(count=Count('pk')).values('count')
+        return queryset.annotate(memberCount=Coalesce(Subquery(members), 0))
+
+
+class CommunityRuleSerializerVersion1(serializers.ModelSerializer):
+    class Meta:
+        model = CommunityRule
+        fields = ['id', 'title', 'description', 'ruleType']
+
+
+class CommunityFlairSerializerVersion1(serializers.ModelSerializer):
+    class Meta:
+        model = CommunityFlair
+        fields = ['id', 'name', 'color']
+
+
+class CommunityPageSerializerVersion1(serializers.ModelSerializer):
+    class Meta:
+        model = CommunityPage
+        fields = ['id', 'title', 'content']
+
+
+class CommunityDetailSerializerVersion1(CommunitySerializerVersion1):
+    rules = CommunityRuleSerializerVersion1(source='communityRules', many=True, read_only=True)
+    flairs = CommunityFlairSerializerVersion1(source='communityFlares', many=True, read_only=True)
+    pages = CommunityPageSerializerVersion1(source='communityPages', many=True, read_only=True)
+    relatedCommunities = serializers.SerializerMethodField()
+
+    class Meta(CommunitySerializerVersion1.Meta):
+        fields = CommunitySerializerVersion1.Meta.fields + ['rules', 'flairs', 'pages', 'relatedCommunities']
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return super().prefetchPlan(queryset, request).select_related('neighbours').prefetch_related(
+            Prefetch('communityRules', queryset=CommunityRule.objects.order_by('pk')),
+            Prefetch('communityFlares', queryset=CommunityFlair.objects.order_by('name')),
+            Prefetch('communityPages', queryset=CommunityPage.objects.order_by('pk')),
+        )
+
+    def get_relatedCommunities(self, instance):
+        # The precomputed neighbour ids, in order; communities made private since the last run are left out.
+        neighbours = getattr(instance, 'neighbours', None)
+        if neighbours is None or not neighbours.communityIds:
+            return []
+        related = Community.objects.exclude(communityType=Community.Type.PRIVATE).in_bulk(neighbours.communityIds)
+        return CommunitySummarySerializerVersion1(
+            [related[pk] for pk in neighbours.communityIds if pk in related], many=True
+        ).data
+
+
+class CommunityMemberRequestSerializerVersion1(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = CommunityMemberRequest
+        fields = ['id', 'username', 'created']
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return queryset.select_related('user')
+
+
+class CommunityInviteBatchSerializerVersion1(serializers.Serializer):
+    usernames = serializers.ListField(child=serializers.CharField(max_length=150), min_length=1, max_length=1000)
+    inviteAs = serializers.ChoiceField(choices=CommunityInvite.InviteAs.choices, default=CommunityInvite.InviteAs.MEMBER)
+
+
+class MemberRequestDecisionSerializerVersion1(serializers.Serializer):
+    approve = serializers.BooleanField()
+    # Omitted to decide every pending request.
+    requests = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=1000, required=False)
+
+
+class MemberStatusSerializerVersion1(serializers.Serializer):
+    usernames = serializers.ListField(child=serializers.CharField(max_length=150), min_length=1, max_length=1000)
+    status = serializers.ChoiceField(choices=CommunityMember.Status.choices)
+    # Only for MUTED; COMMUNITY_MUTE_DAYS when omitted.
+    mutedDays = serializers.IntegerField(min_value=1, max_value=365, required=False)
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.communities.models import Community, CommunityFlair, CommunityMember, CommunityPage, CommunityRule
+from apps.communities.permissions import invalidateMemberships
+from apps.communities.utils import communityCache
+from apps.core.images import queueImageVariants
+from apps.core.search import refreshSearchVector, searchFieldsChanged
+
+
+@receiver([post_save, post_delete], sender=Community)
+def invalidateCommunity(sender, instance, **kwargs):
+    communityCache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Community)
+def indexCommunity(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and searchFieldsChanged(Community, update_fields):
+        refreshSearchVector(Community, instance.pk)
+
+
+@receiver(post_save, sender=Community)
+def processCommunityImages(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        queueImageVariants(instance, update_fields)
+
+
+@receiver([post_save, post_delete], sender=CommunityRule)
+@receiver([post_save, post_delete], sender=CommunityFlair)
+@receiver([post_save, post_delete], sender=CommunityPage)
+def invalidateCommunityDetail(sender, instance, **kwargs):
+    communityCache.invalidate(instance.community_id)
+
+
+@receiver([post_save, post_delete], sender=CommunityMember)
+def invalidateMemberPermissions(sender, instance, **kwargs):
+    invalidateMemberships(instance.user_id)
+    # The cached community payload carries memberCount.
+    communityCache.invalidate(instance.community_id)
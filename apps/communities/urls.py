@@ -1,7 +1,30 @@
+from django.urls import path
+from rest_framework import routers
+
 from apps.communities.views import *
 
 app_name = 'communities'
 
-urlpatterns = [
+router = routers.DefaultRouter()
+router.register('v1/community', CommunityViewSetApiEventVersion1, basename='community-v1')
 
+urlpatterns = [
+    path('v1/community-autocomplete/', CommunityAutocompleteApiEventVersion1.as_view(), name='community-autocomplete-v1'),
+    path(
+        'v1/community/<str:communityName>/invites/',
+        CommunityInvitesApiEventVersion1.as_view(),
+        name='community-invites-v1',
+    ),
+    path(
+        'v1/community/<str:communityName>/member-requests/',
+        CommunityMemberRequestsApiEventVersion1.as_view(),
+        name='community-member-requests-v1',
+    ),
+    path(
+        'v1/community/<str:communityName>/members/status/',
+        CommunityMemberStatusApiEventVersion1.as_view(),
+        name='community-member-status-v1',
+    ),
 ]
+
+urlpatterns += router.urls
@@ -0,0 +1,11 @@
+from apps.communities.models import Community
+from apps.communities.serializers import CommunityDetailSerializerVersion1
+from apps.core.cache import ObjectCache
+
+
+def buildCommunityPayload(communityId: int):
+    community = CommunityDetailSerializerVersion1.prefetchPlan(Community.objects).get(pk=communityId)
+    return CommunityDetailSerializerVersion1(community).data
+
+
+communityCache = ObjectCache('community', buildCommunityPayload, model=Community)
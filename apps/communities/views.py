@@ -1,9 +1,149 @@
-from rest_framework import viewsets
+from datetime import timedelta
 
-from apps.communities.models import Community
-from apps.communities.serializers import CommunitySerializerVersion1
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework import generics, status, viewsets
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from apps.communities.models import Community, CommunityMember, CommunityMemberRequest
+from apps.communities.moderation import decideMemberRequests, inviteUsers, setMemberStatus
+from apps.communities.permissions import getModeratedCommunity, getPermissionResolver
+from apps.communities.serializers import (
+    CommunityInviteBatchSerializerVersion1,
+    CommunityMemberRequestSerializerVersion1,
+    CommunitySerializerVersion1,
+    MemberRequestDecisionSerializerVersion1,
+    MemberStatusSerializerVersion1,
+)
+from apps.communities.utils import communityCache
+from apps.core.mixins import PrefetchPlanMixin
+from apps.core.ratelimit import ActionRateThrottle, RateLimitAction, checkRateLimit, rateLimited
+from apps.core.tasks import enqueue
 
-class CommunityViewSetApiEventVersion1(viewsets.ModelViewSet):
-    queryset = Community.objects.all()
+
+class CommunityViewSetApiEventVersion1(PrefetchPlanMixin, viewsets.ModelViewSet):
+    # Ordered by the unique name so the keyset cursor can walk the unique index.
+    queryset = Community.objects.order_by('name')
     serializer_class = CommunitySerializerVersion1
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    lookup_value_regex = r'\d+'
+    queryBudget = 6
+
+    @rateLimited(RateLimitAction.COMMUNITY)
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        # The creator administers the new community, otherwise nobody could ever edit it.
+        with transaction.atomic():
+            community = serializer.save()
+            CommunityMember.objects.create(
+                community=community, user=self.request.user, memberType=CommunityMember.MemberTypes.ADMIN
+            )
+
+    def get_object(self):
+        community = super().get_object()
+        if self.request.method not in SAFE_METHODS and not getPermissionResolver(self.request).canModerate(community):
+            raise PermissionDenied()
+        return community
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return Response(communityCache.get(int(kwargs['pk'])))
+        except Community.DoesNotExist:
+            raise NotFound()
+
+
+class CommunityAutocompleteApiEventVersion1(APIView):
+    queryBudget = 3
+    maxLimit = 20
+
+    def get(self, request):
+        prefix = request.query_params.get('q', '').strip().lower()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), self.maxLimit)
+        except ValueError:
+            limit = 10
+        if not prefix:
+            return Response([])
+
+        # lower(name) LIKE 'prefix%' is answered by community_name_prefix_idx.
+        names = Community.objects.annotate(lowerName=Lower('name')).filter(
+            lowerName__startswith=prefix
+        ).order_by('lowerName').values_list('name', flat=True)[:limit]
+        return Response(list(names))
+
+
+class CommunityInvitesApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ActionRateThrottle]
+    rateLimitAction = RateLimitAction.INVITE
+    queryBudget = 6
+
+    def post(self, request, communityName):
+        # One batch of up to 1000 usernames counts as a single invite against the rate limits.
+        community = getModeratedCommunity(request, communityName)
+        serializer = CommunityInviteBatchSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checkRateLimit(request, RateLimitAction.INVITE, community)
+        invitedIds = inviteUsers(
+            community.pk, request.user.pk, serializer.validated_data['usernames'], serializer.validated_data['inviteAs']
+        )
+        return Response({'invited': len(invitedIds)}, status=status.HTTP_201_CREATED)
+
+
+class CommunityMemberRequestsApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    serializer_class = CommunityMemberRequestSerializerVersion1
+    permission_classes = [IsAuthenticated]
+    queryBudget = 8
+
+    def get_queryset(self):
+        community = getModeratedCommunity(self.request, self.kwargs['communityName'])
+        # The pending rows are found through member_request_approved_idx; oldest requests first.
+        return CommunityMemberRequest.objects.filter(community=community, isApproved=False).order_by('created', 'id')
+
+    def post(self, request, communityName):
+        community = getModeratedCommunity(request, communityName)
+        serializer = MemberRequestDecisionSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        approve = serializer.validated_data['approve']
+        requestIds = serializer.validated_data.get('requests')
+        if requestIds is None:
+            # Every pending request could be far more than one request should wait for.
+            enqueue(decideMemberRequests, community.pk, approve)
+            return Response({'queued': True}, status=status.HTTP_202_ACCEPTED)
+        decided = decideMemberRequests(community.pk, approve, requestIds)
+        return Response({'approved' if approve else 'rejected': decided})
+
+
+class CommunityMemberStatusApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 8
+
+    def post(self, request, communityName):
+        community = getModeratedCommunity(request, communityName)
+        serializer = MemberStatusSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        memberStatus = serializer.validated_data['status']
+        mutedUntil = None
+        if memberStatus == CommunityMember.Status.MUTED:
+            days = serializer.validated_data.get('mutedDays', settings.COMMUNITY_MUTE_DAYS)
+            mutedUntil = timezone.now() + timedelta(days=days)
+
+        # Only admins may ban or mute moderators.
+        memberType, _ = getPermissionResolver(request).memberships[community.pk]
+        userIds = User.objects.filter(username__in=serializer.validated_data['usernames']).values('pk')
+        changedIds = setMemberStatus(
+            community.pk,
+            userIds,
+            memberStatus,
+            mutedUntil,
+            canTargetModerators=memberType == CommunityMember.MemberTypes.ADMIN,
+        )
+        return Response({'updated': len(changedIds), 'mutedUntil': mutedUntil})
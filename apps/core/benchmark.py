@@ -0,0 +1,285 @@
+import asyncio
+import datetime
+import gc
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+
+from apps.comments.models import PostComment
+from apps.communities.models import Community, CommunityMember
+from apps.core.live import getLiveBroker, postChannel
+from apps.core.metrics import QueryRecorder
+from apps.posts.live import PostLiveApplication
+from apps.posts.models import Post
+from apps.profiles.models import Profile
+
+
+class Scenario:
+    def __init__(self, name: str, url: str, username: str = None):
+        self.name = name
+        self.url = url
+        self.username = username
+
+
+def defaultScenarios():
+    """
+    The feed, thread, profile and search paths, each pointed at the heaviest target in the database: the largest
+    community, the most commented post, the most followed user and the most common title word.
+    """
+    community = Community.objects.annotate(size=Count('communityMembers')).order_by('-size', 'pk').first()
+    post = Post.objects.filter(status=Post.Status.PUBLIC).order_by('-commentCount', 'pk').first()
+    profile = Profile.objects.select_related('user').annotate(size=Count('followers')).order_by('-size', 'pk').first()
+    member = CommunityMember.objects.values('user__username').annotate(size=Count('pk')).order_by('-size').first()
+    word = (post.title.split() or ['post'])[0].lower() if post else 'post'
+
+    scenarios = []
+    if community:
+        scenarios += [
+            Scenario('communityFeedHot', f'/posts/v1/community/{community.name}/feed/?sort=HOT'),
+            Scenario('communityFeedNew', f'/posts/v1/community/{community.name}/feed/?sort=NEW'),
+            Scenario('communityDetail', f'/communities/v1/community/{community.pk}/'),
+        ]
+    if member:
+        scenarios.append(Scenario('homeFeed', '/posts/v1/home/', member['user__username']))
+    if post:
+        scenarios += [
+            Scenario('postDetail', f'/posts/v1/post/{post.pk}/'),
+            Scenario('thread', f'/comments/v1/post/{post.pk}/thread/'),
+            Scenario('postComments', f'/comments/v1/post/{post.pk}/comments/?sort=TOP'),
+        ]
+    if profile:
+        scenarios += [
+            Scenario('profile', f'/profiles/v1/profile/{profile.user.username}/'),
+            Scenario('userPosts', f'/posts/v1/user/{profile.user.username}/posts/'),
+        ]
+    scenarios += [
+        Scenario('searchPosts', f'/core/v1/search/?q={word}&type=POSTS'),
+        Scenario('searchComments', f'/core/v1/search/?q={word}&type=COMMENTS'),
+    ]
+    return scenarios
+
+
+def percentile(values, fraction: float):
+    # Nearest rank on the sorted samples, exact rather than bucketed like apps.core.metrics.Histogram.
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+def timedRequest(client: Client, url: str):
+    recorder = QueryRecorder()
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        response = client.get(url, secure=True)
+    return response, (time.perf_counter() - started) * 1000, recorder
+
+
+def runScenario(scenario: Scenario, repeat: int = 20, warmup: int = 2, cold: bool = False, host: str = 'localhost'):
+    """
+    Requests the scenario's url warmup + repeat times and summarises the measured ones: latency percentiles in ms,
+    query counts, and the peak memory Python allocated while serving one extra request under tracemalloc (kept out
+    of the timed runs because tracing slows everything down). With cold, the cache is cleared before every request.
+    """
+    client = Client(HTTP_HOST=host)
+    if scenario.username:
+        client.force_login(User.objects.get(username=scenario.username))
+
+    latencies, queries, dbTimes = [], [], []
+    status = None
+    for run in range(warmup + repeat):
+        if cold:
+            cache.clear()
+        response, elapsed, recorder = timedRequest(client, scenario.url)
+        status = response.status_code
+        if run >= warmup:
+            latencies.append(elapsed)
+            queries.append(recorder.count)
+            dbTimes.append(recorder.duration * 1000)
+
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        client.get(scenario.url, secure=True)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': scenario.url,
+        'status': status,
+        'requests': repeat,
+        'latencyMs': {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 0.5), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(max(latencies), 3),
+        },
+        'dbTimeMs': round(statistics.fmean(dbTimes), 3),
+        'queries': {'min': min(queries), 'max': max(queries)},
+        'peakMemoryKb': round(peak / 1024, 1),
+    }
+
+
+def gitRevision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def runBenchmarks(scenarios, repeat: int = 20, warmup: int = 2, cold: bool = False, label: str = None,
+                  host: str = 'localhost'):
+    return {
+        'meta': {
+            'label': label,
+            'revision': gitRevision(),
+            'createdAt': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeat': repeat,
+            'cold': cold,
+            'dataset': {
+                'users': User.objects.count(),
+                'communities': Community.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': PostComment.objects.count(),
+            },
+        },
+        'scenarios': {scenario.name: runScenario(scenario, repeat, warmup, cold, host) for scenario in scenarios},
+    }
+
+
+def compareResults(baseline: dict, current: dict, tolerance: float = 0.2):
+    """
+    Lists the scenarios that got worse than the baseline: any extra query, or a p95 latency or peak memory more than
+    `tolerance` (a fraction) above it.
+    """
+    regressions = []
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        if result['queries']['max'] > before['queries']['max']:
+            regressions.append(f'{name}: {result["queries"]["max"]} queries, was {before["queries"]["max"]}')
+        for label, now, was in (
+            ('p95 latency', result['latencyMs']['p95'], before['latencyMs']['p95']),
+            ('peak memory', result['peakMemoryKb'], before['peakMemoryKb']),
+        ):
+            if was and now > was * (1 + tolerance):
+                regressions.append(f'{name}: {label} {now}, was {was} (+{(now / was - 1) * 100:.0f}%)')
+    return regressions
+
+
+async def _liveClient(application, scope, disconnect: asyncio.Event, deliveries: list):
+    # One idle EventSource: holds the stream open until `disconnect` is set and timestamps every score event.
+    requestSent = False
+    result = {'status': None}
+
+    async def receive():
+        nonlocal requestSent
+        if not requestSent:
+            requestSent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            deliveries.extend([time.perf_counter()] * message.get('body', b'').count(b'event: score'))
+
+    await application(scope, receive, send)
+    return result
+
+
+async def runLiveLoadTest(postId: int, subscribers: int = 1000, messages: int = 10, host: str = 'localhost',
+                          timeout: float = 60):
+    """
+    Opens `subscribers` live streams on the post through the ASGI application in this process, reports the Python memory
+    they hold once idle (measured with tracemalloc) and how long each of `messages` published score events takes to
+    reach all of them, then disconnects everyone and checks that every subscription was released.
+    """
+    application = PostLiveApplication(ASGIHandler())
+    path = f'/posts/v1/post/{postId}/live/'
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'https',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', host.encode()), (b'accept', b'text/event-stream')],
+        'client': ('127.0.0.1', 0), 'server': (host, 443),
+    }
+    broker = getLiveBroker()
+    baseline = broker.subscriberCount
+    disconnect = asyncio.Event()
+    deliveries = []
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        clients = [
+            asyncio.create_task(_liveClient(application, scope, disconnect, deliveries)) for _ in range(subscribers)
+        ]
+        while broker.subscriberCount - baseline < subscribers and time.perf_counter() - started < timeout:
+            if any(client.done() for client in clients):
+                break
+            await asyncio.sleep(0.05)
+        connected = broker.subscriberCount - baseline
+        connectSeconds = time.perf_counter() - started
+        gc.collect()
+        heldBytes = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    fanOut = []
+    for index in range(messages if connected else 0):
+        deliveries.clear()
+        published = time.perf_counter()
+        broker.publish(postChannel(postId), {
+            'type': 'score', 'model': 'post', 'id': postId, 'likeDelta': 1, 'dislikeDelta': 0,
+            'likeCount': index + 1, 'dislikeCount': 0,
+        })
+        while len(deliveries) < connected and time.perf_counter() - published < timeout:
+            await asyncio.sleep(0.001)
+        if deliveries:
+            fanOut.append((max(deliveries) - published) * 1000)
+
+    disconnect.set()
+    results = await asyncio.gather(*clients, return_exceptions=True)
+    await asyncio.sleep(0)
+    statuses = Counter(
+        result['status'] if isinstance(result, dict) else type(result).__name__ for result in results
+    )
+    return {
+        'url': path,
+        'subscribers': subscribers,
+        'connected': connected,
+        'statuses': dict(statuses),
+        'connectSeconds': round(connectSeconds, 3),
+        'heldMemoryKb': round(heldBytes / 1024, 1),
+        'bytesPerSubscriber': round(heldBytes / connected) if connected else None,
+        'fanOutMs': {
+            'p50': round(percentile(fanOut, 0.5), 3),
+            'max': round(max(fanOut), 3),
+        } if fanOut else None,
+        'leftSubscribed': broker.subscriberCount - baseline,
+    }
@@ -0,0 +1,128 @@
+import math
+import random
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.routers import replicaReads
+
+# Bump when the shape of cached payloads changes so old entries are ignored after a deploy.
+OBJECT_CACHE_VERSION = 1
+
+objectCaches = {}
+cacheStats = Counter()
+
+
+class ObjectCache:
+    """
+    Read-through cache of one payload per object, e.g. a community with its rules, flairs and pages.
+
+    Every object has a generation counter that invalidate() bumps. A payload is stored together with the generation
+    it was built from and is ignored once the generation moved on, so a rebuild racing an invalidation cannot put
+    stale data back. Only one process rebuilds a missing payload at a time (single flight) and a payload close to
+    expiry is rebuilt early with a probability that grows as expiry approaches, so hot keys do not all expire at once.
+    """
+
+    def __init__(self, namespace: str, builder, model=None, timeout: int = 300, beta: float = 1.0, lockTimeout: int = 5):
+        self.namespace = namespace
+        self.builder = builder
+        self.timeout = timeout
+        self.beta = beta
+        self.lockTimeout = lockTimeout
+        if model is not None:
+            objectCaches[model] = self
+
+    def payloadKey(self, pk):
+        return f'object:{self.namespace}:v{OBJECT_CACHE_VERSION}:{pk}'
+
+    def generationKey(self, pk):
+        return f'object:{self.namespace}:generation:{pk}'
+
+    def lockKey(self, pk):
+        return f'object:{self.namespace}:lock:{pk}'
+
+    def get(self, pk):
+        payloadKey, generationKey = self.payloadKey(pk), self.generationKey(pk)
+        found = cache.get_many([payloadKey, generationKey])
+        generation = found.get(generationKey, 0)
+        entry = found.get(payloadKey)
+        if entry is not None and entry['generation'] != generation:
+            entry = None
+
+        if entry is not None and not self.shouldRefreshEarly(entry):
+            cacheStats[f'{self.namespace}.hit'] += 1
+            return entry['value']
+
+        locked = cache.add(self.lockKey(pk), 1, self.lockTimeout)
+        if not locked:
+            # Someone else is rebuilding: serve what we have, or wait briefly for their result.
+            if entry is not None:
+                cacheStats[f'{self.namespace}.hit'] += 1
+                return entry['value']
+            cacheStats[f'{self.namespace}.wait'] += 1
+            entry = self.waitForRebuild(payloadKey, generation)
+            if entry is not None:
+                cacheStats[f'{self.namespace}.hit'] += 1
+                return entry['value']
+
+        cacheStats[f'{self.namespace}.{"refresh" if entry is not None else "miss"}'] += 1
+        try:
+            return self.rebuild(pk, generation)
+        finally:
+            if locked:
+                cache.delete(self.lockKey(pk))
+
+    def rebuild(self, pk, generation: int):
+        started = time.monotonic()
+        # A payload outlives the request, so it is built from the primary: one built from a lagging replica would keep
+        # serving the rows from before an invalidation until the next one.
+        with replicaReads(False):
+            value = self.builder(pk)
+        elapsed = time.monotonic() - started
+        entry = {'value': value, 'generation': generation, 'delta': elapsed, 'expires': time.time() + self.timeout}
+        cache.set(self.payloadKey(pk), entry, self.timeout)
+        return value
+
+    def shouldRefreshEarly(self, entry):
+        # XFetch: refresh when now - delta * beta * ln(U) passes expiry, U uniform in (0, 1].
+        return time.time() - entry['delta'] * self.beta * math.log(1.0 - random.random()) >= entry['expires']
+
+    def waitForRebuild(self, payloadKey, generation: int, interval: float = 0.05):
+        deadline = time.monotonic() + self.lockTimeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            entry = cache.get(payloadKey)
+            if entry is not None and entry['generation'] == generation:
+                return entry
+        return None
+
+    def invalidate(self, pk):
+        # Bumping before commit would let a concurrent reader rebuild the old rows under the new generation.
+        transaction.on_commit(lambda: self.bumpGeneration(pk))
+
+    def bumpGeneration(self, pk):
+        generationKey = self.generationKey(pk)
+        cache.add(generationKey, 0, None)
+        try:
+            cache.incr(generationKey)
+        except ValueError:
+            cache.set(generationKey, 1, None)
+
+
+def invalidateCachedObject(model, pk):
+    objectCache = objectCaches.get(model)
+    if objectCache is not None:
+        objectCache.invalidate(pk)
+
+
+def getCacheStats():
+    stats = {}
+    for key, count in cacheStats.items():
+        namespace, event = key.rsplit('.', 1)
+        stats.setdefault(namespace, {'hit': 0, 'miss': 0, 'refresh': 0, 'wait': 0})[event] = count
+    for counts in stats.values():
+        lookups = counts['hit'] + counts['miss'] + counts['refresh']
+        counts['hitRatio'] = round(counts['hit'] / lookups, 4) if lookups else None
+    return stats
@@ -0,0 +1,271 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, models, transaction
+from django.db.models import Case, F, Value, When
+
+from apps.core.cache import invalidateCachedObject
+from apps.core.live import publishScoreChanges
+from apps.core.utils import VoteType, applyVotes
+from apps.core.votestate import updateVoteStates
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 1000
+
+
+class EventBufferBackend(models.TextChoices):
+    MEMORY = 'MEMORY'
+    REDIS = 'REDIS'
+    SYNC = 'SYNC'
+
+
+class MemoryEventBuffer:
+    """
+    Per-process buffer: the latest vote per (model, target, user) and summed views per (model, target). Events not yet
+    flushed are lost if the process dies, which bounds the loss to one flush interval.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.votes = {}
+        self.views = Counter()
+
+    def addVote(self, label: str, targetId: int, userId: int, vote: VoteType):
+        with self.lock:
+            self.votes[(label, targetId, userId)] = vote
+
+    def addView(self, label: str, targetId: int, count: int = 1):
+        with self.lock:
+            self.views[(label, targetId)] += count
+
+    def isFull(self, maxPending: int):
+        return len(self.votes) + len(self.views) >= maxPending
+
+    def drain(self):
+        with self.lock:
+            votes, views = self.votes, self.views
+            self.votes, self.views = {}, Counter()
+        return votes, views
+
+    def acknowledge(self):
+        pass
+
+    def restore(self, votes: dict, views: Counter):
+        # Votes cast while the failed flush ran are newer and win over the ones being put back.
+        with self.lock:
+            for key, vote in votes.items():
+                self.votes.setdefault(key, vote)
+            self.views.update(views)
+
+
+class RedisEventBuffer:
+    """
+    Buffer shared by every process in two Redis hashes, so events survive a web process restart. A flush renames the
+    hashes out of the way first; if it fails, the renamed hashes are picked up again by the next flush.
+    """
+    votesKey = 'events:votes'
+    viewsKey = 'events:views'
+    flushingSuffix = ':flushing'
+    lockKey = 'events:flush-lock'
+    lockTimeout = 60
+
+    def __init__(self, location: str):
+        import redis
+
+        self.client = redis.Redis.from_url(location)
+
+    def addVote(self, label: str, targetId: int, userId: int, vote: VoteType):
+        self.client.hset(self.votesKey, f'{label}:{targetId}:{userId}', int(vote))
+
+    def addView(self, label: str, targetId: int, count: int = 1):
+        self.client.hincrby(self.viewsKey, f'{label}:{targetId}', count)
+
+    def isFull(self, maxPending: int):
+        return False
+
+    def drain(self):
+        # Only one flusher at a time, otherwise two processes could apply the same view counts twice.
+        if not self.client.set(self.lockKey, 1, nx=True, ex=self.lockTimeout):
+            return None
+        for key in (self.votesKey, self.viewsKey):
+            if self.client.exists(key):
+                self.client.renamenx(key, key + self.flushingSuffix)
+
+        votes = {}
+        for field, vote in self.client.hgetall(self.votesKey + self.flushingSuffix).items():
+            label, targetId, userId = field.decode().split(':')
+            votes[(label, int(targetId), int(userId))] = VoteType(int(vote))
+        views = Counter()
+        for field, count in self.client.hgetall(self.viewsKey + self.flushingSuffix).items():
+            label, targetId = field.decode().split(':')
+            views[(label, int(targetId))] = int(count)
+        return votes, views
+
+    def acknowledge(self):
+        self.client.delete(self.votesKey + self.flushingSuffix, self.viewsKey + self.flushingSuffix, self.lockKey)
+
+    def restore(self, votes: dict, views: Counter):
+        self.client.delete(self.lockKey)
+
+
+_buffer = None
+_bufferLock = threading.Lock()
+_lastFlush = time.monotonic()
+_flushLoopRunning = False
+
+
+def getEventBuffer():
+    global _buffer
+    with _bufferLock:
+        if _buffer is None:
+            if settings.EVENT_BUFFER_BACKEND == EventBufferBackend.REDIS:
+                if not settings.REDIS_LOCATION:
+                    raise ImproperlyConfigured('EVENT_BUFFER_BACKEND REDIS needs REDIS_LOCATION.')
+                _buffer = RedisEventBuffer(settings.REDIS_LOCATION)
+            else:
+                _buffer = MemoryEventBuffer()
+                atexit.register(_flushAtExit)
+        return _buffer
+
+
+def _flushAtExit():
+    # Whatever an in-process buffer still holds when the worker exits, e.g. when it is recycled.
+    try:
+        flushEvents()
+    except Exception:
+        logger.exception('Flushing buffered events at exit failed')
+
+
+def _flushOffThread():
+    # Runs on an executor thread rather than the one shared by sync views; no request cycle closes its connection.
+    try:
+        return flushEvents()
+    finally:
+        close_old_connections()
+
+
+def _applyViews(model, views: dict):
+    targetIds = sorted(views)
+    for start in range(0, len(targetIds), FLUSH_BATCH_SIZE):
+        batch = targetIds[start:start + FLUSH_BATCH_SIZE]
+        model.objects.filter(pk__in=batch).update(
+            viewCount=F('viewCount') + Case(*[When(pk=pk, then=Value(views[pk])) for pk in batch], default=Value(0))
+        )
+        for pk in batch:
+            invalidateCachedObject(model, pk)
+
+
+def flushEvents(buffer=None):
+    """
+    Writes buffered votes and views to the database in batches and returns the number of events written. Safe to call
+    from any process; returns 0 when another process is already flushing a shared buffer.
+    """
+    global _lastFlush
+    buffer = buffer or getEventBuffer()
+    _lastFlush = time.monotonic()
+    drained = buffer.drain()
+    if drained is None:
+        return 0
+    votes, views = drained
+
+    votesByModel = defaultdict(dict)
+    for (label, targetId, userId), vote in votes.items():
+        votesByModel[label][(targetId, userId)] = vote
+    viewsByModel = defaultdict(dict)
+    for (label, targetId), count in views.items():
+        viewsByModel[label][targetId] = count
+
+    try:
+        for label, modelVotes in votesByModel.items():
+            pairs = list(modelVotes.items())
+            for start in range(0, len(pairs), FLUSH_BATCH_SIZE):
+                batch = dict(pairs[start:start + FLUSH_BATCH_SIZE])
+                model = apps.get_model(label)
+                previous = applyVotes(model, batch)
+                # Entries read from the database between a vote and its flush still had the old state.
+                updateVoteStates(model, batch)
+                publishScoreChanges(model, batch, previous)
+        with transaction.atomic():
+            for label, modelViews in viewsByModel.items():
+                _applyViews(apps.get_model(label), modelViews)
+    except Exception:
+        buffer.restore(votes, views)
+        raise
+    buffer.acknowledge()
+    return len(votes) + len(views)
+
+
+def _flushIfDue(buffer):
+    # Without the ASGI flush loop (e.g. under WSGI) the request path flushes once the interval has passed.
+    due = not _flushLoopRunning and time.monotonic() - _lastFlush >= settings.EVENT_BUFFER_FLUSH_INTERVAL
+    if due or buffer.isFull(settings.EVENT_BUFFER_MAX_PENDING):
+        flushEvents(buffer)
+
+
+def recordVote(model, targetId: int, userId: int, vote: VoteType):
+    # The voter sees their own vote straight away, even while it waits in the buffer.
+    updateVoteStates(model, {(targetId, userId): VoteType(vote)})
+    if settings.EVENT_BUFFER_BACKEND == EventBufferBackend.SYNC:
+        votes = {(targetId, userId): VoteType(vote)}
+        publishScoreChanges(model, votes, applyVotes(model, votes))
+        return
+    buffer = getEventBuffer()
+    buffer.addVote(model._meta.label, targetId, userId, VoteType(vote))
+    _flushIfDue(buffer)
+
+
+def recordView(model, targetId: int):
+    if settings.EVENT_BUFFER_BACKEND == EventBufferBackend.SYNC:
+        _applyViews(model, {targetId: 1})
+        return
+    buffer = getEventBuffer()
+    buffer.addView(model._meta.label, targetId)
+    _flushIfDue(buffer)
+
+
+class EventFlushLifespan:
+    """
+    ASGI wrapper that answers lifespan events: it flushes buffered events every EVENT_BUFFER_FLUSH_INTERVAL seconds
+    while the server runs and once more on shutdown. Everything else goes to the wrapped Django application.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.application(scope, receive, send)
+
+        global _flushLoopRunning
+        task = None
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if settings.EVENT_BUFFER_BACKEND != EventBufferBackend.SYNC:
+                    task = asyncio.create_task(self.flushLoop())
+                    _flushLoopRunning = True
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if task is not None:
+                    task.cancel()
+                    _flushLoopRunning = False
+                    await sync_to_async(_flushOffThread, thread_sensitive=False)()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def flushLoop(self):
+        while True:
+            await asyncio.sleep(settings.EVENT_BUFFER_FLUSH_INTERVAL)
+            try:
+                await sync_to_async(_flushOffThread, thread_sensitive=False)()
+            except Exception:
+                logger.exception('Flushing buffered events failed')
@@ -0,0 +1,139 @@
+import hashlib
+import io
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from apps.core.cache import invalidateCachedObject
+from apps.core.tasks import enqueue
+
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+# Square kinds are centre-cropped, the others keep their aspect ratio and are bounded by width.
+SQUARE_KINDS = {'avatar', 'logo'}
+ENCODERS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpeg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+
+
+def validateImage(file):
+    """
+    Rejects uploads that are too large, not an allowed format or would decode to more than IMAGE_MAX_PIXELS, reading
+    only the header so a decompression bomb is never decoded.
+    """
+    if file.size > settings.IMAGE_MAX_UPLOAD_BYTES:
+        raise ValidationError(f'Images must be smaller than {settings.IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)}MB.')
+    try:
+        position = file.tell()
+        with Image.open(file) as image:
+            imageFormat, (width, height) = image.format, image.size
+        file.seek(position)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValidationError('Upload a valid image.')
+    if imageFormat not in ALLOWED_IMAGE_FORMATS:
+        raise ValidationError(f'{imageFormat} images are not supported.')
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(f'Images may have at most {settings.IMAGE_MAX_PIXELS} pixels.')
+
+
+def decodeImage(file, largest: int):
+    """
+    Opens the upload decoded at no more than roughly `largest` pixels across: draft() lets the JPEG decoder scale down
+    by up to 8x while decoding, so a large photo never sits in memory at full size. EXIF orientation is applied and
+    the result is a plain RGB or RGBA image without any of the source's metadata.
+    """
+    image = Image.open(file)
+    if image.size[0] * image.size[1] > settings.IMAGE_MAX_PIXELS:
+        raise ValueError(f'{image.size[0]}x{image.size[1]} is more than IMAGE_MAX_PIXELS')
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    hasAlpha = image.mode in {'RGBA', 'LA', 'PA'} or (image.mode == 'P' and 'transparency' in image.info)
+    return image.convert('RGBA' if hasAlpha else 'RGB')
+
+
+def resizeImage(image, kind: str, size: int):
+    if kind in SQUARE_KINDS:
+        return ImageOps.fit(image, (size, size), Image.LANCZOS)
+    if image.width <= size:
+        return image.copy()
+    return image.resize((size, round(image.height * size / image.width)), Image.LANCZOS)
+
+
+def encodeImage(image, imageFormat: str):
+    name, options = ENCODERS[imageFormat]
+    if name == 'JPEG' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    output = io.BytesIO()
+    # Only pixels are written: no EXIF, ICC or text chunks from the upload survive.
+    image.save(output, name, quality=settings.IMAGE_VARIANT_QUALITY, **options)
+    return output.getvalue()
+
+
+def storeVariant(kind: str, content: bytes, imageFormat: str):
+    # Named after the content hash, so the file never changes under its URL and can be cached forever.
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    path = f'variants/{kind}/{digest[:2]}/{digest}.{imageFormat}'
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+    return path
+
+
+def buildVariants(file, kind: str):
+    """
+    {'<size>': {'webp': path, 'jpeg': path}} for every IMAGE_VARIANT_SIZES size of the kind, from a single decode.
+    """
+    sizes = sorted(settings.IMAGE_VARIANT_SIZES[kind], reverse=True)
+    with decodeImage(file, sizes[0]) as image:
+        variants = {}
+        for size in sizes:
+            resized = resizeImage(image, kind, size)
+            variants[str(size)] = {
+                imageFormat: storeVariant(kind, encodeImage(resized, imageFormat), imageFormat)
+                for imageFormat in settings.IMAGE_VARIANT_FORMATS
+            }
+    return variants
+
+
+def processImageField(label: str, pk: int, fieldName: str):
+    """
+    Background task: builds the variants of one image field and stores them with the upload's name under 'source',
+    unless the image was replaced in the meantime.
+    """
+    model = apps.get_model(label)
+    variantsField = f'{fieldName}Variants'
+    instance = model.objects.filter(pk=pk).only(fieldName).first()
+    if instance is None:
+        return
+    image = getattr(instance, fieldName)
+    variants = {}
+    if image:
+        with image.open('rb') as file:
+            variants = buildVariants(file, dict(model.IMAGE_FIELDS)[fieldName])
+        variants['source'] = image.name
+    unchanged = Q(**{fieldName: image.name}) if image else Q(**{fieldName: ''}) | Q(**{f'{fieldName}__isnull': True})
+    model.objects.filter(unchanged, pk=pk).update(**{variantsField: variants})
+    invalidateCachedObject(model, pk)
+
+
+def queueImageVariants(instance, updateFields=None):
+    # Called from post_save: queues a rebuild for every image field whose upload differs from its variants' source.
+    for fieldName, _ in type(instance).IMAGE_FIELDS:
+        if updateFields is not None and fieldName not in updateFields:
+            continue
+        name = getattr(instance, fieldName).name or ''
+        if name != (getattr(instance, f'{fieldName}Variants') or {}).get('source', ''):
+            enqueue(processImageField, instance._meta.label, instance.pk, fieldName)
+
+
+def variantUrls(variants: dict):
+    return {
+        size: {imageFormat: default_storage.url(path) for imageFormat, path in formats.items()}
+        for size, formats in (variants or {}).items() if size != 'source'
+    }
@@ -0,0 +1,369 @@
+import csv
+import datetime
+import io
+import json
+import os
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.comments.models import PostComment
+from apps.communities.models import Community, CommunityFlair
+from apps.core.cache import invalidateCachedObject
+from apps.core.search import refreshSearchVectors
+from apps.posts.models import Post
+from apps.posts.utils import refreshPostRankings
+
+# Columns holding lists of usernames; in CSV files they are space separated.
+USER_LIST_FIELDS = ('likes', 'dislikes', 'followers', 'bookmark', 'mentionedUsers')
+
+
+def readRecords(path: str, chunkSize: int):
+    """
+    Streams a .jsonl or .csv dump as lists of at most chunkSize records, so memory stays flat however large the file.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if path.endswith('.csv'):
+            records = (
+                {key: value.split() if key in USER_LIST_FIELDS else value for key, value in row.items()}
+                for row in csv.DictReader(file)
+            )
+        else:
+            records = (json.loads(line) for line in file if line.strip())
+
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) == chunkSize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def parseTimestamp(value):
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, datetime.timezone.utc)
+
+
+def parseBoolean(value):
+    if isinstance(value, str):
+        return value.strip().lower() in {'1', 'true', 'yes'}
+    return bool(value)
+
+
+@contextmanager
+def preservedTimestamps(*models):
+    # bulk_create still runs pre_save, which would stamp created/modified with the import time.
+    fields = [field for model in models for field in model._meta.concrete_fields if field.name in {'created', 'modified'}]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, autoNow, autoNowAdd in flags:
+            field.auto_now, field.auto_now_add = autoNow, autoNowAdd
+
+
+def reserveIds(model, count: int):
+    """
+    Takes `count` ids from the table's sequence up front, so rows can reference each other (a reply its parent in the
+    same chunk) before they are inserted.
+    """
+    if not count:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def copyThroughRows(relation, pairs):
+    """
+    Loads (source id, user id) pairs into a many-to-many through table with COPY into a temporary staging table and one
+    INSERT ... ON CONFLICT DO NOTHING, so pairs that already exist are skipped. Must run inside a transaction.
+    """
+    if not pairs:
+        return 0
+    field = relation.field
+    through = relation.through._meta
+    quote = connection.ops.quote_name
+    table = quote(through.db_table)
+    source = quote(through.get_field(field.m2m_field_name()).column)
+    target = quote(through.get_field(field.m2m_reverse_field_name()).column)
+    rows = io.StringIO(''.join(f'{sourceId},{targetId}\n' for sourceId, targetId in pairs))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE IF NOT EXISTS import_stage (source bigint, target bigint) ON COMMIT DELETE ROWS'
+        )
+        cursor.copy_expert('COPY import_stage (source, target) FROM STDIN WITH (FORMAT csv)', rows)
+        cursor.execute(
+            f'INSERT INTO {table} ({source}, {target}) SELECT source, target FROM import_stage ON CONFLICT DO NOTHING'
+        )
+        inserted = cursor.rowcount
+        cursor.execute('TRUNCATE import_stage')
+    return inserted
+
+
+class LookupMap:
+    """
+    key -> id for rows that already exist, filled with one query per chunk for the keys it has not seen yet.
+    """
+
+    def __init__(self, queryset, keyField: str):
+        self.queryset = queryset
+        self.keyField = keyField
+        self.ids = {}
+        self.unknown = set()
+
+    def load(self, keys):
+        keys = {key for key in keys if key} - self.ids.keys() - self.unknown
+        if keys:
+            found = dict(self.queryset.filter(**{f'{self.keyField}__in': keys}).values_list(self.keyField, 'pk'))
+            self.ids.update(found)
+            self.unknown |= keys - found.keys()
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+class DumpImporter:
+    """
+    Imports posts and comments (with their likes, dislikes, followers, bookmarks and mentions) chunk by chunk. Rows are
+    written with bulk_create and the through tables with COPY; signals and TimeStampedModel.save are bypassed, so
+    finish() recomputes what they would have maintained: comment and reply counts, rankings and search vectors.
+
+    Records refer to each other by the dump's own ids. Comments must come after their post and their parent comment,
+    in this import or in an earlier one whose ids were kept with saveIdMap. With resolveExisting, an id found in
+    neither is taken as the primary key of a post or comment already in the database.
+    """
+
+    def __init__(self, batchSize: int = 1000, resolveExisting: bool = False):
+        self.batchSize = batchSize
+        self.resolveExisting = resolveExisting
+        self.users = LookupMap(User.objects, 'username')
+        self.communities = LookupMap(Community.objects, 'name')
+        self.flairs = {}
+        self.postIds = {}
+        self.existingPosts = LookupMap(Post.objects, 'pk')
+        self.commentIds = {}
+        self.existingComments = LookupMap(PostComment.objects, 'pk')
+        self.firstPostPk = None
+        self.firstCommentPk = None
+        self.commentedPostIds = set()
+        self.repliedCommentIds = set()
+        self.skipped = Counter()
+
+    def userIds(self, usernames):
+        return list(dict.fromkeys(self.users.get(name) for name in usernames or [] if self.users.get(name)))
+
+    def flairId(self, communityId: int, name: str):
+        if not name:
+            return None
+        if communityId not in self.flairs:
+            self.flairs[communityId] = dict(
+                CommunityFlair.objects.filter(community_id=communityId).values_list('name', 'pk')
+            )
+        return self.flairs[communityId].get(name)
+
+    def loadIdMap(self, path: str):
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                ids = json.load(file)
+            self.postIds.update(ids['posts'])
+            self.commentIds.update(ids['comments'])
+
+    def saveIdMap(self, path: str):
+        # Written aside and renamed, so an interrupted run leaves the previous map intact.
+        with open(f'{path}.part', 'w', encoding='utf-8') as file:
+            json.dump({'posts': self.postIds, 'comments': self.commentIds}, file)
+        os.replace(f'{path}.part', path)
+
+    def loadExisting(self, existing: LookupMap, keys):
+        if self.resolveExisting:
+            existing.load(int(key) for key in keys if key.isdigit())
+
+    def postId(self, key):
+        key = str(key)
+        if key in self.postIds:
+            return self.postIds[key]
+        return self.existingPosts.get(int(key)) if self.resolveExisting and key.isdigit() else None
+
+    def commentId(self, key: str):
+        if key in self.commentIds:
+            return self.commentIds[key]
+        return self.existingComments.get(int(key)) if self.resolveExisting and key.isdigit() else None
+
+    def recordTimestamps(self, kind: str, record):
+        # A malformed timestamp rejects its row rather than the whole import.
+        try:
+            created = parseTimestamp(record.get('created')) or timezone.now()
+            return created, parseTimestamp(record.get('modified')) or created
+        except (TypeError, ValueError):
+            self.skipped[f'{kind}: invalid timestamp'] += 1
+            return None
+
+    def loadUsers(self, chunk):
+        self.users.load(
+            name for record in chunk for name in [record.get('creator'), *[
+                username for field in USER_LIST_FIELDS for username in record.get(field) or []
+            ]]
+        )
+
+    def importPosts(self, chunk):
+        self.loadUsers(chunk)
+        self.communities.load(record.get('community') for record in chunk)
+        records = []
+        for record in chunk:
+            if record.get('id') is not None and str(record['id']) in self.postIds:
+                self.skipped['post: already imported'] += 1
+            elif self.users.get(record.get('creator')) is None:
+                self.skipped['post: unknown creator'] += 1
+            elif self.communities.get(record.get('community')) is None:
+                self.skipped['post: unknown community'] += 1
+            elif timestamps := self.recordTimestamps('post', record):
+                records.append((record, timestamps))
+
+        posts = []
+        through = defaultdict(list)
+        for pk, (record, (created, modified)) in zip(reserveIds(Post, len(records)), records):
+            communityId = self.communities.get(record['community'])
+            likes, dislikes = self.userIds(record.get('likes')), self.userIds(record.get('dislikes'))
+            followers = self.userIds(record.get('followers'))
+            posts.append(Post(
+                pk=pk,
+                community_id=communityId,
+                creator_id=self.users.get(record['creator']),
+                title=record.get('title', ''),
+                url=record.get('url') or '',
+                content=record.get('content') or '',
+                flair_id=self.flairId(communityId, record.get('flair')),
+                likeCount=len(likes),
+                dislikeCount=len(dislikes),
+                followerCount=len(followers),
+                score=len(likes) - len(dislikes),
+                created=created,
+                modified=modified,
+                edited=False,
+            ))
+            through[Post.likes] += [(pk, userId) for userId in likes]
+            through[Post.dislikes] += [(pk, userId) for userId in dislikes]
+            through[Post.followers] += [(pk, userId) for userId in followers]
+            through[Post.bookmark] += [(pk, userId) for userId in self.userIds(record.get('bookmark'))]
+            if record.get('id') is not None:
+                self.postIds[str(record['id'])] = pk
+
+        with transaction.atomic(), preservedTimestamps(Post):
+            Post.objects.bulk_create(posts, batch_size=self.batchSize)
+            for relation, pairs in through.items():
+                copyThroughRows(relation, pairs)
+        if posts and self.firstPostPk is None:
+            self.firstPostPk = posts[0].pk
+        return len(posts)
+
+    def importComments(self, chunk):
+        self.loadUsers(chunk)
+        self.loadExisting(self.existingPosts, {str(record.get('post')) for record in chunk} - self.postIds.keys())
+        self.loadExisting(self.existingComments, {
+            str(record['parent']) for record in chunk if record.get('parent') not in (None, '')
+        } - self.commentIds.keys())
+        records = []
+        chunkIds = set()
+        for record in chunk:
+            parentKey = str(record['parent']) if record.get('parent') not in (None, '') else None
+            if record.get('id') is not None and str(record['id']) in self.commentIds:
+                self.skipped['comment: already imported'] += 1
+            elif self.users.get(record.get('creator')) is None:
+                self.skipped['comment: unknown creator'] += 1
+            elif self.postId(record.get('post')) is None:
+                self.skipped['comment: unknown post'] += 1
+            elif parentKey is not None and parentKey not in chunkIds and self.commentId(parentKey) is None:
+                self.skipped['comment: unknown parent'] += 1
+            elif timestamps := self.recordTimestamps('comment', record):
+                records.append((record, parentKey, timestamps))
+                if record.get('id') is not None:
+                    chunkIds.add(str(record['id']))
+
+        pks = reserveIds(PostComment, len(records))
+        # Parents imported before this chunk, or already in the database, are read back once for their depth.
+        earlierParents = {
+            self.commentId(parentKey) for _, parentKey, _ in records
+            if parentKey is not None and parentKey not in chunkIds
+        }
+        depths = dict(PostComment.objects.filter(pk__in=earlierParents).values_list('pk', 'depth'))
+
+        comments = []
+        through = defaultdict(list)
+        for pk, (record, parentKey, (created, modified)) in zip(pks, records):
+            parentId = self.commentId(parentKey) if parentKey is not None else None
+            depth = depths[parentId] + 1 if parentId is not None else 0
+            depths[pk] = depth
+            if record.get('id') is not None:
+                self.commentIds[str(record['id'])] = pk
+
+            likes, dislikes = self.userIds(record.get('likes')), self.userIds(record.get('dislikes'))
+            postId = self.postId(record['post'])
+            comments.append(PostComment(
+                pk=pk,
+                post_id=postId,
+                parent_id=parentId,
+                depth=depth,
+                creator_id=self.users.get(record['creator']),
+                _comment=record.get('comment') or '',
+                isRemoved=parseBoolean(record.get('isRemoved', False)),
+                likeCount=len(likes),
+                dislikeCount=len(dislikes),
+                score=len(likes) - len(dislikes),
+                created=created,
+                modified=modified,
+                edited=False,
+            ))
+            through[PostComment.likes] += [(pk, userId) for userId in likes]
+            through[PostComment.dislikes] += [(pk, userId) for userId in dislikes]
+            through[PostComment.mentionedUsers] += [(pk, userId) for userId in self.userIds(record.get('mentionedUsers'))]
+            self.commentedPostIds.add(postId)
+            if parentId is not None:
+                self.repliedCommentIds.add(parentId)
+
+        with transaction.atomic(), preservedTimestamps(PostComment):
+            PostComment.objects.bulk_create(comments, batch_size=self.batchSize)
+            for relation, pairs in through.items():
+                copyThroughRows(relation, pairs)
+        if comments and self.firstCommentPk is None:
+            self.firstCommentPk = comments[0].pk
+        return len(comments)
+
+    def recount(self, model, pks, counterField: str, children):
+        pks = sorted(pks)
+        counts = Coalesce(Subquery(children.order_by().annotate(count=Count('pk')).values('count')), 0)
+        for start in range(0, len(pks), self.batchSize):
+            batch = pks[start:start + self.batchSize]
+            model.objects.filter(pk__in=batch).update(**{counterField: counts})
+            for pk in batch:
+                invalidateCachedObject(model, pk)
+
+    def finish(self):
+        self.recount(
+            Post, self.commentedPostIds, 'commentCount',
+            PostComment.objects.filter(post=OuterRef('pk')).values('post'),
+        )
+        self.recount(
+            PostComment, self.repliedCommentIds, 'replyCount',
+            PostComment.objects.filter(parent=OuterRef('pk')).values('parent'),
+        )
+        if self.firstPostPk is not None:
+            refreshPostRankings(self.batchSize, startPk=self.firstPostPk - 1)
+            refreshSearchVectors(Post, self.batchSize, startPk=self.firstPostPk - 1)
+        if self.firstCommentPk is not None:
+            refreshSearchVectors(PostComment, self.batchSize, startPk=self.firstCommentPk - 1)
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+
+from apps.core.utils import VoteType
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds an EventSource waits before reconnecting after the stream ends.
+LIVE_RETRY_MS = 5000
+
+
+class LiveBrokerBackend(models.TextChoices):
+    MEMORY = 'MEMORY'
+    REDIS = 'REDIS'
+
+
+def postChannel(postId: int):
+    return f'post:{postId}'
+
+
+def formatEvent(eventType: str, data):
+    return f'event: {eventType}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"))}\n\n'
+
+
+class Subscriber:
+    """
+    One open stream. Messages wait here until the stream's writer is ready for them: new comments queue up to
+    LIVE_QUEUE_SIZE, score updates are merged per target so a burst of votes costs one entry. A subscriber that falls
+    further behind is marked overflowed and gets a reset instead of an unbounded backlog. Buffers are only allocated
+    once something arrives, so an idle subscriber is a few hundred bytes.
+    """
+    __slots__ = ('channel', 'loop', 'comments', 'scores', 'overflowed', 'waiter')
+
+    def __init__(self, channel: str, loop):
+        self.channel = channel
+        self.loop = loop
+        self.comments = None
+        self.scores = None
+        self.overflowed = False
+        self.waiter = None
+
+    def deliver(self, message: dict):
+        # Runs on the subscriber's event loop.
+        limit = settings.LIVE_QUEUE_SIZE
+        if message['type'] == 'score':
+            self.scores = self.scores if self.scores is not None else {}
+            key = (message['model'], message['id'])
+            pending = self.scores.get(key)
+            if pending is not None:
+                pending['likeDelta'] += message['likeDelta']
+                pending['dislikeDelta'] += message['dislikeDelta']
+                pending['likeCount'], pending['dislikeCount'] = message['likeCount'], message['dislikeCount']
+            elif len(self.scores) < limit:
+                self.scores[key] = dict(message)
+            else:
+                self.overflowed = True
+        else:
+            self.comments = self.comments if self.comments is not None else []
+            if len(self.comments) < limit:
+                self.comments.append(message)
+            else:
+                self.overflowed = True
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def hasPending(self):
+        return bool(self.overflowed or self.comments or self.scores)
+
+    def drain(self):
+        messages = (self.comments or []) + list((self.scores or {}).values())
+        self.comments = self.scores = None
+        return messages
+
+    async def wait(self, timeout: float):
+        # True once something is pending, False if `timeout` seconds pass first.
+        if self.hasPending():
+            return True
+        self.waiter = self.loop.create_future()
+        try:
+            await asyncio.wait_for(self.waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiter = None
+
+
+def _deliverAll(subscribers, message: dict):
+    for subscriber in subscribers:
+        subscriber.deliver(message)
+
+
+class MemoryLiveBroker:
+    """
+    In-process pub/sub. Publishing is safe from any thread: each event loop holding subscribers of the channel gets
+    one callback that hands the message to all of them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = defaultdict(set)
+        self.subscriberCount = 0
+
+    def subscribe(self, channel: str):
+        subscriber = Subscriber(channel, asyncio.get_running_loop())
+        with self.lock:
+            self.channels[channel].add(subscriber)
+            self.subscriberCount += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self.lock:
+            subscribers = self.channels.get(subscriber.channel)
+            if subscribers is not None and subscriber in subscribers:
+                subscribers.discard(subscriber)
+                self.subscriberCount -= 1
+                if not subscribers:
+                    del self.channels[subscriber.channel]
+
+    def publish(self, channel: str, message: dict):
+        self.dispatch(channel, message)
+
+    def dispatch(self, channel: str, message: dict):
+        with self.lock:
+            subscribers = tuple(self.channels.get(channel, ()))
+        byLoop = defaultdict(list)
+        for subscriber in subscribers:
+            byLoop[subscriber.loop].append(subscriber)
+        for loop, group in byLoop.items():
+            try:
+                loop.call_soon_threadsafe(_deliverAll, group, message)
+            except RuntimeError:
+                # The loop has shut down; its streams are gone with it.
+                pass
+
+
+class RedisLiveBroker(MemoryLiveBroker):
+    """
+    Publishes through Redis pub/sub so subscribers on every process see every message. Each process runs one listener
+    thread, started with its first subscriber, that hands incoming messages to the local subscribers.
+    """
+    channelPrefix = 'live:'
+
+    def __init__(self, location: str):
+        import redis
+
+        super().__init__()
+        self.client = redis.Redis.from_url(location)
+        self.listener = None
+
+    def publish(self, channel: str, message: dict):
+        self.client.publish(self.channelPrefix + channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    def subscribe(self, channel: str):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name='live-broker', daemon=True)
+                self.listener.start()
+        return super().subscribe(channel)
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.channelPrefix + '*')
+                for message in pubsub.listen():
+                    channel = message['channel'].decode()[len(self.channelPrefix):]
+                    self.dispatch(channel, json.loads(message['data']))
+            except Exception:
+                logger.exception('Live update listener lost its Redis connection')
+                time.sleep(1)
+
+
+_broker = None
+_brokerLock = threading.Lock()
+
+
+def getLiveBroker():
+    global _broker
+    with _brokerLock:
+        if _broker is None:
+            if settings.LIVE_BROKER_BACKEND == LiveBrokerBackend.REDIS:
+                if not settings.REDIS_LOCATION:
+                    raise ImproperlyConfigured('LIVE_BROKER_BACKEND REDIS needs REDIS_LOCATION.')
+                _broker = RedisLiveBroker(settings.REDIS_LOCATION)
+            else:
+                _broker = MemoryLiveBroker()
+        return _broker
+
+
+def publishLiveEvent(channel: str, message: dict):
+    # Sent once the surrounding transaction commits, so subscribers never hear about rows they cannot read yet.
+    if settings.LIVE_UPDATES_ENABLED:
+        transaction.on_commit(lambda: getLiveBroker().publish(channel, message))
+
+
+def publishScoreChanges(model, votes: dict, previous: dict):
+    """
+    Publishes one score message per target whose votes changed, to the channel of its post: the like and dislike
+    deltas of the batch and the counters after it. `votes` and `previous` are applyVotes' input and result.
+    """
+    if not settings.LIVE_UPDATES_ENABLED or not previous:
+        return
+    likeDeltas, dislikeDeltas = Counter(), Counter()
+    for pair, before in previous.items():
+        vote = votes[pair]
+        likeDeltas[pair[0]] += int(vote == VoteType.LIKE) - int(before == VoteType.LIKE)
+        dislikeDeltas[pair[0]] += int(vote == VoteType.DISLIKE) - int(before == VoteType.DISLIKE)
+
+    postField = 'post_id' if any(field.name == 'post' for field in model._meta.fields) else 'pk'
+    rows = model.objects.filter(pk__in=likeDeltas.keys() | dislikeDeltas.keys()).values_list(
+        'pk', postField, 'likeCount', 'dislikeCount'
+    )
+    modelName = 'comment' if postField == 'post_id' else 'post'
+    for targetId, postId, likeCount, dislikeCount in rows:
+        publishLiveEvent(postChannel(postId), {
+            'type': 'score',
+            'model': modelName,
+            'id': targetId,
+            'likeDelta': likeDeltas[targetId],
+            'dislikeDelta': dislikeDeltas[targetId],
+            'likeCount': likeCount,
+            'dislikeCount': dislikeCount,
+        })
+
+
+async def eventStream(channel: str):
+    """
+    The body of a text/event-stream response: everything published to `channel` while the client is connected,
+    batched into one write per wake-up, with a comment line every LIVE_HEARTBEAT_SECONDS of silence so proxies keep the
+    connection open and dead clients are noticed. A subscriber that overflowed gets a reset event, telling the client
+    to reload and reconnect, and the stream ends. The subscription is dropped when the client disconnects.
+    """
+    broker = getLiveBroker()
+    subscriber = broker.subscribe(channel)
+    try:
+        yield f'retry: {LIVE_RETRY_MS}\n\n'
+        while True:
+            if not await subscriber.wait(settings.LIVE_HEARTBEAT_SECONDS):
+                yield ': heartbeat\n\n'
+                continue
+            if subscriber.overflowed:
+                yield formatEvent('reset', {'channel': channel})
+                return
+            yield ''.join(formatEvent(message['type'], message) for message in subscriber.drain())
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,38 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmark import runLiveLoadTest
+from apps.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Holds many idle live update streams open on one post in this process, then reports the memory they hold, '
+        'how fast a published event reaches all of them and whether every subscription is released on disconnect.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=2000)
+        parser.add_argument('--messages', type=int, default=10, help='Score events published to measure fan-out.')
+        parser.add_argument('--post', type=int, help='Post to subscribe to, the latest public post by default.')
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--host', default=(settings.ALLOWED_HOSTS or ['localhost'])[0])
+
+    def handle(self, *args, **options):
+        postId = options['post'] or Post.objects.filter(status=Post.Status.PUBLIC).order_by('-pk').values_list(
+            'pk', flat=True
+        ).first()
+        if postId is None:
+            raise CommandError('There is no public post to subscribe to.')
+
+        result = asyncio.run(runLiveLoadTest(
+            postId, options['subscribers'], options['messages'], options['host'], options['timeout']
+        ))
+        self.stdout.write(json.dumps(result, indent=2))
+        if result['connected'] < options['subscribers']:
+            raise CommandError(f'Only {result["connected"]} of {options["subscribers"]} subscribers connected.')
+        if result['leftSubscribed']:
+            raise CommandError(f'{result["leftSubscribed"]} subscriptions were not released on disconnect.')
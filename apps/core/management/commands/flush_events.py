@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.events import flushEvents
+
+
+class Command(BaseCommand):
+    help = 'Writes buffered vote and view events to the database, e.g. from cron when the buffer lives in Redis.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Flushed {flushEvents()} event(s)')
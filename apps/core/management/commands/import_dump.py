@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.ingest import DumpImporter, readRecords
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports posts and comments from .jsonl or .csv dumps in chunks, bypassing per-row saves and signals, then '
+        'recomputes counters, rankings and search vectors for the imported rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', help='Posts dump: id, community, creator, title, url, content, flair, created, '
+                                            'likes, dislikes, followers, bookmark.')
+        parser.add_argument('--comments', help='Comments dump: id, post, parent, creator, comment, isRemoved, '
+                                               'created, likes, dislikes, mentionedUsers. post and parent are ids '
+                                               'from this import or from the --id-map of an earlier one.')
+        parser.add_argument('--id-map', help='JSON file mapping dump ids to database ids. It is read before the '
+                                             'import and written after it, so a later or resumed import can refer '
+                                             'to rows imported earlier and skips records it already imported.')
+        parser.add_argument('--resolve-existing', action='store_true',
+                            help='Treat post and parent ids found neither in the dump nor in the id map as primary '
+                                 'keys of posts and comments already in the database.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options['posts'] and not options['comments']:
+            raise CommandError('Nothing to import: pass --posts and/or --comments.')
+
+        importer = DumpImporter(options['batch_size'], options['resolve_existing'])
+        if options['id_map']:
+            importer.loadIdMap(options['id_map'])
+        started = time.monotonic()
+        try:
+            if options['posts']:
+                self.importFile('posts', options['posts'], importer.importPosts, options['chunk_size'])
+            if options['comments']:
+                self.importFile('comments', options['comments'], importer.importComments, options['chunk_size'])
+        finally:
+            # Chunks are committed one by one, so the map must cover them even if a later chunk failed.
+            if options['id_map']:
+                importer.saveIdMap(options['id_map'])
+
+        finishing = time.monotonic()
+        importer.finish()
+        self.stdout.write(f'Recomputed counters, rankings and search vectors in {time.monotonic() - finishing:.1f}s')
+        for reason, count in sorted(importer.skipped.items()):
+            self.stdout.write(f'Skipped {count} {reason}')
+        self.stdout.write(f'Finished in {time.monotonic() - started:.1f}s')
+
+    def importFile(self, kind: str, path: str, importChunk, chunkSize: int):
+        started = time.monotonic()
+        imported = 0
+        for chunk in readRecords(path, chunkSize):
+            imported += importChunk(chunk)
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{kind}: {imported} imported, {imported / elapsed:.0f} rows/s')
@@ -0,0 +1,49 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import resolve
+
+from apps.core.metrics import getMetrics, getQueryBudget, resetMetrics
+
+
+class Command(BaseCommand):
+    help = (
+        'Requests the given urls through the full middleware stack and prints their query and latency metrics. '
+        'Fails when an endpoint exceeds its declared queryBudget, so it can run against staging data before deploy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--username', help='Log in as this user first.')
+        parser.add_argument('--host', default=(settings.ALLOWED_HOSTS or ['localhost'])[0])
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=options['host'])
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+            if user is None:
+                raise CommandError(f'Unknown user {options["username"]}')
+            client.force_login(user)
+
+        resetMetrics()
+        for url in options['urls']:
+            for _ in range(options['repeat']):
+                response = client.get(url, secure=True)
+                if response.status_code >= 400:
+                    raise CommandError(f'{url} returned {response.status_code}')
+
+        metrics = getMetrics()
+        self.stdout.write(json.dumps(metrics, indent=2))
+        overBudget = []
+        for url in options['urls']:
+            match = resolve(url.split('?')[0])
+            budget = getQueryBudget(match.func)
+            maxQueries = metrics[match.view_name or match._func_path]['queries']['max']
+            if budget is not None and maxQueries > budget:
+                overBudget.append(f'{url}: {maxQueries} queries, budget is {budget}')
+        if overBudget:
+            raise CommandError('Query budget exceeded:\n' + '\n'.join(overBudget))
@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.core.images import processImageField
+
+IMAGE_MODELS = ['profiles.Profile', 'communities.Community']
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds the image variants of existing uploads, e.g. after a change of IMAGE_VARIANT_SIZES. Without --all only '
+        'images whose variants are missing or stale are processed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--model', choices=IMAGE_MODELS, action='append', dest='models')
+        parser.add_argument('--all', action='store_true', help='Rebuild every image, not just stale ones.')
+
+    def handle(self, *args, **options):
+        for label in options['models'] or IMAGE_MODELS:
+            model = apps.get_model(label)
+            for fieldName, _ in model.IMAGE_FIELDS:
+                queryset = model.objects.exclude(Q(**{fieldName: ''}) | Q(**{f'{fieldName}__isnull': True}))
+                rows = queryset.order_by('pk').values_list('pk', fieldName, f'{fieldName}Variants')
+                processed = 0
+                for pk, name, variants in rows.iterator(chunk_size=options['batch_size']):
+                    if options['all'] or (variants or {}).get('source') != name:
+                        processImageField(label, pk, fieldName)
+                        processed += 1
+                self.stdout.write(f'{label}.{fieldName}: processed {processed} image(s)')
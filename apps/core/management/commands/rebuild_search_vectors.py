@@ -0,0 +1,19 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.core.search import refreshSearchVectors
+
+SEARCHABLE_MODELS = ['posts.Post', 'comments.PostComment', 'communities.Community']
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored full-text searchVector columns, e.g. after a backfill or a change of SEARCH_FIELDS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--model', choices=SEARCHABLE_MODELS, action='append', dest='models')
+
+    def handle(self, *args, **options):
+        for label in options['models'] or SEARCHABLE_MODELS:
+            updated = refreshSearchVectors(apps.get_model(label), options['batch_size'])
+            self.stdout.write(f'{label}: updated {updated} row(s)')
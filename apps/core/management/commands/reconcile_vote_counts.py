@@ -0,0 +1,19 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.core.utils import reconcileVoteCounts
+
+VOTABLE_MODELS = ['posts.Post', 'comments.PostComment']
+
+
+class Command(BaseCommand):
+    help = 'Recomputes likeCount, dislikeCount and score from the like/dislike tables where they have drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--model', choices=VOTABLE_MODELS, action='append', dest='models')
+
+    def handle(self, *args, **options):
+        for label in options['models'] or VOTABLE_MODELS:
+            corrected = reconcileVoteCounts(apps.get_model(label), options['batch_size'])
+            self.stdout.write(f'{label}: corrected {corrected} row(s)')
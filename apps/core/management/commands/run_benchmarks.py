@@ -0,0 +1,56 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmark import compareResults, defaultScenarios, runBenchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the feed, thread, profile and search endpoints against the current database and writes latency '
+        'percentiles, query counts and peak memory as JSON. With --baseline, fails on regressions against an earlier '
+        'result file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the results to this file instead of stdout.')
+        parser.add_argument('--baseline', help='Earlier results to compare against.')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 latency and memory growth.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--only', nargs='+', help='Run only these scenarios.')
+        parser.add_argument('--label', help='Stored with the results, e.g. a release name.')
+        parser.add_argument('--host', default=(settings.ALLOWED_HOSTS or ['localhost'])[0])
+
+    def handle(self, *args, **options):
+        scenarios = defaultScenarios()
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+            if not scenarios:
+                raise CommandError(f'No scenarios named {", ".join(options["only"])}')
+
+        results = runBenchmarks(scenarios, options['repeat'], options['warmup'], options['cold'], options['label'],
+                                options['host'])
+        failed = [name for name, result in results['scenarios'].items() if result['status'] >= 400]
+        report = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+        for name, result in results['scenarios'].items():
+            latency = result['latencyMs']
+            self.stderr.write(
+                f'{name}: p50 {latency["p50"]}ms p95 {latency["p95"]}ms, {result["queries"]["max"]} queries, '
+                f'{result["peakMemoryKb"]}KB'
+            )
+        if failed:
+            raise CommandError(f'Scenarios returned errors: {", ".join(failed)}')
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                regressions = compareResults(json.load(file), results, options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
@@ -0,0 +1,128 @@
+import bisect
+import threading
+import time
+from collections import Counter
+
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+_lock = threading.Lock()
+endpointMetrics = {}
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: constant memory per endpoint however many requests it has seen. Percentiles are the upper
+    bound of the bucket they fall into, which is precise enough to spot regressions.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction: float):
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 3),
+        }
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.dbTime = Histogram(LATENCY_BUCKETS)
+        self.totalTime = Histogram(LATENCY_BUCKETS)
+        self.duplicateRequests = 0
+        self.overBudget = 0
+        self.duplicateQueries = Counter()
+
+    def snapshot(self):
+        return {
+            'queries': self.queries.snapshot(),
+            'dbTimeMs': self.dbTime.snapshot(),
+            'totalTimeMs': self.totalTime.snapshot(),
+            'duplicateRequests': self.duplicateRequests,
+            'overBudget': self.overBudget,
+            'topDuplicateQueries': [
+                {'sql': sql, 'requests': count} for sql, count in self.duplicateQueries.most_common(5)
+            ],
+        }
+
+
+class QueryRecorder:
+    """
+    A connection.execute_wrapper that counts and times every query of one request. Queries are grouped by their SQL
+    text with placeholders, so the same statement run once per row of a list (an N+1) shows up as a duplicate.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self, threshold: int):
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+
+def recordRequest(endpoint: str, recorder: QueryRecorder, totalTime: float, duplicates: dict, overBudget: bool):
+    with _lock:
+        metrics = endpointMetrics.get(endpoint)
+        if metrics is None:
+            metrics = endpointMetrics[endpoint] = EndpointMetrics()
+        metrics.queries.observe(recorder.count)
+        metrics.dbTime.observe(recorder.duration * 1000)
+        metrics.totalTime.observe(totalTime * 1000)
+        if duplicates:
+            metrics.duplicateRequests += 1
+            metrics.duplicateQueries.update(duplicates.keys())
+        if overBudget:
+            metrics.overBudget += 1
+
+
+def getMetrics():
+    with _lock:
+        return {endpoint: metrics.snapshot() for endpoint, metrics in sorted(endpointMetrics.items())}
+
+
+def resetMetrics():
+    with _lock:
+        endpointMetrics.clear()
+
+
+def getQueryBudget(view):
+    # Budgets are declared on the view class, e.g. queryBudget = 6, and reached through as_view()'s cls/view_class.
+    viewClass = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+    return getattr(viewClass, 'queryBudget', None)
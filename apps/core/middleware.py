@@ -0,0 +1,78 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from apps.core.metrics import QueryRecorder, getQueryBudget, recordRequest
+from apps.core.routers import isPinnedToPrimary, pinToPrimary, replicaReads, wrotePrimary
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMetricsMiddleware:
+    """
+    Records the query count, duplicate queries, DB time and total time of every request into the per-endpoint
+    histograms of apps.core.metrics, and reports them back in a Server-Timing header. Requests that exceed their
+    view's queryBudget or repeat a statement QUERY_DUPLICATE_THRESHOLD times are logged as warnings.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_METRICS_ENABLED', True)
+        self.duplicateThreshold = getattr(settings, 'QUERY_DUPLICATE_THRESHOLD', 3)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        totalTime = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match is None:
+            return response
+        endpoint = match.view_name or match._func_path
+        budget = getQueryBudget(match.func)
+        overBudget = budget is not None and recorder.count > budget
+        duplicates = recorder.duplicates(self.duplicateThreshold)
+        recordRequest(endpoint, recorder, totalTime, duplicates, overBudget)
+
+        if overBudget:
+            logger.warning('%s ran %d queries, budget is %d', endpoint, recorder.count, budget)
+        for sql, count in duplicates.items():
+            logger.warning('%s ran the same query %d times: %s', endpoint, count, sql)
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", total;dur={totalTime * 1000:.1f}'
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets GET, HEAD and OPTIONS requests read from the replicas, unless the user wrote something within the last
+    REPLICA_STICKY_SECONDS: a request that writes pins its user's reads to the primary for that long, so users always
+    see their own writes. Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        userId = request.user.pk if request.user.is_authenticated else None
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        with replicaReads(safe and not (userId and isPinnedToPrimary(userId))):
+            response = self.get_response(request)
+            wrote = wrotePrimary()
+        if wrote and userId:
+            pinToPrimary(userId)
+        return response
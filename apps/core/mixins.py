@@ -0,0 +1,18 @@
+class PrefetchPlanMixin:
+    """
+    For generic views and viewsets: runs the serializer class's prefetchPlan(queryset, request) over the queryset
+    before it is paginated or looked up, so nested payloads cost a fixed number of queries whatever the page size.
+    Serializers with viewer-specific fields also get attachViewerStates(page, request) once the page is loaded.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        prefetchPlan = getattr(self.get_serializer_class(), 'prefetchPlan', None)
+        return prefetchPlan(queryset, self.request) if prefetchPlan else queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        attachViewerStates = getattr(self.get_serializer_class(), 'attachViewerStates', None)
+        if page is not None and attachViewerStates:
+            attachViewerStates(page, self.request)
+        return page
@@ -0,0 +1,179 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder rounds to milliseconds, which would skip rows created within the same millisecond.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encodeCursor(position: list, reverse: bool = False):
+    payload = json.dumps({'p': position, 'r': reverse}, cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decodeCursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return list(payload['p']), bool(payload['r'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise NotFound('Invalid cursor')
+
+
+def parseOrdering(ordering):
+    # ('-hotRank', '-id') -> [('hotRank', True), ('id', True)]
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def keysetFilter(ordering: list, position: list, reverse: bool = False):
+    """
+    Rows strictly after `position` in the (field, descending) ordering, as a Q the database can answer with a range
+    scan over the matching composite index: (a, b) < (x, y) becomes a <= x AND (a < x OR (a = x AND b < y)).
+    """
+    def lookup(descending, inclusive):
+        before = descending != reverse
+        return ('lte' if inclusive else 'lt') if before else ('gte' if inclusive else 'gt')
+
+    (leadingField, leadingDescending), leadingValue = ordering[0], position[0]
+    after = Q()
+    equal = Q()
+    for (field, descending), value in zip(ordering, position):
+        after |= equal & Q(**{f'{field}__{lookup(descending, False)}': value})
+        equal &= Q(**{field: value})
+    return Q(**{f'{leadingField}__{lookup(leadingDescending, True)}': leadingValue}) & after
+
+
+def parsePosition(model, fields, position: list):
+    """
+    The cursor position converted to the types of the ordering fields; a position of the wrong length or with a value
+    that does not fit its field is an invalid cursor rather than a database error. Fields that are annotations, such
+    as a search rank, must be numbers.
+    """
+    if len(position) != len(fields):
+        raise NotFound('Invalid cursor')
+    parsed = []
+    for field, value in zip(fields, position):
+        try:
+            modelField = model._meta.get_field(field)
+        except FieldDoesNotExist:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise NotFound('Invalid cursor')
+            parsed.append(value)
+            continue
+        try:
+            value = modelField.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if value is None and not modelField.null:
+            raise NotFound('Invalid cursor')
+        parsed.append(value)
+    return parsed
+
+
+def attributeName(instance, field: str):
+    # Annotations such as a search rank are ordinary attributes; model fields are read through their attname.
+    try:
+        return instance._meta.get_field(field).attname
+    except FieldDoesNotExist:
+        return field
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor pagination over the queryset's own ordering. The last ordering field must be unique (normally id)
+    so every row has a distinct position, and no page ever needs an OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'pageSize'
+    max_page_size = 100
+    ordering = ('-created', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.pageSize = self.getPageSize(request)
+        self.ordering = self.getOrdering(queryset, view)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        position, self.reverse = decodeCursor(cursor) if cursor else (None, False)
+        fields = parseOrdering(self.ordering)
+        if position is not None:
+            position = parsePosition(queryset.model, [field for field, _ in fields], position)
+            queryset = queryset.filter(keysetFilter(fields, position, self.reverse))
+        if self.reverse:
+            queryset = queryset.reverse()
+
+        results = list(queryset[:self.pageSize + 1])
+        hasMore = len(results) > self.pageSize
+        results = results[:self.pageSize]
+        if self.reverse:
+            results.reverse()
+
+        # Walking backwards, the extra row means there is an earlier page; the cursor itself proves a later one.
+        hasNext = position is not None if self.reverse else hasMore
+        hasPrevious = hasMore if self.reverse else position is not None
+        self.nextPosition = self.getPosition(results[-1], fields) if results and hasNext else None
+        self.previousPosition = self.getPosition(results[0], fields) if results and hasPrevious else None
+        return results
+
+    def getPageSize(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def getOrdering(self, queryset, view):
+        ordering = tuple(queryset.query.order_by) or getattr(view, 'ordering', None) or self.ordering
+        if not all(isinstance(field, str) for field in ordering):
+            raise ImproperlyConfigured('KeysetPagination only supports orderings made of plain field names.')
+        return ordering
+
+    @staticmethod
+    def getPosition(instance, fields):
+        return [getattr(instance, attributeName(instance, field)) for field, _ in fields]
+
+    def getLink(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encodeCursor(position, reverse))
+
+    def get_next_link(self):
+        return self.getLink(self.nextPosition, False)
+
+    def get_previous_link(self):
+        return self.getLink(self.previousPosition, True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,168 @@
+import datetime
+import functools
+import math
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from apps.communities.models import Community, CommunityMember
+from apps.communities.permissions import getPermissionResolver
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# counterKey is the window counter an allowed hit was counted in, so refundRateLimit can take it back.
+RateLimitResult = namedtuple(
+    'RateLimitResult', ['allowed', 'limit', 'remaining', 'retryAfter', 'counterKey'], defaults=[None]
+)
+
+
+class RateLimitAction(models.TextChoices):
+    POST = 'post'
+    COMMENT = 'comment'
+    VOTE = 'vote'
+    REPORT = 'report'
+    INVITE = 'invite'
+    COMMUNITY = 'community'
+
+
+def parseRate(rate: str):
+    # '10/h' or '10/hour' -> (10, 3600), as in DRF's throttle rates.
+    count, period = rate.split('/')
+    return int(count), RATE_PERIODS[period[0]]
+
+
+def getRateLimit(action: RateLimitAction, user, community: Community = None, membership=None):
+    """
+    (allowed count, period in seconds) for the action: the RATE_LIMITS rate, or the community's override, scaled down
+    by each RATE_LIMIT_FACTORS entry that applies to a new account, a RESTRICTED community or a MUTED member.
+    """
+    rate = settings.RATE_LIMITS[action]
+    if community is not None:
+        rate = settings.RATE_LIMIT_COMMUNITY_OVERRIDES.get(community.name, {}).get(action, rate)
+    count, period = parseRate(rate)
+
+    factors = settings.RATE_LIMIT_FACTORS
+    newAccountAge = datetime.timedelta(days=settings.RATE_LIMIT_NEW_ACCOUNT_DAYS)
+    if user.is_authenticated and timezone.now() - user.date_joined < newAccountAge:
+        count *= factors['NEW_ACCOUNT']
+    if community is not None and community.communityType == Community.Type.RESTRICTED:
+        count *= factors['RESTRICTED_COMMUNITY']
+    if membership is not None and membership[1] == CommunityMember.Status.MUTED:
+        count *= factors['MUTED_MEMBER']
+    return math.ceil(count), period
+
+
+def hitSlidingWindow(key: str, limit: int, period: int, now: float = None):
+    """
+    Counts one hit against `key` and reports whether it fits the limit. The count over the last `period` seconds is
+    estimated from two fixed-window counters, the previous one weighted by how much of it still overlaps the sliding
+    window, so each check is a constant three cache operations however many hits there were. Increments are atomic in
+    Redis; a rejected hit is taken back so hammering does not extend the block.
+    """
+    now = time.time() if now is None else now
+    window, offset = divmod(now, period)
+    currentKey = f'ratelimit:{key}:{int(window)}'
+    previousKey = f'ratelimit:{key}:{int(window) - 1}'
+
+    cache.add(currentKey, 0, period * 2)
+    try:
+        current = cache.incr(currentKey)
+    except ValueError:
+        # The key expired between add and incr.
+        cache.set(currentKey, 1, period * 2)
+        current = 1
+    previous = cache.get(previousKey, 0)
+    weight = 1 - offset / period
+    estimate = previous * weight + current
+    if estimate <= limit:
+        return RateLimitResult(True, limit, int(limit - estimate), 0, currentKey)
+
+    cache.decr(currentKey)
+    current -= 1
+    if current >= limit or not previous:
+        retryAfter = period - offset
+    else:
+        # Seconds until the previous window's share has decayed enough for one more hit.
+        retryAfter = max(0.0, period * (1 - (limit - current - 1) / previous) - offset)
+    return RateLimitResult(False, limit, 0, math.ceil(retryAfter) or 1)
+
+
+def refundRateLimit(result: RateLimitResult):
+    if result.counterKey is None:
+        return
+    try:
+        cache.decr(result.counterKey)
+    except ValueError:
+        # The window has expired, and the hit with it.
+        pass
+
+
+def _ident(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+
+def consumeRateLimit(request, action: RateLimitAction, community: Community = None):
+    # Without a community the limit is per user across the site, with one it is per user within that community.
+    if not settings.RATE_LIMITS_ENABLED:
+        return RateLimitResult(True, None, None, 0)
+    membership = None
+    scope = _ident(request)
+    if community is not None:
+        membership = getPermissionResolver(request).memberships.get(community.pk)
+        scope += f':community:{community.pk}'
+    limit, period = getRateLimit(action, request.user, community, membership)
+    return hitSlidingWindow(f'{action}:{scope}', limit, period)
+
+
+def checkRateLimit(request, action: RateLimitAction, community: Community = None):
+    result = consumeRateLimit(request, action, community)
+    if not result.allowed:
+        # A request the per-community limit rejects does not count against the site-wide one either.
+        siteResult = getattr(request, '_siteRateLimits', {}).pop(action, None)
+        if community is not None and siteResult is not None:
+            refundRateLimit(siteResult)
+        raise Throttled(wait=result.retryAfter)
+    return result
+
+
+def rateLimited(action: RateLimitAction):
+    """
+    Decorator for view handler methods, e.g. a ViewSet's create, that counts each call against the user's site-wide
+    limit for the action and answers 429 once it is used up.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            checkRateLimit(request, action)
+            return handler(view, request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ActionRateThrottle(BaseThrottle):
+    """
+    DRF throttle for views that declare rateLimitAction: every unsafe request counts against the user's site-wide
+    limit for that action. Views add per-community limits with checkRateLimit once they have loaded the community;
+    when that check rejects the request, the site-wide hit is refunded.
+    """
+
+    def allow_request(self, request, view):
+        action = getattr(view, 'rateLimitAction', None)
+        if action is None or request.method in SAFE_METHODS:
+            return True
+        self.result = consumeRateLimit(request, action)
+        if self.result.allowed:
+            request._siteRateLimits = {**getattr(request, '_siteRateLimits', {}), action: self.result}
+        return self.result.allowed
+
+    def wait(self):
+        return self.result.retryAfter
@@ -0,0 +1,73 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replicaReads = ContextVar('replicaReads', default=False)
+_wrotePrimary = ContextVar('wrotePrimary', default=False)
+
+
+def stickyCacheKey(userId: int):
+    return f'replica-sticky:{userId}'
+
+
+def pinToPrimary(userId: int):
+    # The user's reads stay on the primary until the replicas have had time to replay their write.
+    cache.set(stickyCacheKey(userId), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def isPinnedToPrimary(userId: int):
+    return cache.get(stickyCacheKey(userId)) is not None
+
+
+@contextmanager
+def replicaReads(enabled: bool = True):
+    """
+    Lets reads in the block go to a replica (or forces them to the primary with enabled=False). Writes made in the
+    block send its later reads back to the primary, so code always reads what it just wrote.
+    """
+    readsToken = _replicaReads.set(enabled)
+    wroteToken = _wrotePrimary.set(False)
+    try:
+        yield
+    finally:
+        _replicaReads.reset(readsToken)
+        _wrotePrimary.reset(wroteToken)
+
+
+def wrotePrimary():
+    return _wrotePrimary.get()
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random DATABASE_REPLICAS alias inside replicaReads() blocks, which ReplicaRoutingMiddleware opens
+    for safe requests, and everything else to the primary. Reads stay on the primary inside a transaction, after a
+    write in the same block, and for objects that were loaded from the primary. Migrations only run on the primary;
+    replicas get their schema through replication.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _replicaReads.get() or _wrotePrimary.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _wrotePrimary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
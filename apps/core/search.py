@@ -0,0 +1,61 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import models
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+
+class SearchType(models.TextChoices):
+    POSTS = 'POSTS'
+    COMMENTS = 'COMMENTS'
+    COMMUNITIES = 'COMMUNITIES'
+
+
+SEARCH_CONFIG = 'english'
+SEARCH_ORDERING = ('-searchRank', '-id')
+
+
+def buildSearchVector(model):
+    """
+    The weighted tsvector expression for model.SEARCH_FIELDS, e.g. title as A and content as B.
+    """
+    vector = None
+    for field, weight in model.SEARCH_FIELDS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def searchFieldsChanged(model, updateFields):
+    # save(update_fields=[...]) that does not touch any searched field leaves the vector as it is.
+    return updateFields is None or any(field in updateFields for field, _ in model.SEARCH_FIELDS)
+
+
+def refreshSearchVector(model, pk):
+    model.objects.filter(pk=pk).update(searchVector=buildSearchVector(model))
+
+
+def refreshSearchVectors(model, batchSize: int = 1000, startPk: int = 0):
+    """
+    Recomputes searchVector for every row after startPk in keyset batches by primary key, so the backfill never holds
+    a long lock.
+    """
+    updated = 0
+    lastId = startPk
+    queryset = model.objects.order_by('pk').values_list('pk', flat=True)
+    while True:
+        batch = list(queryset.filter(pk__gt=lastId)[:batchSize])
+        if not batch:
+            return updated
+        lastId = batch[-1]
+        updated += model.objects.filter(pk__in=batch).update(searchVector=buildSearchVector(model))
+
+
+def searchQueryset(queryset, query: str):
+    """
+    Rows matching a websearch-style query ("quoted phrases", -excluded, or), ranked by relevance. The rank is cast
+    to double precision so it survives a round trip through a pagination cursor unchanged.
+    """
+    searchQuery = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.filter(searchVector=searchQuery).annotate(
+        searchRank=Cast(SearchRank(F('searchVector'), searchQuery), FloatField())
+    ).order_by(*SEARCH_ORDERING)
@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+from apps.core.images import variantUrls
+from apps.core.utils import VoteType
+
+
+class VoteSerializerVersion1(serializers.Serializer):
+    vote = serializers.ChoiceField(choices=VoteType.choices)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    An image's variants as {'<size>': {'webp': url, 'jpeg': url}}; empty until the background worker has built them.
+    """
+
+    def to_representation(self, value):
+        return variantUrls(value)
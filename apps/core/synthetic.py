@@ -0,0 +1,210 @@
+import datetime
+import itertools
+import random
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from apps.communities.models import Community, CommunityMember
+from apps.core.ingest import DumpImporter, copyThroughRows
+from apps.profiles.models import Profile
+
+WORDS = (
+    'python django postgres reddit music gaming science space movies books travel food photography football news '
+    'history art design cats dogs coffee linux rust cooking fitness running cycling chess anime startups finance '
+    'politics weather climate ocean mountains city garden coding database cache index query latency memory thread '
+    'vote comment community feed search profile follower archive import export mobile web cloud'
+).split()
+
+# Zipf exponents: community sizes and user popularity are heavy tailed, word frequencies mildly so.
+SIZE_EXPONENT = 1.1
+WORD_EXPONENT = 0.8
+
+
+def zipfWeights(count: int, exponent: float):
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class SyntheticDataset:
+    """
+    Generates a skewed, Reddit-shaped dataset: power-law community sizes and memberships, heavy-tailed follower
+    counts and vote distributions, and comment trees that mostly extend recent replies, so threads run deep. Posts and
+    comments are written through DumpImporter, so counters, rankings and search vectors end up as a real import's.
+    The same seed always produces the same dataset.
+    """
+
+    def __init__(self, users: int, communities: int, posts: int, comments: int, seed: int = 0,
+                 batchSize: int = 1000, chunkSize: int = 5000, days: int = 30, progress=None):
+        self.counts = {'users': users, 'communities': communities, 'posts': posts, 'comments': comments}
+        self.random = random.Random(seed)
+        self.prefix = f'synth{seed}_'
+        self.batchSize = batchSize
+        self.chunkSize = chunkSize
+        self.days = days
+        self.progress = progress or (lambda message: None)
+        self.now = timezone.now()
+        self.wordWeights = zipfWeights(len(WORDS), WORD_EXPONENT)
+
+    def text(self, low: int, high: int):
+        return ' '.join(self.random.choices(WORDS, cum_weights=self.wordWeights, k=self.random.randint(low, high)))
+
+    def heavyTail(self, scale: float, cap: int):
+        # Pareto with alpha 1.2: most values are small, a few are orders of magnitude larger.
+        return min(cap, int(scale * (self.random.paretovariate(1.2) - 1)))
+
+    def generate(self):
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise ValueError(f'A dataset with prefix {self.prefix} already exists, pick another seed.')
+        self.createUsers()
+        self.createCommunities()
+        self.createMemberships()
+        self.createFollowers()
+        importer = DumpImporter(self.batchSize)
+        self.importChunks('posts', self.postRecords(), importer.importPosts)
+        self.importChunks('comments', self.commentRecords(), importer.importComments)
+        self.progress('recomputing counters, rankings and search vectors')
+        importer.finish()
+        return dict(self.counts, skipped=sum(importer.skipped.values()))
+
+    def createUsers(self):
+        password = make_password(None)
+        self.usernames = [f'{self.prefix}{index}' for index in range(self.counts['users'])]
+        users = User.objects.bulk_create(
+            [User(username=username, password=password) for username in self.usernames], batch_size=self.batchSize
+        )
+        self.userIds = [user.pk for user in users]
+        self.progress(f'users: {len(users)}')
+
+    def createCommunities(self):
+        communities = Community.objects.bulk_create([
+            Community(
+                name=f'{self.prefix}{index}'[:32],
+                header=self.text(2, 6),
+                description=self.text(10, 40),
+            ) for index in range(self.counts['communities'])
+        ], batch_size=self.batchSize)
+        self.communityNames = [community.name for community in communities]
+        self.communityIds = [community.pk for community in communities]
+        self.communityWeights = zipfWeights(len(communities), SIZE_EXPONENT)
+        self.progress(f'communities: {len(communities)}')
+
+    def createMemberships(self):
+        # The largest community has half of all users; the rest shrink along the Zipf curve.
+        users = len(self.userIds)
+        self.members = []
+        favourites = [[] for _ in range(users)]
+        rows = []
+        for rank, communityId in enumerate(self.communityIds, 1):
+            size = max(1, min(users, int(users * 0.5 / rank ** SIZE_EXPONENT)))
+            members = self.random.sample(range(users), size)
+            self.members.append(members)
+            for position, userIndex in enumerate(members):
+                rows.append(CommunityMember(
+                    community_id=communityId,
+                    user_id=self.userIds[userIndex],
+                    memberType=CommunityMember.MemberTypes.ADMIN if position == 0 else CommunityMember.MemberTypes.MEMBER,
+                ))
+                if len(favourites[userIndex]) < 10:
+                    favourites[userIndex].append(self.communityNames[rank - 1])
+        with transaction.atomic():
+            CommunityMember.objects.bulk_create(rows, batch_size=self.batchSize)
+            Profile.objects.bulk_create([
+                Profile(user_id=userId, favouriteCommunities=favourites[index], mutedCommunities=[])
+                for index, userId in enumerate(self.userIds)
+            ], batch_size=self.batchSize)
+        self.progress(f'memberships: {len(rows)}')
+
+    def createFollowers(self):
+        # Who gets followed is Zipf distributed over users, how many each user follows is heavy tailed.
+        profileIds = dict(Profile.objects.filter(user_id__in=self.userIds).values_list('user_id', 'pk'))
+        popularity = zipfWeights(len(self.userIds), SIZE_EXPONENT)
+        pairs = set()
+        for userId in self.userIds:
+            for followed in self.random.choices(self.userIds, cum_weights=popularity, k=self.heavyTail(5, 500)):
+                if followed != userId:
+                    pairs.add((profileIds[followed], userId))
+        # COPY bypasses the m2m signals that keep the follow counters.
+        followerCounts = Counter(profileId for profileId, _ in pairs)
+        followingCounts = Counter(userId for _, userId in pairs)
+        with transaction.atomic():
+            copyThroughRows(Profile.followers, sorted(pairs))
+            Profile.objects.bulk_update([
+                Profile(
+                    pk=profileIds[userId],
+                    followerCount=followerCounts[profileIds[userId]],
+                    followingCount=followingCounts[userId],
+                ) for userId in self.userIds
+            ], ['followerCount', 'followingCount'], batch_size=self.batchSize)
+        self.progress(f'followers: {len(pairs)}')
+
+    def voters(self, memberIndexes, cap: int):
+        count = min(len(memberIndexes), self.heavyTail(3, cap))
+        voters = [self.usernames[index] for index in self.random.sample(memberIndexes, count)]
+        # Mostly upvotes, with some controversial outliers.
+        split = int(count * self.random.betavariate(8, 2))
+        return voters[:split], voters[split:]
+
+    def timestamp(self, after: datetime.datetime = None):
+        start = after or self.now - datetime.timedelta(days=self.days)
+        return start + (self.now - start) * self.random.random()
+
+    def postRecords(self):
+        self.posts = []
+        for index in range(self.counts['posts']):
+            rank = self.random.choices(range(len(self.communityIds)), cum_weights=self.communityWeights)[0]
+            members = self.members[rank]
+            likes, dislikes = self.voters(members, 5000)
+            created = self.timestamp()
+            self.posts.append((index, rank, len(likes) + 1, created))
+            yield {
+                'id': index,
+                'community': self.communityNames[rank],
+                'creator': self.usernames[self.random.choice(members)],
+                'title': self.text(3, 12).capitalize(),
+                'content': self.text(20, 120),
+                'created': created.isoformat(),
+                'likes': likes,
+                'dislikes': dislikes,
+                'followers': [self.usernames[index] for index in self.random.sample(members, min(len(members), 3))],
+            }
+
+    def commentRecords(self):
+        # Popular posts draw most of the comments.
+        weights = list(itertools.accumulate(weight for _, _, weight, _ in self.posts))
+        perPost = [0] * len(self.posts)
+        for postIndex in self.random.choices(range(len(self.posts)), cum_weights=weights, k=self.counts['comments']):
+            perPost[postIndex] += 1
+
+        commentId = itertools.count()
+        for (postIndex, rank, _, postCreated), count in zip(self.posts, perPost):
+            members = self.members[rank]
+            thread = []
+            for _ in range(count):
+                # A new top-level comment a third of the time, otherwise a reply to one of the latest comments.
+                parent = None if not thread or self.random.random() < 0.3 else self.random.choice(thread[-5:])
+                depth = parent[1] + 1 if parent else 0
+                if depth > 100:
+                    parent, depth = None, 0
+                likes, dislikes = self.voters(members, 500)
+                pk = next(commentId)
+                created = self.timestamp(parent[2] if parent else postCreated)
+                thread.append((pk, depth, created))
+                yield {
+                    'id': pk,
+                    'post': postIndex,
+                    'parent': parent[0] if parent else None,
+                    'creator': self.usernames[self.random.choice(members)],
+                    'comment': self.text(5, 60),
+                    'created': created.isoformat(),
+                    'likes': likes,
+                    'dislikes': dislikes,
+                }
+
+    def importChunks(self, kind: str, records, importChunk):
+        imported = 0
+        while chunk := list(itertools.islice(records, self.chunkSize)):
+            imported += importChunk(chunk)
+            self.progress(f'{kind}: {imported}')
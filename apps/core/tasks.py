@@ -0,0 +1,83 @@
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, models, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class TaskBackend(models.TextChoices):
+    THREAD = 'THREAD'
+    SYNC = 'SYNC'
+
+
+DEFAULT_QUEUE = 'default'
+
+# Queue name -> (pending tasks, worker threads).
+_queues = {}
+_workersLock = threading.Lock()
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(func, '__name__', func))
+    finally:
+        close_old_connections()
+
+
+def _work(tasks: queue.Queue):
+    while True:
+        func, args, kwargs = tasks.get()
+        try:
+            _run(func, args, kwargs)
+        finally:
+            tasks.task_done()
+
+
+def _startWorkers(queueName: str):
+    # The default queue has TASK_WORKERS threads, every other queue the number TASK_QUEUES gives it.
+    count = settings.TASK_WORKERS if queueName == DEFAULT_QUEUE else settings.TASK_QUEUES[queueName]
+    with _workersLock:
+        tasks, workers = _queues.setdefault(queueName, (queue.Queue(maxsize=10000), []))
+        while len(workers) < count:
+            worker = threading.Thread(
+                target=_work, args=(tasks,), name=f'task-{queueName}-{len(workers)}', daemon=True
+            )
+            worker.start()
+            workers.append(worker)
+    return tasks
+
+
+def _submit(queueName: str, func, args, kwargs):
+    if settings.TASK_BACKEND == TaskBackend.SYNC:
+        _run(func, args, kwargs)
+        return
+    tasks = _startWorkers(queueName)
+    try:
+        tasks.put_nowait((func, args, kwargs))
+    except queue.Full:
+        # Back-pressure: a saturated worker pool slows the caller down rather than dropping work.
+        _run(func, args, kwargs)
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Runs func(*args, **kwargs) on an in-process worker thread once the current transaction commits, so the task
+    sees the rows the caller wrote and the caller does not wait for it. Tasks do not survive a process restart.
+    """
+    enqueueOn(DEFAULT_QUEUE, func, *args, **kwargs)
+
+
+def enqueueOn(queueName: str, func, *args, **kwargs):
+    # Like enqueue, on one of the TASK_QUEUES, so long tasks cannot hold up the short ones on the shared workers.
+    transaction.on_commit(lambda: _submit(queueName, func, args, kwargs))
+
+
+def waitForTasks():
+    # Blocks until every queued task has run, e.g. in tests or before shutdown.
+    for tasks, _ in list(_queues.values()):
+        tasks.join()
@@ -0,0 +1,27 @@
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from apps.core.metrics import getQueryBudget
+
+
+class QueryBudgetMixin:
+    """
+    For django.test.TestCase: assertWithinQueryBudget(url) requests the url with self.client and fails, listing the
+    queries, when it runs more than the view's declared queryBudget.
+    """
+
+    def assertWithinQueryBudget(self, url: str, budget: int = None, method: str = 'get', **kwargs):
+        if budget is None:
+            budget = getQueryBudget(resolve(urlsplit(url).path).func)
+            if budget is None:
+                self.fail(f'{url} does not declare a queryBudget')
+
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, **kwargs)
+        if len(context) > budget:
+            queries = '\n'.join(f'{index}. {query["sql"]}' for index, query in enumerate(context.captured_queries, 1))
+            self.fail(f'{url} ran {len(context)} queries, budget is {budget}:\n{queries}')
+        return response
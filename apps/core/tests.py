@@ -1,3 +1,101 @@
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from apps.core.middleware import ReplicaRoutingMiddleware
+from apps.core.routers import ReplicaRouter, isPinnedToPrimary, replicaReads
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def testReadsGoToThePrimaryOutsideReplicaBlocks(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def testReadsGoToAReplicaInsideReplicaBlocks(self):
+        with replicaReads():
+            self.assertEqual(self.router.db_for_read(User), 'replica0')
+            with replicaReads(False):
+                self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(self.router.db_for_read(User), 'replica0')
+
+    def testReadsAfterAWriteGoToThePrimary(self):
+        with replicaReads():
+            self.assertEqual(self.router.db_for_write(User), 'default')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        with replicaReads():
+            self.assertEqual(self.router.db_for_read(User), 'replica0')
+
+    def testObjectsLoadedFromThePrimaryStayThere(self):
+        user = User(pk=1)
+        user._state.db = 'default'
+        with replicaReads():
+            self.assertEqual(self.router.db_for_read(User, instance=user), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def testReadsGoToThePrimaryWithoutReplicas(self):
+        with replicaReads():
+            self.assertEqual(self.router.db_for_read(User), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class ReplicaRoutingMiddlewareTests(TransactionTestCase):
+    # Not a TestCase: its transaction around each test would keep every read on the primary.
+    databases = {'default', 'replica0'}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user('replica-reader')
+
+    def request(self, method: str, user, handler):
+        request = getattr(self.factory, method)('/')
+        request.user = user
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica0']) as replica:
+                ReplicaRoutingMiddleware(handler)(request)
+        return len(primary), len(replica)
+
+    @staticmethod
+    def read(request):
+        User.objects.exists()
+        return HttpResponse()
+
+    @staticmethod
+    def write(request):
+        User.objects.filter(pk=request.user.pk).update(first_name='Written')
+        User.objects.exists()
+        return HttpResponse()
+
+    @staticmethod
+    def readInTransaction(request):
+        with transaction.atomic():
+            User.objects.exists()
+        return HttpResponse()
+
+    def testSafeRequestsReadFromAReplica(self):
+        self.assertEqual(self.request('get', AnonymousUser(), self.read), (0, 1))
+        self.assertEqual(self.request('get', self.user, self.read), (0, 1))
+
+    def testUnsafeRequestsReadFromThePrimary(self):
+        self.assertEqual(self.request('post', AnonymousUser(), self.read), (1, 0))
+
+    def testWritesPinTheUsersReadsToThePrimary(self):
+        self.assertEqual(self.request('post', self.user, self.write), (2, 0))
+        self.assertTrue(isPinnedToPrimary(self.user.pk))
+        self.assertEqual(self.request('get', self.user, self.read), (1, 0))
+        # Other users are not pinned.
+        self.assertEqual(self.request('get', AnonymousUser(), self.read), (0, 1))
+
+    def testWritesInSafeRequestsSendLaterReadsToThePrimary(self):
+        self.assertEqual(self.request('get', self.user, self.write), (2, 0))
+        self.assertTrue(isPinnedToPrimary(self.user.pk))
+
+    def testReadsInsideAtomicBlocksGoToThePrimary(self):
+        primary, replica = self.request('get', AnonymousUser(), self.readInTransaction)
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
@@ -1,7 +1,11 @@
+from django.urls import path
+
 from apps.core.views import *
 
 app_name = 'core'
 
 urlpatterns = [
-
+    path('v1/cache-stats/', CacheStatsApiEventVersion1.as_view(), name='cache-stats-v1'),
+    path('v1/metrics/', QueryMetricsApiEventVersion1.as_view(), name='metrics-v1'),
+    path('v1/search/', SearchApiEventVersion1.as_view(), name='search-v1'),
 ]
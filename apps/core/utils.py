@@ -0,0 +1,153 @@
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import models
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from apps.core.cache import invalidateCachedObject
+
+
+class VoteType(models.IntegerChoices):
+    DISLIKE = -1
+    NONE = 0
+    LIKE = 1
+
+
+def sourceKey(relation):
+    # Column of the auto-created through table (e.g. posts_post_likes.post_id) pointing at the voted object.
+    return f'{relation.field.m2m_field_name()}_id'
+
+
+def _votersFor(relation, instance):
+    return relation.through.objects.filter(**{sourceKey(relation): instance.pk})
+
+
+def _counterUpdates(model, likeCount, dislikeCount):
+    updates = {'likeCount': likeCount, 'dislikeCount': dislikeCount, 'score': likeCount - dislikeCount}
+    # Ranked models (Post) refresh their stored ranking in the same statement as the counters.
+    if hasattr(model, 'rankingUpdates'):
+        updates.update(model.rankingUpdates(likeCount, dislikeCount))
+    return updates
+
+
+def getVote(instance, userId: int):
+    model = type(instance)
+    if _votersFor(model.likes, instance).filter(user_id=userId).exists():
+        return VoteType.LIKE
+    if _votersFor(model.dislikes, instance).filter(user_id=userId).exists():
+        return VoteType.DISLIKE
+    return VoteType.NONE
+
+
+def _pairsFilter(relation, pairs):
+    source = sourceKey(relation)
+    return reduce(or_, (Q(**{source: targetId, 'user_id': userId}) for targetId, userId in pairs))
+
+
+def _deltaCase(deltas):
+    return Case(*[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()], default=Value(0))
+
+
+def applyVotes(model, votes: dict):
+    """
+    Moves many votes on a Post or PostComment model at once: `votes` maps (targetId, userId) to the VoteType the pair
+    should end up with. The through tables change with one delete and one insert per relation and the counters of
+    every touched target with a single UPDATE. Returns {(targetId, userId): previous vote} for pairs that changed.
+    """
+    if not votes:
+        return {}
+    relations = {VoteType.LIKE: model.likes, VoteType.DISLIKE: model.dislikes}
+    with transaction.atomic():
+        # Serialise votes on the same targets so the through tables and the counters cannot drift apart. Locking in
+        # id order keeps concurrent batches from deadlocking each other.
+        targetIds = set(model.objects.select_for_update().filter(
+            pk__in={targetId for targetId, _ in votes}
+        ).order_by('pk').values_list('pk', flat=True))
+        votes = {pair: vote for pair, vote in votes.items() if pair[0] in targetIds}
+        if not votes:
+            return {}
+
+        previous = {}
+        for vote, relation in relations.items():
+            voters = relation.through.objects.filter(_pairsFilter(relation, votes))
+            for pair in voters.values_list(sourceKey(relation), 'user_id'):
+                previous[pair] = vote
+        changed = {pair: vote for pair, vote in votes.items() if previous.get(pair, VoteType.NONE) != vote}
+        if not changed:
+            return {}
+
+        likeDeltas, dislikeDeltas = Counter(), Counter()
+        for pair, vote in changed.items():
+            before = previous.get(pair, VoteType.NONE)
+            likeDeltas[pair[0]] += int(vote == VoteType.LIKE) - int(before == VoteType.LIKE)
+            dislikeDeltas[pair[0]] += int(vote == VoteType.DISLIKE) - int(before == VoteType.DISLIKE)
+
+        for vote, relation in relations.items():
+            removed = [pair for pair in changed if previous.get(pair) == vote]
+            if removed:
+                relation.through.objects.filter(_pairsFilter(relation, removed)).delete()
+            relation.through.objects.bulk_create([
+                relation.through(**{sourceKey(relation): targetId, 'user_id': userId})
+                for (targetId, userId), newVote in changed.items() if newVote == vote
+            ])
+
+        # queryset.update() bypasses TimeStampedModel.save() so a vote never marks the target as edited.
+        changedTargets = {targetId for targetId, _ in changed}
+        model.objects.filter(pk__in=changedTargets).update(**_counterUpdates(
+            model, F('likeCount') + _deltaCase(likeDeltas), F('dislikeCount') + _deltaCase(dislikeDeltas)
+        ))
+        for pk in changedTargets:
+            invalidateCachedObject(model, pk)
+    return {pair: previous.get(pair, VoteType.NONE) for pair in changed}
+
+
+def castVote(instance, userId: int, vote: VoteType):
+    """
+    Moves the user's vote on a Post or PostComment to `vote` and keeps likeCount, dislikeCount and score in step
+    with the through tables. Returns the vote the user had before.
+    """
+    pair = (instance.pk, userId)
+    return applyVotes(type(instance), {pair: vote}).get(pair, vote)
+
+
+def _countSubquery(relation):
+    field = relation.field
+    source = field.m2m_field_name()
+    counts = relation.through.objects.filter(**{source: OuterRef('pk')}).order_by().values(source).annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcileVoteCounts(model, batchSize: int = 1000):
+    """
+    Walks the table in primary key order and rewrites the counters of rows that drifted from their through tables.
+    Returns the number of rows that were corrected.
+    """
+    actualLikes = _countSubquery(model.likes)
+    actualDislikes = _countSubquery(model.dislikes)
+    lastPk = 0
+    corrected = 0
+
+    while True:
+        batch = list(model.objects.filter(pk__gt=lastPk).order_by('pk').values_list('pk', flat=True)[:batchSize])
+        if not batch:
+            return corrected
+        lastPk = batch[-1]
+
+        drifted = model.objects.filter(pk__in=batch).annotate(
+            actualLikes=actualLikes,
+            actualDislikes=actualDislikes,
+        ).exclude(
+            likeCount=F('actualLikes'),
+            dislikeCount=F('actualDislikes'),
+            score=F('actualLikes') - F('actualDislikes'),
+        ).values_list('pk', flat=True)
+
+        drifted = list(drifted)
+        corrected += model.objects.filter(pk__in=drifted).update(**_counterUpdates(model, actualLikes, actualDislikes))
+        for pk in drifted:
+            invalidateCachedObject(model, pk)
@@ -1,3 +1,73 @@
-from django.shortcuts import render
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.comments.models import PostComment
+from apps.comments.serializers import PostCommentSerializerVersion1
+from apps.communities.models import Community
+from apps.communities.permissions import getPermissionResolver
+from apps.communities.serializers import CommunitySerializerVersion1
+from apps.core.cache import getCacheStats
+from apps.core.metrics import getMetrics, resetMetrics
+from apps.core.mixins import PrefetchPlanMixin
+from apps.core.search import SEARCH_ORDERING, SearchType, searchQueryset
+from apps.posts.models import Post
+from apps.posts.serializers import PostSerializerVersion1
+
+
+class CacheStatsApiEventVersion1(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(getCacheStats())
+
+
+class QueryMetricsApiEventVersion1(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(getMetrics())
+
+    def delete(self, request):
+        resetMetrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SearchApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    queryBudget = 7
+    ordering = SEARCH_ORDERING
+    serializers = {
+        SearchType.POSTS: PostSerializerVersion1,
+        SearchType.COMMENTS: PostCommentSerializerVersion1,
+        SearchType.COMMUNITIES: CommunitySerializerVersion1,
+    }
+
+    def get_serializer_class(self):
+        return self.serializers[self.searchType]
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        searchType = self.request.query_params.get('type', SearchType.POSTS).upper()
+        communityName = self.request.query_params.get('community')
+        if not query:
+            raise ValidationError({'q': 'This parameter is required.'})
+        if searchType not in SearchType.values:
+            raise ValidationError({'type': f'Expected one of {", ".join(SearchType.values)}.'})
+        self.searchType = SearchType(searchType)
+
+        resolver = getPermissionResolver(self.request)
+        if self.searchType == SearchType.POSTS:
+            queryset = Post.objects.exclude(resolver.hiddenFilter()).exclude(status=Post.Status.DRAFT)
+            if communityName:
+                queryset = queryset.filter(community__name=communityName)
+        elif self.searchType == SearchType.COMMENTS:
+            queryset = PostComment.objects.filter(isRemoved=False).exclude(resolver.hiddenFilter('post__')).exclude(
+                post__status=Post.Status.DRAFT
+            )
+            if communityName:
+                queryset = queryset.filter(post__community__name=communityName)
+        else:
+            queryset = Community.objects.all()
+        return searchQueryset(queryset, query)
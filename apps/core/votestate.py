@@ -0,0 +1,111 @@
+from collections import defaultdict, namedtuple
+
+from django.core.cache import cache
+
+from apps.core.utils import VoteType, sourceKey
+
+VOTE_STATE_TIMEOUT = 60 * 60
+# Ids remembered per user and model before the entry starts over with just the current page.
+VOTE_STATE_MAX_IDS = 5000
+
+ViewerState = namedtuple('ViewerState', ['vote', 'bookmarked'])
+
+
+def stateRelations(model):
+    # Post and PostComment both have likes and dislikes; only posts can be bookmarked.
+    relations = {'likes': model.likes, 'dislikes': model.dislikes}
+    if hasattr(model, 'bookmark'):
+        relations['bookmark'] = model.bookmark
+    return relations
+
+
+def voteStateKey(model, userId: int):
+    return f'vote-state:{model._meta.label_lower}:{userId}'
+
+
+def _emptyState(model):
+    return {'known': set(), **{name: set() for name in stateRelations(model)}}
+
+
+def _viewerState(state, targetId: int):
+    if targetId in state['likes']:
+        vote = VoteType.LIKE
+    elif targetId in state['dislikes']:
+        vote = VoteType.DISLIKE
+    else:
+        vote = VoteType.NONE
+    return ViewerState(vote, targetId in state.get('bookmark', ()))
+
+
+def getViewerStates(model, userId: int, ids):
+    """
+    {id: ViewerState(vote, bookmarked)} of the user for every id. The user's entry in the cache holds the ids already
+    looked up and, per relation, the ones among them the user is in; ids it does not know cost one query per relation
+    for the whole batch, over the through tables' user_id index.
+    """
+    ids = set(ids)
+    if not ids:
+        return {}
+    key = voteStateKey(model, userId)
+    state = cache.get(key) or _emptyState(model)
+    missing = ids - state['known']
+    if missing:
+        for name, relation in stateRelations(model).items():
+            source = sourceKey(relation)
+            state[name] |= set(relation.through.objects.filter(
+                user_id=userId, **{f'{source}__in': missing}
+            ).values_list(source, flat=True))
+        state['known'] |= missing
+        if len(state['known']) > VOTE_STATE_MAX_IDS:
+            state = {name: values & ids for name, values in state.items()}
+        cache.set(key, state, VOTE_STATE_TIMEOUT)
+    return {targetId: _viewerState(state, targetId) for targetId in ids}
+
+
+def updateVoteStates(model, votes: dict):
+    """
+    Writes new votes, {(targetId, userId): VoteType}, into the cached entries of users that have one. Users without an
+    entry are left alone; their next lookup reads the database.
+    """
+    byUser = defaultdict(dict)
+    for (targetId, userId), vote in votes.items():
+        byUser[userId][targetId] = VoteType(vote)
+    keys = {userId: voteStateKey(model, userId) for userId in byUser}
+    cached = cache.get_many(keys.values())
+
+    updated = {}
+    for userId, userVotes in byUser.items():
+        state = cached.get(keys[userId])
+        if state is None:
+            continue
+        for targetId, vote in userVotes.items():
+            state['likes'].discard(targetId)
+            state['dislikes'].discard(targetId)
+            if vote == VoteType.LIKE:
+                state['likes'].add(targetId)
+            elif vote == VoteType.DISLIKE:
+                state['dislikes'].add(targetId)
+            state['known'].add(targetId)
+        updated[keys[userId]] = state
+    if updated:
+        cache.set_many(updated, VOTE_STATE_TIMEOUT)
+
+
+def forgetVoteStates(model, userIds):
+    cache.delete_many([voteStateKey(model, userId) for userId in userIds])
+
+
+def attachViewerStates(model, instances, request):
+    """
+    Sets viewerVote (and viewerBookmarked where the model has bookmarks) on already loaded instances for the request's
+    user. Anonymous requests get None.
+    """
+    instances = list(instances)
+    user = getattr(request, 'user', None)
+    states = getViewerStates(model, user.pk, [instance.pk for instance in instances]) if user and \
+        user.is_authenticated else {}
+    for instance in instances:
+        state = states.get(instance.pk)
+        instance.viewerVote = state.vote if state else None
+        instance.viewerBookmarked = state.bookmarked if state else None
+    return instances
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import re
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest, parse_cookie
+from django.http.request import split_domain_port, validate_host
+
+from apps.communities.permissions import CommunityPermissionResolver
+from apps.core.live import eventStream, getLiveBroker, postChannel
+from apps.posts.models import Post
+
+LIVE_PATH = re.compile(r'^/posts/v1/post/(?P<postId>\d+)/live/$')
+ERROR_DETAILS = {
+    400: 'Invalid host.',
+    403: 'You do not have permission to perform this action.',
+    404: 'Not found.',
+    405: 'Method not allowed.',
+    503: 'Too many live connections, try again later.',
+}
+
+
+def authorizeLiveStream(host: str, postId: int, sessionKey: str = None):
+    """
+    HTTP status for a live stream request: 200 if the session's user (or an anonymous visitor) may view the post, the
+    error status otherwise. Runs in the shared thread pool and hands its database connection back when done.
+    """
+    close_old_connections()
+    try:
+        allowedHosts = settings.ALLOWED_HOSTS or (['.localhost', '127.0.0.1', '[::1]'] if settings.DEBUG else [])
+        if not validate_host(split_domain_port(host)[0], allowedHosts):
+            return 400
+        post = Post.objects.select_related('community').exclude(status=Post.Status.DRAFT).filter(pk=postId).first()
+        if post is None:
+            return 404
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(sessionKey)
+        if not CommunityPermissionResolver(get_user(request)).canView(post.community):
+            return 403
+        return 200
+    finally:
+        close_old_connections()
+
+
+class PostLiveApplication:
+    """
+    ASGI wrapper that serves /posts/v1/post/<id>/live/, the server-sent events of one post: `comment` events carry new
+    comments as the comments API returns them, `score` events the coalesced vote changes of the post and its comments,
+    and `reset` asks the client to reload because it fell too far behind. Everything else goes to the wrapped
+    application.
+
+    The stream is served outside Django's request handling because Django gives every request a thread of its own for
+    sync middleware that lives as long as the response, which for streams that idle for hours means a thread per
+    subscriber. Here authorisation runs once in the shared thread pool and an open stream is only a few coroutines.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        match = LIVE_PATH.match(scope['path']) if scope['type'] == 'http' else None
+        if match is None:
+            return await self.application(scope, receive, send)
+
+        message = await receive()
+        while message['type'] == 'http.request' and message.get('more_body'):
+            message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+        status = await self.authorize(scope, int(match['postId']))
+        if status != 200:
+            return await self.sendError(send, status)
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Stops nginx from buffering the stream.
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await self.stream(postChannel(int(match['postId'])), receive, send)
+
+    async def authorize(self, scope, postId: int):
+        if scope['method'] != 'GET':
+            return 405
+        if getLiveBroker().subscriberCount >= settings.LIVE_MAX_SUBSCRIBERS:
+            return 503
+        headers = {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope['headers']}
+        sessionKey = parse_cookie(headers.get('cookie', '')).get(settings.SESSION_COOKIE_NAME)
+        return await sync_to_async(authorizeLiveStream, thread_sensitive=False)(
+            headers.get('host', ''), postId, sessionKey
+        )
+
+    async def sendError(self, send, status: int):
+        headers = [(b'content-type', b'application/json')]
+        if status == 503:
+            headers.append((b'retry-after', str(settings.LIVE_HEARTBEAT_SECONDS).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': json.dumps({'detail': ERROR_DETAILS[status]}).encode()})
+
+    async def stream(self, channel: str, receive, send):
+        # Writes until the stream ends or the client goes away, whichever comes first. A slow client makes send()
+        # wait, which is what lets its subscriber overflow instead of buffering without bound.
+        events = eventStream(channel)
+
+        async def write():
+            async for chunk in events:
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def waitForDisconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        tasks = [asyncio.create_task(write()), asyncio.create_task(waitForDisconnect())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await events.aclose()
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.posts.utils import archivePosts
+
+
+class Command(BaseCommand):
+    help = (
+        'Archives PUBLIC posts older than ARCHIVE_POSTS_AFTER_MONTHS in communities with archivePosts set. Meant to '
+        'run daily from cron; safe to interrupt and re-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.ARCHIVE_POSTS_AFTER_MONTHS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        archived = 0
+
+        def progress(communityId, count):
+            nonlocal archived
+            archived += count
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'community {communityId}: {archived} archived, {archived / elapsed:.0f} rows/s')
+
+        archivePosts(options['months'], options['batch_size'], options['pause'], progress)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Archived {archived} post(s) in {elapsed:.1f}s ({archived / elapsed if elapsed else 0:.0f} rows/s)')
@@ -0,0 +1,132 @@
+import json
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from apps.communities.models import Community
+from apps.posts.models import Post, TimelineEntry
+from apps.posts.timeline import HomeFeedMode, fanOutPost, getHomeFeed
+from apps.profiles.models import Profile
+
+
+def summarize(samples):
+    if not samples:
+        return {}
+    percentiles = statistics.quantiles(samples, n=100, method='inclusive') if len(samples) > 1 else samples * 99
+    return {
+        'count': len(samples),
+        'p50': round(percentiles[49], 3),
+        'p95': round(percentiles[94], 3),
+        'p99': round(percentiles[98], 3),
+        'max': round(max(samples), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = '''
+        Simulates users, communities and posts, then compares PULL and PUSH home feeds: read latency for both and
+        write amplification (timeline rows per post) for PUSH. Everything runs in one transaction that is rolled back.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--communities', type=int, default=500)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--favourites', type=int, default=10, help='Favourite communities per user')
+        parser.add_argument('--follows', type=int, default=10, help='Followed users per user')
+        parser.add_argument('--fan-out-posts', type=int, default=50, help='Posts fanned out for the PUSH measurement')
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        with transaction.atomic():
+            userIds, postIds = self.populate(options)
+            readers = [User(pk=pk) for pk in self.random.sample(userIds, min(options['reads'], len(userIds)))]
+
+            results = {'users': len(userIds), 'posts': len(postIds)}
+            results['pull'] = {'read': self.measureReads(readers, HomeFeedMode.PULL)}
+
+            fanOutTimes = []
+            fanOutRows = []
+            for postId in self.random.sample(postIds, min(options['fan_out_posts'], len(postIds))):
+                started = time.perf_counter()
+                fanOutRows.append(fanOutPost(postId))
+                fanOutTimes.append((time.perf_counter() - started) * 1000)
+            results['push'] = {
+                'fanOutMs': summarize(fanOutTimes),
+                'timelineRowsPerPost': summarize(fanOutRows),
+                'read': self.measureReads(readers, HomeFeedMode.PUSH),
+            }
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measureReads(self, readers, mode):
+        latencies = []
+        queries = []
+        for reader in readers:
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                getHomeFeed(reader, 25, mode=mode)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context))
+        return {'latencyMs': summarize(latencies), 'queries': summarize(queries)}
+
+    def populate(self, options):
+        prefix = f'bench-{int(time.time())}'
+        communities = Community.objects.bulk_create(
+            Community(name=f'{prefix}-{index}'[:32]) for index in range(options['communities'])
+        )
+        # Power-law popularity: a few communities are in almost everyone's favourites.
+        weights = [1 / (rank + 1) ** 1.1 for rank in range(len(communities))]
+
+        users = User.objects.bulk_create(
+            (User(username=f'{prefix}-user-{index}') for index in range(options['users'])), batch_size=5000
+        )
+        userIds = [user.pk for user in users]
+        profiles = Profile.objects.bulk_create((
+            Profile(
+                user_id=userId,
+                favouriteCommunities=list({
+                    community.name for community in self.random.choices(communities, weights, k=options['favourites'])
+                }),
+                mutedCommunities=[],
+            ) for userId in userIds
+        ), batch_size=5000)
+
+        follows = [
+            Profile.followers.through(profile_id=profile.pk, user_id=followerId)
+            for profile in profiles
+            for followerId in set(self.random.sample(userIds, min(options['follows'], len(userIds))))
+        ]
+        Profile.followers.through.objects.bulk_create(follows, batch_size=10000, ignore_conflicts=True)
+        # bulk_create skips the m2m signals that keep the follow counters.
+        followerCounts = Counter(follow.profile_id for follow in follows)
+        followingCounts = Counter(follow.user_id for follow in follows)
+        for profile in profiles:
+            profile.followerCount = followerCounts[profile.pk]
+            profile.followingCount = followingCounts[profile.user_id]
+        Profile.objects.bulk_update(profiles, ['followerCount', 'followingCount'], batch_size=5000)
+
+        posts = Post.objects.bulk_create((
+            Post(
+                community=self.random.choices(communities, weights)[0],
+                creator_id=self.random.choice(userIds),
+                title='benchmark',
+                url='',
+                content='benchmark',
+                likeCount=self.random.randint(0, 500),
+            ) for _ in range(options['posts'])
+        ), batch_size=5000)
+        Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+            score=F('likeCount'), **Post.rankingUpdates(F('likeCount'), F('dislikeCount'))
+        )
+        TimelineEntry.objects.filter(user_id__in=userIds).delete()
+        return userIds, [post.pk for post in posts]
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.utils import refreshPostRankings
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored hot and controversial ranks of every post.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        refreshed = refreshPostRankings(options['batch_size'])
+        self.stdout.write(f'Refreshed {refreshed} post(s)')
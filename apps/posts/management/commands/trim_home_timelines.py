@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.posts.timeline import trimHomeTimelines
+
+
+class Command(BaseCommand):
+    help = 'Deletes home timeline entries beyond HOME_TIMELINE_LENGTH for every user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, default=settings.HOME_TIMELINE_LENGTH)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        trimmed = trimHomeTimelines(options['length'], options['batch_size'])
+        self.stdout.write(f'Trimmed {trimmed} timeline entries')
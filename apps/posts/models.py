@@ -1,5 +1,10 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, FloatField, Q, When
+from django.db.models.functions import Abs, Cast, Extract, Greatest, Least, Log, Power, Sign
+from django.db.models.lookups import GreaterThan
 
 from apps.communities.models import Community, CommunityFlair
 from apps.core.models import TimeStampedModel
@@ -12,12 +17,99 @@ class Post(TimeStampedModel):
         ARCHIVED = 'ARCHIVED'
 
     community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='communityPosts')
+    status = models.CharField(choices=Status.choices, default=Status.PUBLIC, max_length=16)
     title = models.CharField(max_length=512)
     url = models.CharField(max_length=1024)
     content = models.TextField(blank=False)
     creator = models.ForeignKey(User, related_name='postCreator', on_delete=models.CASCADE)
     likes = models.ManyToManyField(User, related_name='postLikes')
     dislikes = models.ManyToManyField(User, related_name='postDislikes')
+    likeCount = models.PositiveIntegerField(default=0)
+    dislikeCount = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0)
+    commentCount = models.PositiveIntegerField(default=0)
+    viewCount = models.PositiveIntegerField(default=0)
+    hotRank = models.FloatField(default=0)
+    controversialRank = models.FloatField(default=0)
     followers = models.ManyToManyField(User, related_name='postFollowers')
+    # Kept in step with followers by apps.profiles.followgraph.
+    followerCount = models.PositiveIntegerField(default=0)
     bookmark = models.ManyToManyField(User, related_name='postBookmarks')
     flair = models.ForeignKey(CommunityFlair, null=True, on_delete=models.SET_NULL, related_name='flairPosts')
+    searchVector = SearchVectorField(null=True, editable=False)
+
+    # Seconds since this instant decide how far a new post starts ahead of older ones in the hot ordering.
+    HOT_EPOCH = 1134028003
+    HOT_DECAY_SECONDS = 45000
+
+    # (field, weight) pairs that make up searchVector.
+    SEARCH_FIELDS = [('title', 'A'), ('content', 'B')]
+
+    class Meta:
+        # Feed indexes only cover PUBLIC posts, so archived and draft posts drop out of them entirely. Queries have to
+        # filter on status='PUBLIC' for the planner to use them.
+        indexes = [
+            models.Index(
+                fields=['community', '-hotRank', '-id'], name='post_community_hot_idx', condition=Q(status='PUBLIC')
+            ),
+            models.Index(
+                fields=['community', '-score', '-id'], name='post_community_top_idx', condition=Q(status='PUBLIC')
+            ),
+            models.Index(
+                fields=['community', '-controversialRank', '-id'],
+                name='post_community_contr_idx',
+                condition=Q(status='PUBLIC'),
+            ),
+            models.Index(
+                fields=['community', '-created', '-id'], name='post_community_new_idx', condition=Q(status='PUBLIC')
+            ),
+            models.Index(fields=['creator', '-created', '-id'], name='post_creator_new_idx'),
+            models.Index(
+                fields=['creator', '-hotRank', '-id'], name='post_creator_hot_idx', condition=Q(status='PUBLIC')
+            ),
+            GinIndex(fields=['searchVector'], name='post_search_idx'),
+        ]
+
+    @classmethod
+    def rankingUpdates(cls, likeCount, dislikeCount):
+        """
+        Expressions for hotRank and controversialRank given the (new) like and dislike counts, so that a vote or a
+        comment refreshes the ranking in the same UPDATE that touches the counters.
+        """
+        score = likeCount - dislikeCount
+        hotRank = ExpressionWrapper(
+            Sign(score) * Log(10, Greatest(Abs(score), 1))
+            + (Extract('created', 'epoch') - cls.HOT_EPOCH) / cls.HOT_DECAY_SECONDS,
+            output_field=FloatField(),
+        )
+        # Many votes split evenly rank highest: magnitude ** balance, zero while either side has no votes.
+        controversialRank = Case(
+            When(
+                GreaterThan(Least(likeCount, dislikeCount), 0),
+                then=Power(
+                    likeCount + dislikeCount,
+                    Cast(Least(likeCount, dislikeCount), FloatField()) / Greatest(likeCount, dislikeCount),
+                ),
+            ),
+            default=0.0,
+            output_field=FloatField(),
+        )
+        return {'hotRank': hotRank, 'controversialRank': controversialRank}
+
+
+class TimelineEntry(models.Model):
+    """
+    One post fanned out into a user's home timeline when HOME_FEED_MODE is PUSH. Entries are ranked by the post's
+    hotRank at fan-out time and trimmed to HOME_TIMELINE_LENGTH per user by trim_home_timelines.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timelineEntries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timelineEntries')
+    hotRank = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='timeline_entry_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-hotRank', '-post'], name='timeline_user_hot_idx'),
+        ]
@@ -0,0 +1,52 @@
+from rest_framework import serializers
+
+from apps.communities.serializers import CommunityFlairSerializerVersion1, CommunitySummarySerializerVersion1
+from apps.core.votestate import attachViewerStates
+from apps.posts.models import Post
+from apps.profiles.serializers import UserSummarySerializerVersion1
+
+
+class PostSerializerVersion1(serializers.ModelSerializer):
+    community = CommunitySummarySerializerVersion1(read_only=True)
+    creator = UserSummarySerializerVersion1(read_only=True)
+    flair = CommunityFlairSerializerVersion1(read_only=True)
+    # Filled by attachViewerStates for an authenticated request, None otherwise.
+    viewerVote = serializers.SerializerMethodField()
+    viewerBookmarked = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = [
+            'id',
+            'community',
+            'status',
+            'title',
+            'url',
+            'content',
+            'creator',
+            'flair',
+            'likeCount',
+            'dislikeCount',
+            'score',
+            'commentCount',
+            'viewCount',
+            'followerCount',
+            'viewerVote',
+            'viewerBookmarked',
+            'created',
+            'edited',
+        ]
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return queryset.select_related('community', 'flair', 'creator__profile')
+
+    @classmethod
+    def attachViewerStates(cls, instances, request=None):
+        return attachViewerStates(Post, instances, request)
+
+    def get_viewerVote(self, instance):
+        return getattr(instance, 'viewerVote', None)
+
+    def get_viewerBookmarked(self, instance):
+        return getattr(instance, 'viewerBookmarked', None)
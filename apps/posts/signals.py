@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.search import refreshSearchVector, searchFieldsChanged
+from apps.core.tasks import enqueue
+from apps.core.votestate import forgetVoteStates
+from apps.posts.models import Post
+from apps.posts.timeline import HomeFeedMode, fanOutPost
+from apps.posts.utils import postCache, refreshPostRanking
+
+
+@receiver(post_save, sender=Post)
+def rankNewPost(sender, instance, created, raw=False, **kwargs):
+    # hotRank depends on the creation time, which only exists once the row has been inserted.
+    if created and not raw:
+        refreshPostRanking(instance.pk)
+        if settings.HOME_FEED_MODE == HomeFeedMode.PUSH:
+            enqueue(fanOutPost, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidatePost(sender, instance, **kwargs):
+    postCache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def indexPost(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and searchFieldsChanged(Post, update_fields):
+        refreshSearchVector(Post, instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.bookmark.through)
+def forgetBookmarkStates(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        userIds = [instance.pk]
+    elif action == 'pre_clear':
+        userIds = list(Post.bookmark.through.objects.filter(post_id=instance.pk).values_list('user_id', flat=True))
+    else:
+        userIds = pk_set
+    transaction.on_commit(lambda: forgetVoteStates(Post, userIds))
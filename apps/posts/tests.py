@@ -1,3 +1,49 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from apps.communities.models import Community
+from apps.core.testing import QueryBudgetMixin
+from apps.posts.models import Post
+from apps.profiles.models import Profile
+
+
+@override_settings(TASK_BACKEND='SYNC', HOME_FEED_MODE='PULL')
+class FeedQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        communities = [Community.objects.create(name=f'budget{index}') for index in range(3)]
+        users = [User.objects.create_user(f'poster{index}') for index in range(5)]
+        for user in users:
+            Profile.objects.create(
+                user=user, favouriteCommunities=[community.name for community in communities], mutedCommunities=[]
+            )
+        cls.user = users[0]
+        cls.community = communities[0]
+        # Posts by different authors in different communities, so a query per post, author or community would show.
+        for index in range(30):
+            Post.objects.create(
+                community=communities[index % len(communities)], creator=users[index % len(users)],
+                title=f'Budget {index}', content='Budget',
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def testCommunityFeedIsWithinQueryBudget(self):
+        url = reverse('posts:community-feed-v1', args=[self.community.name])
+        for sort in ('HOT', 'TOP', 'CONTROVERSIAL', 'NEW'):
+            response = self.assertWithinQueryBudget(f'{url}?sort={sort}', secure=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 10)
+
+    def testHomeFeedIsWithinQueryBudget(self):
+        url = reverse('posts:home-feed-v1')
+        response = self.assertWithinQueryBudget(f'{url}?pageSize=10', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 10)
+
+        response = self.assertWithinQueryBudget(response.json()['next'], secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 10)
@@ -0,0 +1,158 @@
+import logging
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from apps.communities.models import Community
+from apps.communities.permissions import CommunityPermissionResolver
+from apps.core.pagination import keysetFilter, parseOrdering
+from apps.posts.models import Post, TimelineEntry
+from apps.profiles.models import Profile
+
+logger = logging.getLogger(__name__)
+
+
+class HomeFeedMode(models.TextChoices):
+    PULL = 'PULL'
+    PUSH = 'PUSH'
+
+
+HOME_ORDERING = parseOrdering(('-hotRank', '-id'))
+# Timelines are walked by post id rather than entry id so both modes share the same (hotRank, post id) cursor.
+TIMELINE_ORDERING = parseOrdering(('-hotRank', '-post_id'))
+# Upper bound on the number of per-source branches merged by a single pull read. Favourite communities come first,
+# then followed users; sources past the bound are left out of the feed and logged.
+MAX_PULL_SOURCES = 200
+
+
+def _homeSources(user):
+    profile = Profile.objects.filter(user=user).values('favouriteCommunities', 'mutedCommunities').first()
+    if profile is None:
+        return [], [], set()
+    favourites = set(profile['favouriteCommunities']) - set(profile['mutedCommunities'])
+    communities = dict(
+        Community.objects.filter(name__in=favourites | set(profile['mutedCommunities'])).values_list('name', 'pk')
+    )
+    communityIds = [communities[name] for name in favourites if name in communities]
+    mutedIds = {communities[name] for name in profile['mutedCommunities'] if name in communities}
+    followedUserIds = list(Profile.objects.filter(followers=user).values_list('user_id', flat=True))
+    return communityIds, followedUserIds, mutedIds
+
+
+def _hiddenCommunities(user, prefix: str = ''):
+    # Posts from PRIVATE communities are only visible to members who are not banned.
+    return CommunityPermissionResolver(user).hiddenFilter(prefix)
+
+
+def pullHomeFeed(user, limit: int = 25, position: list = None):
+    """
+    Merges the hot-ranked posts of the user's favourite communities and followed users. Every source contributes at
+    most `limit` posts from its own (community, hotRank) or (creator, hotRank) index range, all in one UNION ALL
+    query, and the rows are merged by (hotRank, id).
+    """
+    communityIds, followedUserIds, mutedIds = _homeSources(user)
+    sources = [Q(community_id=communityId) for communityId in communityIds]
+    sources += [Q(creator_id=userId) for userId in followedUserIds]
+    if not sources:
+        return []
+    if len(sources) > MAX_PULL_SOURCES:
+        logger.warning(
+            'Home feed of user %s reads %d of its %d sources', user.pk, MAX_PULL_SOURCES, len(sources)
+        )
+
+    after = keysetFilter(HOME_ORDERING, position) if position else Q()
+    hidden = _hiddenCommunities(user)
+    branches = [
+        Post.objects.filter(source, after, status=Post.Status.PUBLIC).exclude(community_id__in=mutedIds).exclude(
+            hidden
+        ).order_by('-hotRank', '-id')[:limit]
+        for source in sources[:MAX_PULL_SOURCES]
+    ]
+    rows = list(branches[0].union(*branches[1:], all=True)) if len(branches) > 1 else list(branches[0])
+    # UNION ALL does not keep the order of its branches, so the rows are sorted here.
+    rows.sort(key=lambda post: (-post.hotRank, -post.pk))
+
+    feed = []
+    seen = set()
+    for post in rows:
+        if post.pk not in seen:
+            seen.add(post.pk)
+            feed.append(post)
+            if len(feed) == limit:
+                break
+    return feed
+
+
+def pushHomeFeed(user, limit: int = 25, position: list = None):
+    muted = Profile.objects.filter(user=user).values_list('mutedCommunities', flat=True).first() or []
+    entries = TimelineEntry.objects.filter(user=user).exclude(post__community__name__in=muted)
+    entries = entries.exclude(_hiddenCommunities(user, 'post__'))
+    if position:
+        entries = entries.filter(keysetFilter(TIMELINE_ORDERING, position))
+    entries = entries.select_related('post').order_by('-hotRank', '-post_id')[:limit]
+    # Timeline entries keep the rank the post had when it was fanned out; that is what the cursor walks.
+    return [_withRank(entry.post, entry.hotRank) for entry in entries]
+
+
+def _withRank(post, hotRank):
+    post.hotRank = hotRank
+    return post
+
+
+def getHomeFeed(user, limit: int = 25, position: list = None, mode: HomeFeedMode = None):
+    mode = mode or settings.HOME_FEED_MODE
+    if mode == HomeFeedMode.PUSH:
+        return pushHomeFeed(user, limit, position)
+    return pullHomeFeed(user, limit, position)
+
+
+def homeTimelineRecipients(post):
+    """
+    Users whose home timeline receives the post: everyone with the community among their favourites plus the
+    creator's followers, minus anyone who muted the community.
+    """
+    communityName = post.community.name
+    followers = Profile.followers.through.objects.filter(profile__user_id=post.creator_id).values('user_id')
+    return Profile.objects.filter(
+        Q(favouriteCommunities__contains=[communityName]) | Q(user_id__in=followers)
+    ).exclude(mutedCommunities__contains=[communityName]).values_list('user_id', flat=True)
+
+
+def fanOutPost(postId: int, batchSize: int = 1000):
+    """
+    Appends the post to every recipient's timeline in batches and returns the number of rows written. Timelines are
+    trimmed back to HOME_TIMELINE_LENGTH separately by trimHomeTimelines, which keeps this path insert-only.
+    """
+    post = Post.objects.select_related('community').filter(pk=postId, status=Post.Status.PUBLIC).first()
+    if post is None:
+        return 0
+    written = 0
+    batch = []
+    for userId in homeTimelineRecipients(post).iterator(chunk_size=batchSize):
+        batch.append(TimelineEntry(user_id=userId, post_id=post.pk, hotRank=post.hotRank))
+        if len(batch) == batchSize:
+            written += len(TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True))
+            batch = []
+    if batch:
+        written += len(TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True))
+    return written
+
+
+def trimHomeTimelines(length: int = None, batchSize: int = 1000):
+    length = length or settings.HOME_TIMELINE_LENGTH
+    userIds = TimelineEntry.objects.values_list('user_id', flat=True).order_by('user_id').distinct()
+    trimmed = 0
+    lastUserId = 0
+    while True:
+        batch = list(userIds.filter(user_id__gt=lastUserId)[:batchSize])
+        if not batch:
+            return trimmed
+        lastUserId = batch[-1]
+        overflow = TimelineEntry.objects.filter(user_id__in=batch).annotate(
+            position=Window(
+                RowNumber(), partition_by=[F('user_id')], order_by=[F('hotRank').desc(), F('post_id').desc()]
+            )
+        ).filter(position__gt=length).values_list('pk', flat=True)
+        trimmed += TimelineEntry.objects.filter(pk__in=list(overflow)).delete()[0]
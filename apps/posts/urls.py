@@ -1,7 +1,13 @@
+from django.urls import path
+
 from apps.posts.views import *
 
 app_name = 'posts'
 
 urlpatterns = [
-
+    path('v1/home/', HomeFeedApiEventVersion1.as_view(), name='home-feed-v1'),
+    path('v1/community/<str:communityName>/feed/', CommunityFeedApiEventVersion1.as_view(), name='community-feed-v1'),
+    path('v1/post/<int:postId>/', PostDetailApiEventVersion1.as_view(), name='post-detail-v1'),
+    path('v1/post/<int:postId>/vote/', PostVoteApiEventVersion1.as_view(), name='post-vote-v1'),
+    path('v1/user/<str:username>/posts/', UserPostsApiEventVersion1.as_view(), name='user-posts-v1'),
 ]
@@ -0,0 +1,127 @@
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.communities.models import Community
+from apps.core.cache import ObjectCache, invalidateCachedObject
+from apps.posts.models import Post, TimelineEntry
+from apps.posts.serializers import PostSerializerVersion1
+
+
+class FeedSort(models.TextChoices):
+    HOT = 'HOT'
+    TOP = 'TOP'
+    CONTROVERSIAL = 'CONTROVERSIAL'
+    NEW = 'NEW'
+
+
+class TopWindow(models.TextChoices):
+    HOUR = 'HOUR'
+    DAY = 'DAY'
+    WEEK = 'WEEK'
+    MONTH = 'MONTH'
+    YEAR = 'YEAR'
+    ALL = 'ALL'
+
+
+TOP_WINDOW_DELTAS = {
+    TopWindow.HOUR: timedelta(hours=1),
+    TopWindow.DAY: timedelta(days=1),
+    TopWindow.WEEK: timedelta(weeks=1),
+    TopWindow.MONTH: timedelta(days=30),
+    TopWindow.YEAR: timedelta(days=365),
+}
+
+# Each ordering matches one of the (community, rank, id) indexes declared on Post.
+FEED_ORDERINGS = {
+    FeedSort.HOT: ('-hotRank', '-id'),
+    FeedSort.TOP: ('-score', '-id'),
+    FeedSort.CONTROVERSIAL: ('-controversialRank', '-id'),
+    FeedSort.NEW: ('-created', '-id'),
+}
+
+
+def buildPostPayload(postId: int):
+    return PostSerializerVersion1(PostSerializerVersion1.prefetchPlan(Post.objects).get(pk=postId)).data
+
+
+postCache = ObjectCache('post', buildPostPayload, model=Post)
+
+
+def getCommunityFeed(community, sort: FeedSort = FeedSort.HOT, window: TopWindow = TopWindow.ALL):
+    queryset = Post.objects.filter(community=community, status=Post.Status.PUBLIC)
+    if sort == FeedSort.TOP and window != TopWindow.ALL:
+        queryset = queryset.filter(created__gte=timezone.now() - TOP_WINDOW_DELTAS[window])
+    return queryset.order_by(*FEED_ORDERINGS[sort])
+
+
+def refreshPostRanking(postId: int, **counterUpdates):
+    invalidateCachedObject(Post, postId)
+    return Post.objects.filter(pk=postId).update(
+        **counterUpdates,
+        **Post.rankingUpdates(F('likeCount'), F('dislikeCount'))
+    )
+
+
+def refreshPostRankings(batchSize: int = 1000, startPk: int = 0):
+    lastPk = startPk
+    refreshed = 0
+    while True:
+        batch = list(Post.objects.filter(pk__gt=lastPk).order_by('pk').values_list('pk', flat=True)[:batchSize])
+        if not batch:
+            return refreshed
+        lastPk = batch[-1]
+        refreshed += Post.objects.filter(pk__in=batch).update(**Post.rankingUpdates(F('likeCount'), F('dislikeCount')))
+
+
+ARCHIVE_CHECKPOINT_KEY = 'archive-posts:checkpoint'
+
+
+def archiveCommunityPosts(communityId: int, cutoff, batchSize: int = 1000, pause: float = 0, progress=None):
+    """
+    Moves the community's PUBLIC posts created before `cutoff` to ARCHIVED, oldest first, one short UPDATE per
+    batch so no lock is held for long. Archived rows leave the partial feed indexes, so every batch starts again at
+    the oldest remaining candidate and a re-run only finds what is left.
+    """
+    archived = 0
+    candidates = Post.objects.filter(
+        community_id=communityId, status=Post.Status.PUBLIC, created__lt=cutoff
+    ).order_by('created', 'id').values_list('pk', flat=True)
+    while True:
+        batch = list(candidates[:batchSize])
+        if not batch:
+            return archived
+        with transaction.atomic():
+            # Re-checking status keeps the UPDATE idempotent if another worker got there first.
+            count = Post.objects.filter(pk__in=batch, status=Post.Status.PUBLIC).update(status=Post.Status.ARCHIVED)
+            TimelineEntry.objects.filter(post_id__in=batch).delete()
+            for pk in batch:
+                invalidateCachedObject(Post, pk)
+        archived += count
+        if progress:
+            progress(communityId, count)
+        if pause:
+            time.sleep(pause)
+
+
+def archivePosts(months: int, batchSize: int = 1000, pause: float = 0, progress=None):
+    """
+    Archives posts older than `months` in every community with archivePosts set. The last finished community is
+    checkpointed in the cache per cutoff day, so an interrupted run resumes after it.
+    """
+    cutoff = (timezone.now() - timedelta(days=30 * months)).replace(hour=0, minute=0, second=0, microsecond=0)
+    checkpoint = cache.get(ARCHIVE_CHECKPOINT_KEY)
+    lastCommunityId = checkpoint['communityId'] if checkpoint and checkpoint['cutoff'] == cutoff.isoformat() else 0
+
+    archived = 0
+    communityIds = Community.objects.filter(archivePosts=True, pk__gt=lastCommunityId).order_by('pk').values_list(
+        'pk', flat=True
+    )
+    for communityId in communityIds:
+        archived += archiveCommunityPosts(communityId, cutoff, batchSize, pause, progress)
+        cache.set(ARCHIVE_CHECKPOINT_KEY, {'cutoff': cutoff.isoformat(), 'communityId': communityId}, 60 * 60 * 24 * 2)
+    return archived
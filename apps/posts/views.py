@@ -1,3 +1,123 @@
-from django.shortcuts import render
+from django.contrib.auth.models import User
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.communities.models import Community
+from apps.communities.permissions import getPermissionResolver
+from apps.communities.utils import communityCache
+from apps.core.events import recordView, recordVote
+from apps.core.mixins import PrefetchPlanMixin
+from apps.core.pagination import KeysetPagination, decodeCursor, encodeCursor, parsePosition
+from apps.core.ratelimit import ActionRateThrottle, RateLimitAction, checkRateLimit
+from apps.core.serializers import VoteSerializerVersion1
+from apps.core.utils import VoteType
+from apps.core.votestate import getViewerStates
+from apps.posts.models import Post
+from apps.posts.serializers import PostSerializerVersion1
+from apps.posts.timeline import HOME_ORDERING, getHomeFeed
+from apps.posts.utils import FeedSort, TopWindow, getCommunityFeed, postCache
+
+
+class CommunityFeedApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    queryBudget = 8
+    serializer_class = PostSerializerVersion1
+
+    def get_queryset(self):
+        sort = self.request.query_params.get('sort', FeedSort.HOT).upper()
+        window = self.request.query_params.get('window', TopWindow.ALL).upper()
+        if sort not in FeedSort.values:
+            raise ValidationError({'sort': f'Expected one of {", ".join(FeedSort.values)}.'})
+        if window not in TopWindow.values:
+            raise ValidationError({'window': f'Expected one of {", ".join(TopWindow.values)}.'})
+
+        community = get_object_or_404(Community, name=self.kwargs['communityName'])
+        if not getPermissionResolver(self.request).canView(community):
+            raise PermissionDenied()
+        return getCommunityFeed(community, FeedSort(sort), TopWindow(window))
+
+
+class UserPostsApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    queryBudget = 8
+    serializer_class = PostSerializerVersion1
+
+    def get_queryset(self):
+        user = get_object_or_404(User, username=self.kwargs['username'])
+        return Post.objects.filter(creator=user).exclude(status=Post.Status.DRAFT).exclude(
+            getPermissionResolver(self.request).hiddenFilter()
+        ).order_by('-created', '-id')
+
+
+class PostDetailApiEventVersion1(APIView):
+    queryBudget = 11
+
+    def get(self, request, postId):
+        try:
+            payload = postCache.get(postId)
+        except Post.DoesNotExist:
+            raise NotFound()
+        # Drafts only exist for their creator.
+        if payload['status'] == Post.Status.DRAFT and payload['creator']['id'] != request.user.pk:
+            raise NotFound()
+        # The payload only names the community; its type comes from the community cache.
+        community = communityCache.get(payload['community']['id'])
+        if not getPermissionResolver(request).canView(
+            Community(pk=community['id'], communityType=community['communityType'])
+        ):
+            raise PermissionDenied()
+        recordView(Post, postId)
+        # The cached payload is shared by everyone; the viewer's own state is added per request.
+        if request.user.is_authenticated:
+            state = getViewerStates(Post, request.user.pk, [postId])[postId]
+            payload = {**payload, 'viewerVote': state.vote, 'viewerBookmarked': state.bookmarked}
+        return Response(payload)
+
+
+class PostVoteApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ActionRateThrottle]
+    rateLimitAction = RateLimitAction.VOTE
+    queryBudget = 4
+
+    def post(self, request, postId):
+        serializer = VoteSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        vote = VoteType(serializer.validated_data['vote'])
+        post = get_object_or_404(Post.objects.select_related('community'), pk=postId)
+        if not getPermissionResolver(request).canView(post.community):
+            raise PermissionDenied()
+        if post.status == Post.Status.DRAFT:
+            raise NotFound()
+        if post.status == Post.Status.ARCHIVED:
+            raise PermissionDenied('Archived posts can no longer be voted on.')
+        checkRateLimit(request, RateLimitAction.VOTE, post.community)
+        # Votes are buffered and written in batches, see apps.core.events.
+        recordVote(Post, post.pk, request.user.pk, vote)
+        return Response({'vote': vote}, status=status.HTTP_202_ACCEPTED)
+
+
+class HomeFeedApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 10
+
+    def get(self, request):
+        pageSize = KeysetPagination().getPageSize(request)
+        cursor = request.query_params.get('cursor')
+        position = parsePosition(Post, [field for field, _ in HOME_ORDERING], decodeCursor(cursor)[0]) if cursor else None
+
+        posts = getHomeFeed(request.user, pageSize, position)
+        nextLink = None
+        if len(posts) == pageSize:
+            last = posts[-1]
+            nextLink = replace_query_param(
+                request.build_absolute_uri(), 'cursor', encodeCursor([last.hotRank, last.pk])
+            )
+        # The feed is merged from several sources; the page itself is loaded once more with the nested data.
+        planned = PostSerializerVersion1.prefetchPlan(Post.objects.filter(pk__in=[post.pk for post in posts]), request)
+        byId = {post.pk: post for post in planned}
+        page = PostSerializerVersion1.attachViewerStates([byId[post.pk] for post in posts if post.pk in byId], request)
+        return Response({'next': nextLink, 'results': PostSerializerVersion1(page, many=True).data})
@@ -0,0 +1,406 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import traceback
+import zipfile
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q, TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from apps.comments.models import PostComment
+from apps.communities.models import Community, CommunityInvite, CommunityMember, CommunityMemberRequest
+from apps.communities.permissions import invalidateMemberships
+from apps.core.cache import invalidateCachedObject
+from apps.core.tasks import enqueueOn
+from apps.core.utils import VoteType, applyVotes, sourceKey
+from apps.core.votestate import forgetVoteStates
+from apps.posts.models import Post, TimelineEntry
+from apps.profiles.followgraph import POST_FOLLOWS, USER_FOLLOWS, deleteFollows
+from apps.profiles.models import AccountDataJob, Notification, Profile
+from apps.reports.models import ModerationQueueItem, PostReport, UserReport
+from apps.reports.utils import adjustQueueCounts
+
+logger = logging.getLogger(__name__)
+
+Kind = AccountDataJob.Kind
+Status = AccountDataJob.Status
+
+# A worker holds the job for this long without a checkpoint before another may take it over.
+JOB_LOCK_TIMEOUT = 10 * 60
+# The TASK_QUEUES entry jobs run on.
+ACCOUNT_JOB_QUEUE = 'accounts'
+DELETED_TEXT = '[deleted]'
+
+
+class ExportSection:
+    def __init__(self, name: str, queryset, fields):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+
+
+def exportSections(userId: int):
+    """
+    Everything exported for a user, one JSONL file per section. Each section is read in primary key order, which is
+    what lets an export resume after the last row it wrote.
+    """
+    profileFollows = Profile.followers.through.objects
+    return [
+        ExportSection('account', User.objects.filter(pk=userId), [
+            'id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'last_login',
+            'profile__displayName', 'profile__about', 'profile__dateOfBirth', 'profile__favouriteCommunities',
+            'profile__mutedCommunities', 'profile__avatar', 'profile__banner',
+        ]),
+        ExportSection('posts', Post.objects.filter(creator_id=userId), [
+            'id', 'community__name', 'status', 'title', 'url', 'content', 'likeCount', 'dislikeCount',
+            'commentCount', 'viewCount', 'created', 'modified', 'edited',
+        ]),
+        ExportSection('comments', PostComment.objects.filter(creator_id=userId), [
+            'id', 'post_id', 'parent_id', '_comment', 'likeCount', 'dislikeCount', 'isRemoved', 'created',
+            'modified', 'edited',
+        ]),
+        ExportSection('post-likes', Post.likes.through.objects.filter(user_id=userId), ['post_id']),
+        ExportSection('post-dislikes', Post.dislikes.through.objects.filter(user_id=userId), ['post_id']),
+        ExportSection('comment-likes', PostComment.likes.through.objects.filter(user_id=userId), ['postcomment_id']),
+        ExportSection(
+            'comment-dislikes', PostComment.dislikes.through.objects.filter(user_id=userId), ['postcomment_id']
+        ),
+        ExportSection('bookmarks', Post.bookmark.through.objects.filter(user_id=userId), ['post_id']),
+        ExportSection('followed-posts', Post.followers.through.objects.filter(user_id=userId), ['post_id']),
+        ExportSection('memberships', CommunityMember.objects.filter(user_id=userId), [
+            'community__name', 'memberType', 'status', 'created',
+        ]),
+        ExportSection('post-reports', PostReport.objects.filter(reporter_id=userId), [
+            'post_id', 'title', 'details', 'status', 'created',
+        ]),
+        ExportSection('user-reports', UserReport.objects.filter(reporter_id=userId), [
+            'user__username', 'community__name', 'title', 'details', 'status', 'created',
+        ]),
+        ExportSection('following', profileFollows.filter(user_id=userId), ['profile__user__username']),
+        ExportSection('followers', profileFollows.filter(profile__user_id=userId), ['user__username']),
+        ExportSection('notifications', Notification.objects.filter(recipient_id=userId), [
+            'kind', 'actor__username', 'post_id', 'comment_id', 'isRead', 'created',
+        ]),
+    ]
+
+
+def chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def exportDirectory(job: AccountDataJob):
+    return os.path.join(settings.ACCOUNT_EXPORT_DIR, str(job.pk))
+
+
+def archivePath(job: AccountDataJob):
+    return os.path.join(settings.ACCOUNT_EXPORT_DIR, job.archive) if job.archive else None
+
+
+def _checkpoint(job: AccountDataJob, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=[*fields, 'modified'])
+    cache.touch(jobLockKey(job.pk), JOB_LOCK_TIMEOUT)
+
+
+def writeSection(job: AccountDataJob, section: ExportSection, batchSize: int):
+    """
+    Appends the section's rows after job.cursor to its part file, one gzip member per chunk, and checkpoints after
+    every chunk. Concatenated gzip members read back as one stream, so a resumed job first cuts the file back to the
+    last checkpoint, dropping a chunk that was only half written, and then carries on appending.
+    """
+    path = os.path.join(exportDirectory(job), f'{section.name}.jsonl.gz')
+    rows = section.queryset.filter(pk__gt=job.cursor).order_by('pk').values('pk', *section.fields)
+    with open(path, 'ab') as file:
+        file.truncate(job.offset)
+        for chunk in chunked(rows.iterator(chunk_size=batchSize), batchSize):
+            with gzip.GzipFile(fileobj=file, mode='wb') as member:
+                for row in chunk:
+                    lastPk = row.pop('pk')
+                    member.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n')
+            file.flush()
+            os.fsync(file.fileno())
+            _checkpoint(job, cursor=lastPk, offset=file.tell())
+
+
+def packageExport(job: AccountDataJob, sections):
+    # The finished parts are recompressed into one zip, streaming, so no file is ever held in memory whole.
+    name = f'account-export-{job.pk}.zip'
+    temporaryPath = os.path.join(settings.ACCOUNT_EXPORT_DIR, f'{name}.part')
+    with zipfile.ZipFile(temporaryPath, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for section in sections:
+            with gzip.open(os.path.join(exportDirectory(job), f'{section.name}.jsonl.gz'), 'rb') as source, \
+                    archive.open(f'{section.name}.jsonl', 'w', force_zip64=True) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+    os.replace(temporaryPath, os.path.join(settings.ACCOUNT_EXPORT_DIR, name))
+    return name
+
+
+def exportAccountData(job: AccountDataJob, batchSize: int):
+    os.makedirs(exportDirectory(job), exist_ok=True)
+    sections = exportSections(job.user_id)
+    if job.stage != 'package':
+        names = [section.name for section in sections]
+        start = names.index(job.stage) if job.stage in names else 0
+        for section in sections[start:]:
+            if job.stage != section.name:
+                _checkpoint(job, stage=section.name, cursor=0, offset=0)
+            writeSection(job, section, batchSize)
+        _checkpoint(job, stage='package', cursor=0, offset=0)
+    return packageExport(job, sections)
+
+
+def getDeletedUser():
+    # Erased users' posts and comments are credited to this account; usernames with brackets cannot be registered.
+    user, created = User.objects.get_or_create(
+        username=settings.DELETED_USERNAME, defaults={'is_active': False, 'password': make_password(None)}
+    )
+    return user
+
+
+def _deleteBatch(queryset, batchSize: int):
+    pks = list(queryset.order_by().values_list('pk', flat=True)[:batchSize])
+    if pks:
+        queryset.model.objects.filter(pk__in=pks).delete()
+    return len(pks)
+
+
+def _removeVotes(model, userId: int, batchSize: int):
+    # Votes are taken back through applyVotes, so the targets' counters and rankings drop with them.
+    for relation in (model.likes, model.dislikes):
+        source = sourceKey(relation)
+        targetIds = list(relation.through.objects.filter(user_id=userId).values_list(source, flat=True)[:batchSize])
+        if targetIds:
+            applyVotes(model, {(targetId, userId): VoteType.NONE for targetId in targetIds})
+            return len(targetIds)
+    forgetVoteStates(model, [userId])
+    return 0
+
+
+def _anonymise(model, userId: int, batchSize: int, **blanked):
+    pks = list(model.objects.filter(creator_id=userId).order_by().values_list('pk', flat=True)[:batchSize])
+    if pks:
+        model.objects.filter(pk__in=pks).update(creator=getDeletedUser(), searchVector=None, **blanked)
+        for pk in pks:
+            invalidateCachedObject(model, pk)
+    return len(pks)
+
+
+def _clearQueueItems(userId: int, batchSize: int):
+    # Queue items about the user go with them; the per-status counts are adjusted like any other queue change.
+    items = list(ModerationQueueItem.objects.filter(user_id=userId).values_list('pk', 'community_id', 'status')[
+        :batchSize
+    ])
+    if items:
+        with transaction.atomic():
+            ModerationQueueItem.objects.filter(pk__in=[pk for pk, _, _ in items]).delete()
+            byCommunity = {}
+            for _, communityId, status in items:
+                byCommunity.setdefault(communityId, {}).setdefault(status, 0)
+                byCommunity[communityId][status] -= 1
+            for communityId, deltas in byCommunity.items():
+                adjustQueueCounts(communityId, deltas)
+    return len(items)
+
+
+def _referencedElsewhere(path: str, profileId: int):
+    # Variants are stored by content hash, so an identical image uploaded by someone else shares the file.
+    return Profile.objects.exclude(pk=profileId).annotate(
+        variants=Cast('avatarVariants', TextField()), banners=Cast('bannerVariants', TextField())
+    ).filter(Q(variants__contains=path) | Q(banners__contains=path)).exists() or Community.objects.annotate(
+        variants=Cast('logoVariants', TextField()), banners=Cast('bannerVariants', TextField())
+    ).filter(Q(variants__contains=path) | Q(banners__contains=path)).exists()
+
+
+def _deleteProfileImages(profile: Profile):
+    for fieldName, _ in Profile.IMAGE_FIELDS:
+        image = getattr(profile, fieldName)
+        if image:
+            image.delete(save=False)
+        for size, formats in (getattr(profile, f'{fieldName}Variants') or {}).items():
+            if size == 'source':
+                continue
+            for path in formats.values():
+                if not _referencedElsewhere(path, profile.pk):
+                    default_storage.delete(path)
+
+
+def erasureStages(userId: int, batchSize: int):
+    """
+    (stage, step) pairs in the order an erasure runs them. Each step handles at most one batch and returns how many
+    rows it handled, and is called until it returns 0; every step deletes or reassigns what it handled, so running
+    it again after an interruption simply finds what is left. Posts and comments are blanked and reassigned rather
+    than deleted, which keeps other users' replies in place and never starts a cascade over a whole thread.
+    """
+    return [
+        ('post-votes', lambda: _removeVotes(Post, userId, batchSize)),
+        ('comment-votes', lambda: _removeVotes(PostComment, userId, batchSize)),
+        ('bookmarks', lambda: _deleteBatch(Post.bookmark.through.objects.filter(user_id=userId), batchSize)),
+        ('followed-posts', lambda: deleteFollows(POST_FOLLOWS, POST_FOLLOWS.followingRows(userId), batchSize)),
+        ('mentions', lambda: _deleteBatch(PostComment.mentionedUsers.through.objects.filter(user_id=userId),
+                                          batchSize)),
+        ('profile-follows', lambda: deleteFollows(
+            USER_FOLLOWS, Profile.followers.through.objects.filter(Q(user_id=userId) | Q(profile__user_id=userId)),
+            batchSize,
+        )),
+        ('memberships', lambda: _deleteBatch(CommunityMember.objects.filter(user_id=userId), batchSize)),
+        ('invites', lambda: _deleteBatch(
+            CommunityInvite.objects.filter(Q(inviter_id=userId) | Q(invitee_id=userId)), batchSize
+        )),
+        ('member-requests', lambda: _deleteBatch(CommunityMemberRequest.objects.filter(user_id=userId), batchSize)),
+        ('notifications', lambda: _deleteBatch(
+            Notification.objects.filter(Q(recipient_id=userId) | Q(actor_id=userId)), batchSize
+        )),
+        ('timeline', lambda: _deleteBatch(TimelineEntry.objects.filter(user_id=userId), batchSize)),
+        ('post-reports', lambda: _deleteBatch(PostReport.objects.filter(reporter_id=userId), batchSize)),
+        ('user-reports', lambda: _deleteBatch(
+            UserReport.objects.filter(Q(reporter_id=userId) | Q(user_id=userId)), batchSize
+        )),
+        ('queue-items', lambda: _clearQueueItems(userId, batchSize)),
+        ('comments', lambda: _anonymise(PostComment, userId, batchSize, _comment=DELETED_TEXT)),
+        ('posts', lambda: _anonymise(Post, userId, batchSize, title=DELETED_TEXT, content='', url='')),
+    ]
+
+
+def eraseAccount(job: AccountDataJob, batchSize: int):
+    userId = job.user_id
+    # Locked out first: an inactive user's sessions stop authenticating and they cannot log in again.
+    User.objects.filter(pk=userId).update(is_active=False, password=make_password(None))
+    invalidateMemberships(userId)
+
+    stages = erasureStages(userId, batchSize)
+    names = [name for name, _ in stages]
+    start = names.index(job.stage) if job.stage in names else 0
+    for name, step in stages[start:]:
+        if job.stage != name:
+            _checkpoint(job, stage=name, cursor=0, offset=0)
+        while step():
+            cache.touch(jobLockKey(job.pk), JOB_LOCK_TIMEOUT)
+    invalidateMemberships(userId)
+
+    _checkpoint(job, stage='account')
+    profile = Profile.objects.filter(user_id=userId).first()
+    if profile is not None:
+        _deleteProfileImages(profile)
+    for export in AccountDataJob.objects.filter(user_id=userId, kind=Kind.EXPORT).exclude(archive=''):
+        path = archivePath(export)
+        if os.path.exists(path):
+            os.remove(path)
+    # What is left hanging off the user is small by now, so the final cascade is short.
+    with transaction.atomic():
+        Profile.objects.filter(user_id=userId).delete()
+        User.objects.filter(pk=userId).delete()
+
+
+def jobLockKey(jobId: int):
+    return f'account-job:{jobId}'
+
+
+def runAccountDataJob(jobId: int, batchSize: int = None):
+    """
+    Runs or resumes an export or erasure job. A cache lock keeps two workers off the same job; a job whose worker
+    died is picked up again once the lock expires, from its last checkpoint.
+    """
+    batchSize = batchSize or settings.ACCOUNT_JOB_BATCH_SIZE
+    if not cache.add(jobLockKey(jobId), 1, JOB_LOCK_TIMEOUT):
+        return
+    try:
+        job = AccountDataJob.objects.filter(pk=jobId, status__in=AccountDataJob.ACTIVE_STATUSES).first()
+        if job is None or job.user_id is None:
+            return
+        _checkpoint(job, status=Status.RUNNING)
+        try:
+            if job.kind == Kind.EXPORT:
+                archive = exportAccountData(job, batchSize)
+            else:
+                archive = ''
+                eraseAccount(job, batchSize)
+        except Exception:
+            logger.exception('Account data job %s failed in stage %s', jobId, job.stage)
+            _checkpoint(job, status=Status.FAILED, error=traceback.format_exc())
+            return
+        _checkpoint(job, status=Status.DONE, archive=archive, finished=timezone.now())
+        # The parts go only once the job is DONE, so a job resumed from the package stage can always rebuild the zip.
+        if job.kind == Kind.EXPORT:
+            shutil.rmtree(exportDirectory(job), ignore_errors=True)
+    finally:
+        cache.delete(jobLockKey(jobId))
+
+
+def startAccountDataJob(userId: int, kind: AccountDataJob.Kind, queue: bool = True):
+    """
+    The user's active job of this kind, creating one, and queueing it unless `queue` is False, if there is none. Jobs
+    run on their own task queue, so a long export cannot hold up the shared workers.
+    """
+    job = AccountDataJob.objects.filter(user_id=userId, kind=kind, status__in=AccountDataJob.ACTIVE_STATUSES).first()
+    if job is not None:
+        return job
+    try:
+        with transaction.atomic():
+            job = AccountDataJob.objects.create(user_id=userId, kind=kind)
+    except IntegrityError:
+        # Another request started one at the same moment.
+        return AccountDataJob.objects.get(user_id=userId, kind=kind, status__in=AccountDataJob.ACTIVE_STATUSES)
+    if queue and settings.TASK_QUEUES[ACCOUNT_JOB_QUEUE]:
+        enqueueOn(ACCOUNT_JOB_QUEUE, runAccountDataJob, job.pk)
+    return job
+
+
+def expireExports():
+    # Finished archives are only kept for ACCOUNT_EXPORT_TTL_DAYS.
+    cutoff = timezone.now() - timedelta(days=settings.ACCOUNT_EXPORT_TTL_DAYS)
+    expired = AccountDataJob.objects.filter(kind=Kind.EXPORT, status=Status.DONE, finished__lt=cutoff).exclude(
+        archive=''
+    )
+    count = 0
+    for job in expired:
+        path = archivePath(job)
+        if os.path.exists(path):
+            os.remove(path)
+        _checkpoint(job, archive='')
+        count += 1
+    return count
+
+
+def resumeAccountDataJobs(batchSize: int = None, retryFailed: bool = False):
+    """
+    Runs every unfinished job, and starts an erasure for profiles flagged isRequestingDelete that have none, e.g. from
+    cron after a deploy or a crash. With retryFailed, failed jobs run again from their last checkpoint. Returns the
+    number of jobs run.
+    """
+    activeErasure = AccountDataJob.objects.filter(
+        user_id=OuterRef('user_id'), kind=Kind.ERASURE, status__in=AccountDataJob.ACTIVE_STATUSES
+    )
+    for userId in Profile.objects.filter(isRequestingDelete=True).exclude(Exists(activeErasure)).values_list(
+        'user_id', flat=True
+    ):
+        startAccountDataJob(userId, Kind.ERASURE, queue=False)
+
+    if retryFailed:
+        for job in AccountDataJob.objects.filter(status=Status.FAILED, user__isnull=False):
+            try:
+                with transaction.atomic():
+                    _checkpoint(job, status=Status.PENDING, error='')
+            except IntegrityError:
+                # A newer job of the same kind is already under way.
+                pass
+    jobIds = list(AccountDataJob.objects.filter(
+        status__in=AccountDataJob.ACTIVE_STATUSES, user__isnull=False
+    ).order_by('pk').values_list('pk', flat=True))
+    for jobId in jobIds:
+        runAccountDataJob(jobId, batchSize)
+    return len(jobIds)
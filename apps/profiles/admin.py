@@ -1,7 +1,11 @@
 from django.contrib import admin
 
 from apps.profiles.models import (
+    AccountDataJob,
+    Notification,
     Profile
 )
 
+admin.site.register(AccountDataJob)
+admin.site.register(Notification)
 admin.site.register(Profile)
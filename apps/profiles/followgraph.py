@@ -0,0 +1,334 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.core.cache import invalidateCachedObject
+from apps.core.tasks import enqueue
+from apps.posts.models import Post
+from apps.profiles.models import Profile
+
+logger = logging.getLogger(__name__)
+
+# A rebuild that has not finished after this many seconds is assumed dead and may be started again.
+REBUILD_LOCK_TIMEOUT = 60 * 60
+
+
+class FollowGraphBackend(models.TextChoices):
+    DATABASE = 'DATABASE'
+    REDIS = 'REDIS'
+
+
+class FollowRelation:
+    """
+    One follow graph stored in a many-to-many through table. Edges are (follower user id, target id) pairs; the
+    target of a profile follow is the followed profile's user, so both ends of the user graph are user ids.
+    `counters` are the (model, key field, counter field, end) columns an edge adds one to, `end` being 0 for the
+    follower and 1 for the target.
+    """
+
+    def __init__(self, name: str, relation, targetField: str, counters):
+        self.name = name
+        self.through = relation.through
+        self.sourceField = f'{relation.field.m2m_field_name()}_id'
+        self.targetField = targetField
+        self.counters = counters
+
+    def edges(self, queryset):
+        return queryset.values_list('user_id', self.targetField)
+
+    def followerRows(self, targetId: int):
+        return self.through.objects.filter(**{self.targetField: targetId})
+
+    def followingRows(self, userId: int):
+        return self.through.objects.filter(user_id=userId)
+
+
+USER_FOLLOWS = FollowRelation('users', Profile.followers, 'profile__user_id', [
+    (Profile, 'user_id', 'followingCount', 0),
+    (Profile, 'user_id', 'followerCount', 1),
+])
+POST_FOLLOWS = FollowRelation('posts', Post.followers, 'post_id', [
+    (Post, 'pk', 'followerCount', 1),
+])
+FOLLOW_RELATIONS = {relation.through: relation for relation in (USER_FOLLOWS, POST_FOLLOWS)}
+
+
+def removedEdges(relation: FollowRelation, instance, reverse: bool, pk_set, using: str):
+    """
+    The existing edges a remove or clear is about to delete (pk_set is None for clears, which delete all of the
+    instance's), locked so that a concurrent removal of the same follow waits for this one and then finds nothing left
+    to count.
+    """
+    if reverse:
+        rows = relation.through.objects.using(using).filter(user_id=instance.pk)
+        if pk_set is not None:
+            rows = rows.filter(**{f'{relation.sourceField}__in': pk_set})
+    else:
+        rows = relation.through.objects.using(using).filter(**{relation.sourceField: instance.pk})
+        if pk_set is not None:
+            rows = rows.filter(user_id__in=pk_set)
+    return list(relation.edges(rows.select_for_update(of=('self',))))
+
+
+def insertEdges(relation: FollowRelation, instance, reverse: bool, pk_set, using: str):
+    """
+    Inserts the rows an add is about to make and returns the edges that were really new. ON CONFLICT DO NOTHING leaves
+    a follow that a concurrent add inserted first to that add alone, so it is counted once; the manager's own insert
+    then finds every row present.
+    """
+    through = relation.through
+    if reverse:
+        sourceIds, userIds = list(pk_set), [instance.pk] * len(pk_set)
+    else:
+        sourceIds, userIds = [instance.pk] * len(pk_set), list(pk_set)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(through._meta.db_table)} ({quote(relation.sourceField)}, {quote("user_id")}) '
+            f'SELECT * FROM unnest(%s::bigint[], %s::bigint[]) ON CONFLICT DO NOTHING '
+            f'RETURNING {quote(through._meta.pk.column)}',
+            [sourceIds, userIds],
+        )
+        insertedIds = [row[0] for row in cursor.fetchall()]
+    return list(relation.edges(through.objects.using(using).filter(pk__in=insertedIds))) if insertedIds else []
+
+
+def adjustFollowCounts(relation: FollowRelation, edges, sign: int):
+    # One UPDATE per counter and distinct delta, which for follows made one at a time is one per counter.
+    for model, keyField, counterField, end in relation.counters:
+        byDelta = defaultdict(list)
+        for key, count in Counter(edge[end] for edge in edges).items():
+            byDelta[count * sign].append(key)
+        for delta, keys in byDelta.items():
+            rows = model.objects.filter(**{f'{keyField}__in': keys})
+            rows.update(**{counterField: F(counterField) + delta})
+            for pk in (keys if keyField == 'pk' else rows.values_list('pk', flat=True)):
+                invalidateCachedObject(model, pk)
+
+
+def applyEdges(relation: FollowRelation, edges, added: bool):
+    # The follow is committed either way; sets that missed it are repaired by the next rebuild.
+    try:
+        getFollowGraph().applyEdges(relation, edges, added)
+    except Exception:
+        logger.exception('Could not update the %s follow graph, run rebuild_follow_graph', relation.name)
+
+
+def recordFollowChanges(relation: FollowRelation, edges, added: bool):
+    """
+    Applies follows made (or undone) through the many-to-many manager: the counters now, in the same transaction,
+    and the graph's sets once it commits.
+    """
+    if not edges:
+        return
+    adjustFollowCounts(relation, edges, 1 if added else -1)
+    transaction.on_commit(lambda: applyEdges(relation, edges, added))
+
+
+def deleteFollows(relation: FollowRelation, queryset, batchSize: int):
+    # Deletes up to batchSize of the queryset's follows the way unfollowing through the manager would.
+    with transaction.atomic():
+        rows = list(queryset.order_by('pk').select_for_update(of=('self',)).values_list(
+            'pk', 'user_id', relation.targetField
+        )[:batchSize])
+        if rows:
+            relation.through.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            recordFollowChanges(relation, [(userId, targetId) for _, userId, targetId in rows], added=False)
+    return len(rows)
+
+
+class DatabaseFollowGraph:
+    """
+    Answers follow questions from the through tables, one indexed query each. Used without Redis, and by the Redis
+    graph while its sets are missing.
+    """
+
+    def applyEdges(self, relation: FollowRelation, edges, added: bool):
+        pass
+
+    def follows(self, relation: FollowRelation, userId: int, targetIds):
+        # The targets among targetIds that the user follows.
+        return set(relation.followingRows(userId).filter(
+            **{f'{relation.targetField}__in': targetIds}
+        ).values_list(relation.targetField, flat=True))
+
+    def followedBy(self, relation: FollowRelation, targetId: int, userIds):
+        # The users among userIds that follow the target.
+        return set(relation.followerRows(targetId).filter(user_id__in=userIds).values_list('user_id', flat=True))
+
+    def mutualFollows(self, userId: int, userIds=None):
+        # The users that follow userId and that userId follows back, optionally only among userIds.
+        followers = USER_FOLLOWS.followerRows(userId).values('user_id')
+        rows = USER_FOLLOWS.followingRows(userId).filter(profile__user_id__in=followers)
+        if userIds is not None:
+            rows = rows.filter(profile__user_id__in=userIds)
+        return set(rows.values_list('profile__user_id', flat=True))
+
+
+class RedisFollowGraph(DatabaseFollowGraph):
+    """
+    Keeps both directions of every edge as Redis sets, follow:<relation>:followers:<target id> and
+    follow:<relation>:following:<user id>, so membership questions for a whole page are one SMISMEMBER and mutual
+    follows one SINTER. The sets are written after each commit and can be rebuilt from the database at any time;
+    until a rebuild has marked a relation ready, e.g. after the cache was flushed, questions go to the database and
+    the first one starts the rebuild in the background.
+    """
+
+    def __init__(self, location: str):
+        import redis
+
+        self.client = redis.Redis.from_url(location)
+
+    @staticmethod
+    def followersKey(relation: FollowRelation, targetId: int):
+        return f'follow:{relation.name}:followers:{targetId}'
+
+    @staticmethod
+    def followingKey(relation: FollowRelation, userId: int):
+        return f'follow:{relation.name}:following:{userId}'
+
+    @staticmethod
+    def readyKey(relation: FollowRelation):
+        return f'follow:{relation.name}:ready'
+
+    def isReady(self, relation: FollowRelation):
+        if self.client.exists(self.readyKey(relation)):
+            return True
+        if self.client.set(f'follow:{relation.name}:rebuilding', 1, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+            enqueue(self.rebuild, relation)
+        return False
+
+    def applyEdges(self, relation: FollowRelation, edges, added: bool):
+        pipeline = self.client.pipeline(transaction=False)
+        for userId, targetId in edges:
+            if added:
+                pipeline.sadd(self.followersKey(relation, targetId), userId)
+                pipeline.sadd(self.followingKey(relation, userId), targetId)
+            else:
+                pipeline.srem(self.followersKey(relation, targetId), userId)
+                pipeline.srem(self.followingKey(relation, userId), targetId)
+        pipeline.execute()
+
+    def follows(self, relation: FollowRelation, userId: int, targetIds):
+        targetIds = list(targetIds)
+        if not targetIds or not self.isReady(relation):
+            return super().follows(relation, userId, targetIds)
+        found = self.client.smismember(self.followingKey(relation, userId), targetIds)
+        return {targetId for targetId, isMember in zip(targetIds, found) if isMember}
+
+    def followedBy(self, relation: FollowRelation, targetId: int, userIds):
+        userIds = list(userIds)
+        if not userIds or not self.isReady(relation):
+            return super().followedBy(relation, targetId, userIds)
+        found = self.client.smismember(self.followersKey(relation, targetId), userIds)
+        return {userId for userId, isMember in zip(userIds, found) if isMember}
+
+    def mutualFollows(self, userId: int, userIds=None):
+        if not self.isReady(USER_FOLLOWS):
+            return super().mutualFollows(userId, userIds)
+        followers, following = self.followersKey(USER_FOLLOWS, userId), self.followingKey(USER_FOLLOWS, userId)
+        if userIds is None:
+            return {int(member) for member in self.client.sinter(followers, following)}
+        userIds = list(userIds)
+        if not userIds:
+            return set()
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.smismember(followers, userIds)
+        pipeline.smismember(following, userIds)
+        isFollower, isFollowed = pipeline.execute()
+        return {userId for userId, *flags in zip(userIds, isFollower, isFollowed) if all(flags)}
+
+    def rebuild(self, relation: FollowRelation, batchSize: int = 10000):
+        """
+        Drops the relation's sets and refills them from the through table in keyset batches, then marks it ready.
+        Follows committed meanwhile are written to the new sets as usual; an unfollow that lands between the read and
+        the write of the batch holding its edge can survive until the next rebuild.
+        """
+        try:
+            self.client.delete(self.readyKey(relation))
+            keys = []
+            for key in self.client.scan_iter(match=f'follow:{relation.name}:follow*', count=batchSize):
+                keys.append(key)
+                if len(keys) >= batchSize:
+                    self.client.unlink(*keys)
+                    keys = []
+            if keys:
+                self.client.unlink(*keys)
+
+            lastPk = 0
+            while True:
+                batch = list(relation.through.objects.filter(pk__gt=lastPk).order_by('pk').values_list(
+                    'pk', 'user_id', relation.targetField
+                )[:batchSize])
+                if not batch:
+                    break
+                lastPk = batch[-1][0]
+                self.applyEdges(relation, [(userId, targetId) for _, userId, targetId in batch], True)
+            self.client.set(self.readyKey(relation), 1)
+        finally:
+            self.client.delete(f'follow:{relation.name}:rebuilding')
+        return lastPk
+
+
+_graph = None
+_graphLock = threading.Lock()
+
+
+def getFollowGraph():
+    global _graph
+    with _graphLock:
+        if _graph is None:
+            if settings.FOLLOW_GRAPH_BACKEND == FollowGraphBackend.REDIS:
+                if not settings.REDIS_LOCATION:
+                    raise ImproperlyConfigured('FOLLOW_GRAPH_BACKEND REDIS needs REDIS_LOCATION.')
+                _graph = RedisFollowGraph(settings.REDIS_LOCATION)
+            else:
+                _graph = DatabaseFollowGraph()
+        return _graph
+
+
+def recountFollows(batchSize: int = 1000):
+    """
+    Recomputes every follower and following counter from the through tables in keyset batches, e.g. after follows
+    were bulk loaded without signals. Only rows whose counter was wrong are written. Returns the number fixed.
+    """
+    fixed = 0
+    for relation in (USER_FOLLOWS, POST_FOLLOWS):
+        for model, keyField, counterField, end in relation.counters:
+            # Followers are counted on the profile or post row itself, following by the user the profile belongs to.
+            edgeField, outerField = ('user_id', keyField) if end == 0 else (relation.sourceField, 'pk')
+            counts = Coalesce(Subquery(relation.through.objects.filter(
+                **{edgeField: OuterRef(outerField)}
+            ).order_by().values(edgeField).annotate(count=Count('pk')).values('count')), 0)
+            lastPk = 0
+            while True:
+                batch = list(model.objects.filter(pk__gt=lastPk).order_by('pk').values_list('pk', flat=True)[
+                    :batchSize
+                ])
+                if not batch:
+                    break
+                lastPk = batch[-1]
+                wrong = list(model.objects.filter(pk__in=batch).annotate(actual=counts).exclude(
+                    **{counterField: F('actual')}
+                ).values_list('pk', flat=True))
+                if wrong:
+                    model.objects.filter(pk__in=wrong).update(**{counterField: counts})
+                    for pk in wrong:
+                        invalidateCachedObject(model, pk)
+                fixed += len(wrong)
+    return fixed
+
+
+def rebuildFollowGraph(batchSize: int = 10000):
+    # Refills the Redis sets of every relation; nothing to do for the database graph.
+    graph = getFollowGraph()
+    if isinstance(graph, RedisFollowGraph):
+        for relation in FOLLOW_RELATIONS.values():
+            graph.rebuild(relation, batchSize)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.profiles.accountdata import expireExports, resumeAccountDataJobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs unfinished data export and erasure jobs from their last checkpoint, starts erasures for profiles '
+        'flagged isRequestingDelete and removes expired export archives.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--retry-failed', action='store_true', help='Run failed jobs again as well.')
+
+    def handle(self, *args, **options):
+        expired = expireExports()
+        ran = resumeAccountDataJobs(options['batch_size'], options['retry_failed'])
+        self.stdout.write(f'Ran {ran} job(s), removed {expired} expired export(s)')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.profiles.followgraph import rebuildFollowGraph, recountFollows
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the follower and following counters of profiles and posts, and refills the Redis follow sets '
+        'from the database, e.g. after the cache was flushed or follows were bulk loaded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--skip-counts', action='store_true', help='Only refill the Redis sets.')
+
+    def handle(self, *args, **options):
+        if not options['skip_counts']:
+            fixed = recountFollows(options['batch_size'])
+            self.stdout.write(f'Fixed {fixed} follow counter(s)')
+        rebuildFollowGraph(options['batch_size'])
+        self.stdout.write('Rebuilt the follow graph')
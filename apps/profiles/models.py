@@ -1,12 +1,16 @@
 from django.contrib.auth.models import User
-from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
+from apps.core.images import validateImage
 from apps.core.models import TimeStampedModel
 
 
 class Profile(TimeStampedModel):
+    # (image field, variant kind); each image field has a <field>Variants map filled by apps.core.images.
+    IMAGE_FIELDS = [('avatar', 'avatar'), ('banner', 'banner')]
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile', unique=True, db_index=True)
     displayName = models.CharField(max_length=512, blank=True, null=True)
     about = models.TextField(blank=True, null=True)
@@ -14,8 +18,85 @@ class Profile(TimeStampedModel):
     dateOfBirthVisible = models.BooleanField(default=False)
     favouriteCommunities = ArrayField(models.CharField(max_length=8192), blank=True)
     mutedCommunities = ArrayField(models.CharField(max_length=8192), blank=True)
-    avatar = models.ImageField(upload_to='profile-avatar', blank=True, null=True)
-    banner = models.ImageField(upload_to='profile-banner', blank=True, null=True)
+    avatar = models.ImageField(upload_to='profile-avatar', blank=True, null=True, validators=[validateImage])
+    banner = models.ImageField(upload_to='profile-banner', blank=True, null=True, validators=[validateImage])
+    avatarVariants = models.JSONField(default=dict, blank=True, editable=False)
+    bannerVariants = models.JSONField(default=dict, blank=True, editable=False)
     isBanned = models.DateField(blank=True, null=True)
     isRequestingDelete = models.BooleanField(default=False)
     followers = models.ManyToManyField(User, related_name='userFollowers')
+    # Kept in step with followers, on both sides of each follow, by apps.profiles.followgraph.
+    followerCount = models.PositiveIntegerField(default=0)
+    followingCount = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Fan-out looks up everyone who favourited a community with favouriteCommunities @> ARRAY[name].
+            GinIndex(fields=['favouriteCommunities'], name='profile_favourites_gin_idx'),
+        ]
+
+
+class Notification(TimeStampedModel):
+    class Kind(models.TextChoices):
+        MENTION = 'MENTION'
+        POST_REPLY = 'POST_REPLY'
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='actorNotifications')
+    kind = models.CharField(choices=Kind.choices, max_length=16)
+    post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, related_name='postNotifications')
+    comment = models.ForeignKey(
+        'comments.PostComment', null=True, on_delete=models.CASCADE, related_name='commentNotifications'
+    )
+    isRead = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            # A recipient hears about a comment once, even if they are both mentioned and following the post.
+            models.UniqueConstraint(fields=['recipient', 'comment'], name='notification_comment_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', '-created', '-id'], name='notification_inbox_idx'),
+            models.Index(
+                fields=['recipient'], name='notification_unread_idx', condition=models.Q(isRead=False)
+            ),
+        ]
+
+
+class AccountDataJob(TimeStampedModel):
+    """
+    A data export or account erasure, run in the background by apps.profiles.accountdata. The job checkpoints its
+    stage, the last primary key it finished and, for exports, how many bytes of the stage's file are complete, so an
+    interrupted job resumes where it stopped.
+    """
+    class Kind(models.TextChoices):
+        EXPORT = 'EXPORT'
+        ERASURE = 'ERASURE'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING'
+        RUNNING = 'RUNNING'
+        DONE = 'DONE'
+        FAILED = 'FAILED'
+
+    ACTIVE_STATUSES = [Status.PENDING, Status.RUNNING]
+
+    # Kept when the user is erased, so the finished erasure job stays on record.
+    user = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='accountDataJobs')
+    kind = models.CharField(choices=Kind.choices, max_length=16)
+    status = models.CharField(choices=Status.choices, max_length=16, default=Status.PENDING)
+    stage = models.CharField(max_length=32, blank=True, default='')
+    cursor = models.BigIntegerField(default=0)
+    offset = models.BigIntegerField(default=0)
+    archive = models.CharField(max_length=256, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'kind'],
+                condition=models.Q(status__in=['PENDING', 'RUNNING']),
+                name='account_job_active_unique',
+            ),
+        ]
@@ -0,0 +1,146 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import serializers
+
+from apps.core.serializers import ImageVariantsField
+from apps.profiles.followgraph import USER_FOLLOWS, getFollowGraph
+from apps.profiles.models import AccountDataJob, Notification, Profile
+
+
+class UserSummarySerializerVersion1(serializers.ModelSerializer):
+    """
+    A user as shown next to their posts and comments. Needs select_related('<user>__profile') to stay query-free.
+    """
+    displayName = serializers.CharField(source='profile.displayName', read_only=True, default=None)
+    avatar = serializers.ImageField(source='profile.avatar', read_only=True, default=None)
+    avatarVariants = ImageVariantsField(source='profile.avatarVariants', default=None)
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'displayName', 'avatar', 'avatarVariants']
+
+
+class ProfileSerializerVersion1(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    avatarVariants = ImageVariantsField()
+    bannerVariants = ImageVariantsField()
+
+    class Meta:
+        model = Profile
+        fields = [
+            'id',
+            'username',
+            'displayName',
+            'about',
+            'dateOfBirth',
+            'avatar',
+            'avatarVariants',
+            'banner',
+            'bannerVariants',
+            'favouriteCommunities',
+            'followerCount',
+            'followingCount',
+            'created',
+        ]
+        read_only_fields = ['followerCount', 'followingCount']
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return queryset.select_related('user')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not instance.dateOfBirthVisible:
+            data['dateOfBirth'] = None
+        return data
+
+
+class FollowerSerializerVersion1(serializers.ModelSerializer):
+    """
+    One row of a profile's follower list. viewerFollows and followsViewer relate the listed user to the requesting
+    user; both are filled by attachViewerStates for an authenticated request and None otherwise.
+    """
+    user = UserSummarySerializerVersion1(read_only=True)
+    viewerFollows = serializers.SerializerMethodField()
+    followsViewer = serializers.SerializerMethodField()
+    # Where the listed user is found from a follow row.
+    userPath = 'user'
+
+    class Meta:
+        model = Profile.followers.through
+        fields = ['id', 'user', 'viewerFollows', 'followsViewer']
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return queryset.select_related(f'{cls.userPath}__profile')
+
+    @classmethod
+    def attachViewerStates(cls, instances, request=None):
+        # Two bulk lookups in the follow graph for the whole page.
+        instances = list(instances)
+        user = getattr(request, 'user', None)
+        userIds = [cls.listedUserId(instance) for instance in instances]
+        following = followers = None
+        if user and user.is_authenticated:
+            graph = getFollowGraph()
+            following = graph.follows(USER_FOLLOWS, user.pk, userIds)
+            followers = graph.followedBy(USER_FOLLOWS, user.pk, userIds)
+        for instance, userId in zip(instances, userIds):
+            instance.viewerFollows = userId in following if following is not None else None
+            instance.followsViewer = userId in followers if followers is not None else None
+        return instances
+
+    @staticmethod
+    def listedUserId(instance):
+        return instance.user_id
+
+    def get_viewerFollows(self, instance):
+        return getattr(instance, 'viewerFollows', None)
+
+    def get_followsViewer(self, instance):
+        return getattr(instance, 'followsViewer', None)
+
+
+class FollowingSerializerVersion1(FollowerSerializerVersion1):
+    user = UserSummarySerializerVersion1(source='profile.user', read_only=True)
+    userPath = 'profile__user'
+
+    @staticmethod
+    def listedUserId(instance):
+        return instance.profile.user_id
+
+
+class NotificationSerializerVersion1(serializers.ModelSerializer):
+    actor = UserSummarySerializerVersion1(read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'actor', 'post', 'comment', 'isRead', 'created']
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return queryset.select_related('actor__profile')
+
+
+class NotificationReadSerializerVersion1(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=100)
+
+
+class AccountDataJobSerializerVersion1(serializers.ModelSerializer):
+    downloadUrl = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AccountDataJob
+        fields = ['id', 'kind', 'status', 'stage', 'created', 'finished', 'downloadUrl']
+
+    def get_downloadUrl(self, instance):
+        if instance.kind != AccountDataJob.Kind.EXPORT or instance.status != AccountDataJob.Status.DONE or \
+                not instance.archive:
+            return None
+        url = reverse('profiles:account-export-download-v1', args=[instance.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class AccountErasureSerializerVersion1(serializers.Serializer):
+    password = serializers.CharField(write_only=True)
@@ -0,0 +1,35 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.images import queueImageVariants
+from apps.posts.models import Post
+from apps.profiles.followgraph import FOLLOW_RELATIONS, insertEdges, recordFollowChanges, removedEdges
+from apps.profiles.models import Profile
+from apps.profiles.utils import profileCache
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidateProfile(sender, instance, **kwargs):
+    profileCache.invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender=Profile.followers.through)
+@receiver(m2m_changed, sender=Post.followers.through)
+def syncFollowGraph(sender, instance, action, reverse, pk_set, using, **kwargs):
+    # Counters move only by the rows this transaction really wrote: adds insert their rows here and count what the
+    # insert returned, removes lock the rows they are about to delete. Profile cache invalidation follows the edges.
+    relation = FOLLOW_RELATIONS[sender]
+    if action == 'pre_add' and pk_set:
+        instance._addedFollows = insertEdges(relation, instance, reverse, pk_set, using)
+    elif action == 'post_add':
+        recordFollowChanges(relation, instance.__dict__.pop('_addedFollows', []), added=True)
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._removedFollows = removedEdges(relation, instance, reverse, pk_set, using)
+    elif action in ('post_remove', 'post_clear'):
+        recordFollowChanges(relation, instance.__dict__.pop('_removedFollows', []), added=False)
+
+
+@receiver(post_save, sender=Profile)
+def processProfileImages(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        queueImageVariants(instance, update_fields)
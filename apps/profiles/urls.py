@@ -1,7 +1,28 @@
+from django.urls import path
+
 from apps.profiles.views import *
 
 app_name = 'profiles'
 
 urlpatterns = [
-
+    path('v1/profile/<str:username>/', ProfileDetailApiEventVersion1.as_view(), name='profile-detail-v1'),
+    path(
+        'v1/profile/<str:username>/followers/',
+        ProfileFollowersApiEventVersion1.as_view(),
+        name='profile-followers-v1',
+    ),
+    path(
+        'v1/profile/<str:username>/following/',
+        ProfileFollowingApiEventVersion1.as_view(),
+        name='profile-following-v1',
+    ),
+    path('v1/profile/<str:username>/follow/', ProfileFollowApiEventVersion1.as_view(), name='profile-follow-v1'),
+    path('v1/notifications/', NotificationsApiEventVersion1.as_view(), name='notifications-v1'),
+    path('v1/account/exports/', AccountExportsApiEventVersion1.as_view(), name='account-exports-v1'),
+    path(
+        'v1/account/exports/<int:jobId>/download/',
+        AccountExportDownloadApiEventVersion1.as_view(),
+        name='account-export-download-v1',
+    ),
+    path('v1/account/erase/', AccountErasureApiEventVersion1.as_view(), name='account-erase-v1'),
 ]
@@ -0,0 +1,64 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.cache import ObjectCache
+from apps.profiles.models import Notification, Profile
+from apps.profiles.serializers import ProfileSerializerVersion1
+
+
+def buildProfilePayload(profileId: int):
+    return ProfileSerializerVersion1(ProfileSerializerVersion1.prefetchPlan(Profile.objects).get(pk=profileId)).data
+
+
+profileCache = ObjectCache('profile', buildProfilePayload, model=Profile)
+
+
+NOTIFICATION_BATCH_SIZE = 1000
+
+
+def _rateLimitKey(userId: int):
+    return f'notifications:rate:{userId}'
+
+
+def allowNotifications(userIds):
+    """
+    Filters userIds down to the users still under NOTIFICATION_RATE_LIMIT for the current window and counts the
+    notification against them, with one get_many and one increment per allowed user.
+    """
+    keys = {userId: _rateLimitKey(userId) for userId in userIds}
+    counts = cache.get_many(keys.values())
+    allowed = [userId for userId, key in keys.items() if counts.get(key, 0) < settings.NOTIFICATION_RATE_LIMIT]
+    for userId in allowed:
+        key = keys[userId]
+        if not cache.add(key, 1, settings.NOTIFICATION_RATE_WINDOW):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, settings.NOTIFICATION_RATE_WINDOW)
+    return allowed
+
+
+def notifyUsers(postComment, kind: Notification.Kind, userIds):
+    """
+    Creates one notification of `kind` about the comment per user, in batches. Users who already have a notification
+    for the comment are skipped by the unique constraint, and users over their rate limit are dropped.
+    """
+    userIds = iter(userIds)
+    created = 0
+    while batch := list(islice(userIds, NOTIFICATION_BATCH_SIZE)):
+        existing = set(Notification.objects.filter(
+            comment_id=postComment.pk, recipient_id__in=batch
+        ).values_list('recipient_id', flat=True))
+        recipients = allowNotifications([userId for userId in batch if userId not in existing])
+        created += len(Notification.objects.bulk_create([
+            Notification(
+                recipient_id=userId,
+                actor_id=postComment.creator_id,
+                kind=kind,
+                post_id=postComment.post_id,
+                comment_id=postComment.pk,
+            ) for userId in recipients
+        ], ignore_conflicts=True))
+    return created
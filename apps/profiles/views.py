@@ -1,3 +1,134 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.contrib.auth.models import User
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.mixins import PrefetchPlanMixin
+from apps.profiles.accountdata import archivePath, startAccountDataJob
+from apps.profiles.models import AccountDataJob, Notification, Profile
+from apps.profiles.serializers import (
+    AccountDataJobSerializerVersion1,
+    AccountErasureSerializerVersion1,
+    FollowerSerializerVersion1,
+    FollowingSerializerVersion1,
+    NotificationReadSerializerVersion1,
+    NotificationSerializerVersion1,
+)
+from apps.profiles.utils import profileCache
+
+
+class ProfileDetailApiEventVersion1(APIView):
+    queryBudget = 5
+
+    def get(self, request, username):
+        profileId = Profile.objects.filter(user__username=username).values_list('pk', flat=True).first()
+        if profileId is None:
+            raise NotFound()
+        return Response(profileCache.get(profileId))
+
+
+class ProfileFollowersApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    serializer_class = FollowerSerializerVersion1
+    queryBudget = 6
+
+    def get_queryset(self):
+        profile = get_object_or_404(Profile, user__username=self.kwargs['username'])
+        # Newest follows first, one range over the through table's profile_id index.
+        return Profile.followers.through.objects.filter(profile=profile).order_by('-id')
+
+
+class ProfileFollowingApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    serializer_class = FollowingSerializerVersion1
+    queryBudget = 6
+
+    def get_queryset(self):
+        userId = get_object_or_404(User, username=self.kwargs['username']).pk
+        return Profile.followers.through.objects.filter(user_id=userId).order_by('-id')
+
+
+class ProfileFollowApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 10
+
+    def post(self, request, username):
+        profile = get_object_or_404(Profile, user__username=username)
+        if profile.user_id == request.user.pk:
+            raise ValidationError({'username': ['You cannot follow yourself.']})
+        profile.followers.add(request.user)
+        return Response({'following': True})
+
+    def delete(self, request, username):
+        profile = get_object_or_404(Profile, user__username=username)
+        profile.followers.remove(request.user)
+        return Response({'following': False})
+
+
+class NotificationsApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 3
+    serializer_class = NotificationSerializerVersion1
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(recipient=self.request.user)
+        if self.request.query_params.get('unread'):
+            queryset = queryset.filter(isRead=False)
+        return queryset.order_by('-created', '-id')
+
+    def post(self, request):
+        # Marks the given notifications, or all of them, as read in one UPDATE.
+        serializer = NotificationReadSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = Notification.objects.filter(recipient=request.user, isRead=False)
+        if 'ids' in serializer.validated_data:
+            queryset = queryset.filter(pk__in=serializer.validated_data['ids'])
+        return Response({'updated': queryset.update(isRead=True)}, status=status.HTTP_200_OK)
+
+
+class AccountExportsApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 3
+
+    def get(self, request):
+        jobs = AccountDataJob.objects.filter(user=request.user, kind=AccountDataJob.Kind.EXPORT).order_by(
+            '-created', '-id'
+        )[:20]
+        return Response(AccountDataJobSerializerVersion1(jobs, many=True, context={'request': request}).data)
+
+    def post(self, request):
+        # Starts an export, or returns the one already under way; it is built in the background.
+        job = startAccountDataJob(request.user.pk, AccountDataJob.Kind.EXPORT)
+        serializer = AccountDataJobSerializerVersion1(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class AccountExportDownloadApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 3
+
+    def get(self, request, jobId):
+        job = AccountDataJob.objects.filter(
+            pk=jobId, user=request.user, kind=AccountDataJob.Kind.EXPORT, status=AccountDataJob.Status.DONE
+        ).exclude(archive='').first()
+        if job is None or not os.path.exists(archivePath(job)):
+            raise NotFound()
+        return FileResponse(open(archivePath(job), 'rb'), as_attachment=True, filename='account-export.zip')
+
+
+class AccountErasureApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 6
+
+    def post(self, request):
+        serializer = AccountErasureSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not request.user.check_password(serializer.validated_data['password']):
+            raise ValidationError({'password': ['Incorrect password.']})
+        Profile.objects.filter(user=request.user).update(isRequestingDelete=True)
+        job = startAccountDataJob(request.user.pk, AccountDataJob.Kind.ERASURE)
+        return Response(AccountDataJobSerializerVersion1(job).data, status=status.HTTP_202_ACCEPTED)
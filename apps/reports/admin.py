@@ -1,9 +1,13 @@
 from django.contrib import admin
 
 from apps.reports.models import (
+    ModerationQueueCount,
+    ModerationQueueItem,
     PostReport,
     UserReport
 )
 
 admin.site.register(PostReport)
 admin.site.register(UserReport)
+admin.site.register(ModerationQueueItem)
+admin.site.register(ModerationQueueCount)
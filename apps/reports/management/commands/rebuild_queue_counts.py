@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.reports.utils import rebuildQueueCounts
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-status moderation queue counts of every community from the queue items.'
+
+    def handle(self, *args, **options):
+        rebuildQueueCounts()
+        self.stdout.write('Rebuilt moderation queue counts')
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
 
+from apps.communities.models import Community
 from apps.core.models import TimeStampedModel
 from apps.posts.models import Post
 
@@ -31,19 +33,100 @@ class AbstractReport(TimeStampedModel):
         '''
     )
 
+    # A reporter can only have one report per target in these states; repeat reports are folded into it.
+    OPEN_STATUSES = [Status.INITIATED, Status.VERIFIED, Status.PENDING]
+
     class Meta:
         abstract = True
+        indexes = [
+            models.Index(fields=['status', '-created'], name='%(class)s_status_created_idx'),
+        ]
 
 
 class PostReport(AbstractReport):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='postReports')
 
+    class Meta(AbstractReport.Meta):
+        indexes = AbstractReport.Meta.indexes + [
+            models.Index(fields=['post', 'status'], name='postreport_post_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reporter', 'post'],
+                condition=Q(status__in=AbstractReport.OPEN_STATUSES),
+                name='postreport_open_unique',
+            ),
+        ]
+
     def __str__(self):
         return f'Report: {self.post.title} by {self.reporter.username}'
 
 
 class UserReport(AbstractReport):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='userReports')
+    # The community the behaviour happened in; reports without one go to the site admins.
+    community = models.ForeignKey(
+        Community, null=True, blank=True, on_delete=models.CASCADE, related_name='communityUserReports'
+    )
+
+    class Meta(AbstractReport.Meta):
+        indexes = AbstractReport.Meta.indexes + [
+            models.Index(fields=['user', 'status'], name='userreport_user_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reporter', 'user', 'community'],
+                condition=Q(status__in=AbstractReport.OPEN_STATUSES),
+                nulls_distinct=False,
+                name='userreport_open_unique',
+            ),
+        ]
 
     def __str__(self):
         return f'Report: {self.user.username} by {self.reporter.username}'
+
+
+class ModerationQueueItem(models.Model):
+    """
+    One reported post or user in a community's moderation queue, however many reports it received. Moderators work
+    on items; a transition moves the item and its open reports together.
+    """
+    community = models.ForeignKey(Community, null=True, on_delete=models.CASCADE, related_name='moderationQueue')
+    post = models.ForeignKey(Post, null=True, on_delete=models.CASCADE, related_name='moderationQueueItems')
+    user = models.ForeignKey(User, null=True, on_delete=models.CASCADE, related_name='moderationQueueItems')
+    status = models.CharField(choices=AbstractReport.Status.choices, max_length=16, default=AbstractReport.Status.INITIATED)
+    reportCount = models.PositiveIntegerField(default=0)
+    lastReportedAt = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post'], name='queue_item_post_unique'),
+            models.UniqueConstraint(
+                fields=['community', 'user'],
+                condition=Q(user__isnull=False),
+                nulls_distinct=False,
+                name='queue_item_user_unique',
+            ),
+            models.CheckConstraint(
+                check=Q(post__isnull=False, user__isnull=True) | Q(post__isnull=True, user__isnull=False),
+                name='queue_item_single_target',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['community', 'status', '-lastReportedAt', '-id'], name='queue_item_status_idx'),
+        ]
+
+
+class ModerationQueueCount(models.Model):
+    """
+    Number of queue items per status in a community, adjusted in the same transaction as every change so the queue
+    tabs never need a COUNT over the reports.
+    """
+    community = models.ForeignKey(Community, null=True, on_delete=models.CASCADE, related_name='moderationQueueCounts')
+    status = models.CharField(choices=AbstractReport.Status.choices, max_length=16)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['community', 'status'], nulls_distinct=False, name='queue_count_unique'),
+        ]
@@ -0,0 +1,49 @@
+from rest_framework import serializers
+
+from apps.posts.models import Post
+from apps.profiles.serializers import UserSummarySerializerVersion1
+from apps.reports.models import AbstractReport, ModerationQueueItem, PostReport, UserReport
+
+
+class ReportedPostSerializerVersion1(serializers.ModelSerializer):
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'status', 'creator', 'created']
+
+
+class ModerationQueueItemSerializerVersion1(serializers.ModelSerializer):
+    post = ReportedPostSerializerVersion1(read_only=True)
+    user = UserSummarySerializerVersion1(read_only=True)
+
+    class Meta:
+        model = ModerationQueueItem
+        fields = ['id', 'post', 'user', 'status', 'reportCount', 'lastReportedAt']
+
+    @classmethod
+    def prefetchPlan(cls, queryset, request=None):
+        return queryset.select_related('post', 'user__profile')
+
+
+class PostReportSerializerVersion1(serializers.ModelSerializer):
+    class Meta:
+        model = PostReport
+        fields = ['id', 'post', 'title', 'details', 'status', 'created']
+        read_only_fields = ['post', 'status']
+
+
+class UserReportSerializerVersion1(serializers.ModelSerializer):
+    class Meta:
+        model = UserReport
+        fields = ['id', 'user', 'community', 'title', 'details', 'status', 'created']
+        read_only_fields = ['user', 'status']
+
+
+class QueueTransitionSerializerVersion1(serializers.Serializer):
+    items = serializers.ListField(child=serializers.IntegerField(), max_length=500)
+    status = serializers.ChoiceField(choices=[
+        AbstractReport.Status.VERIFIED,
+        AbstractReport.Status.PENDING,
+        AbstractReport.Status.REJECTED,
+        AbstractReport.Status.RESOLVED,
+        AbstractReport.Status.REDACTED,
+    ])
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.reports.models import ModerationQueueItem, PostReport, UserReport
+from apps.reports.utils import forgetQueueItem, recordReport
+
+
+@receiver(post_save, sender=PostReport)
+@receiver(post_save, sender=UserReport)
+def queueReport(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        recordReport(instance)
+
+
+@receiver(post_delete, sender=ModerationQueueItem)
+def uncountQueueItem(sender, instance, **kwargs):
+    # Items also go when their post or user is deleted.
+    forgetQueueItem(instance)
@@ -1,3 +1,39 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from apps.communities.models import Community
+from apps.posts.models import Post
+from apps.reports.models import AbstractReport, PostReport, UserReport
+from apps.reports.utils import getQueueCounts, transitionQueueItems
+
+Status = AbstractReport.Status
+
+
+class ModerationQueueCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.community = Community.objects.create(name='queue')
+        cls.reporter = User.objects.create_user('reporter')
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(community=cls.community, creator=cls.author, title='Queue', content='Queue')
+
+    def report(self):
+        PostReport.objects.create(reporter=self.reporter, post=self.post, title='Spam')
+        UserReport.objects.create(reporter=self.reporter, user=self.author, community=self.community, title='Spam')
+
+    def testDeletingTheTargetRemovesItsItemFromTheCounts(self):
+        self.report()
+        self.assertEqual(getQueueCounts(self.community.pk)[Status.INITIATED], 2)
+        self.post.delete()
+        self.assertEqual(getQueueCounts(self.community.pk)[Status.INITIATED], 1)
+        self.author.delete()
+        self.assertEqual(getQueueCounts(self.community.pk)[Status.INITIATED], 0)
+
+    def testItemsCanBeRedacted(self):
+        self.report()
+        itemIds = list(self.community.moderationQueue.values_list('pk', flat=True))
+        self.assertEqual(sorted(transitionQueueItems(self.community.pk, itemIds, Status.REDACTED)), sorted(itemIds))
+        counts = getQueueCounts(self.community.pk)
+        self.assertEqual((counts[Status.INITIATED], counts[Status.REDACTED]), (0, 2))
+        self.assertEqual(PostReport.objects.get().status, Status.REDACTED)
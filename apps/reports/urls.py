@@ -1,7 +1,21 @@
+from django.urls import path
+
 from apps.reports.views import *
 
 app_name = 'reports'
 
 urlpatterns = [
-
+    path('v1/post/<int:postId>/report/', PostReportApiEventVersion1.as_view(), name='post-report-v1'),
+    path('v1/user/<str:username>/report/', UserReportApiEventVersion1.as_view(), name='user-report-v1'),
+    path('v1/community/<str:communityName>/queue/', ModerationQueueApiEventVersion1.as_view(), name='queue-v1'),
+    path(
+        'v1/community/<str:communityName>/queue/counts/',
+        ModerationQueueCountsApiEventVersion1.as_view(),
+        name='queue-counts-v1',
+    ),
+    path(
+        'v1/community/<str:communityName>/queue/transition/',
+        ModerationQueueTransitionApiEventVersion1.as_view(),
+        name='queue-transition-v1',
+    ),
 ]
@@ -0,0 +1,119 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+
+from apps.reports.models import AbstractReport, ModerationQueueCount, ModerationQueueItem, PostReport, UserReport
+
+Status = AbstractReport.Status
+
+# Target status -> statuses an item may move to it from.
+ALLOWED_TRANSITIONS = {
+    Status.VERIFIED: {Status.INITIATED, Status.PENDING},
+    Status.PENDING: {Status.INITIATED, Status.VERIFIED},
+    Status.REJECTED: {Status.INITIATED, Status.PENDING, Status.VERIFIED},
+    Status.RESOLVED: {Status.VERIFIED},
+    # The reporters withdrew the reports before moderators acted on them.
+    Status.REDACTED: {Status.INITIATED, Status.PENDING},
+}
+CLOSED_STATUSES = {Status.RESOLVED, Status.REJECTED, Status.REDACTED}
+
+
+def adjustQueueCounts(communityId, deltas: dict):
+    deltas = {status: delta for status, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    ModerationQueueCount.objects.bulk_create(
+        [ModerationQueueCount(community_id=communityId, status=status) for status in deltas], ignore_conflicts=True
+    )
+    ModerationQueueCount.objects.filter(community_id=communityId, status__in=deltas).update(
+        count=F('count') + Case(*[When(status=status, then=Value(delta)) for status, delta in deltas.items()],
+                                default=Value(0))
+    )
+
+
+def forgetQueueItem(item):
+    # A deleted item was counted, so its row exists unless the community itself is being deleted along with it.
+    ModerationQueueCount.objects.filter(community_id=item.community_id, status=item.status).update(count=F('count') - 1)
+
+
+def getQueueCounts(communityId):
+    counts = dict(ModerationQueueCount.objects.filter(community_id=communityId).values_list('status', 'count'))
+    return {status: counts.get(status, 0) for status in Status.values}
+
+
+def recordReport(report):
+    """
+    Folds a new report into its target's queue item: creates the item, or bumps reportCount and lastReportedAt and
+    reopens it if moderators had already closed it.
+    """
+    if isinstance(report, PostReport):
+        communityId = report.post.community_id
+        target = {'post_id': report.post_id}
+    else:
+        communityId = report.community_id
+        target = {'user_id': report.user_id}
+
+    with transaction.atomic():
+        item, created = ModerationQueueItem.objects.select_for_update().get_or_create(
+            **target,
+            community_id=communityId,
+            defaults={'reportCount': 1, 'lastReportedAt': report.created},
+        )
+        if created:
+            adjustQueueCounts(communityId, {Status.INITIATED: 1})
+            return item
+
+        reopened = item.status in CLOSED_STATUSES
+        ModerationQueueItem.objects.filter(pk=item.pk).update(
+            reportCount=F('reportCount') + 1,
+            lastReportedAt=report.created,
+            status=Status.INITIATED if reopened else item.status,
+        )
+        if reopened:
+            adjustQueueCounts(communityId, {item.status: -1, Status.INITIATED: 1})
+    return item
+
+
+def transitionQueueItems(communityId, itemIds, status: Status):
+    """
+    Moves the community's items (and their open reports) to `status` in one UPDATE per table. Items whose current
+    status does not allow the transition are left alone. Returns the ids of the items that moved.
+    """
+    sources = ALLOWED_TRANSITIONS[status]
+    with transaction.atomic():
+        rows = list(ModerationQueueItem.objects.select_for_update().filter(
+            community_id=communityId, pk__in=itemIds, status__in=sources
+        ).order_by('pk').values_list('pk', 'status', 'post_id', 'user_id'))
+        if not rows:
+            return []
+        movedIds = [pk for pk, _, _, _ in rows]
+        ModerationQueueItem.objects.filter(pk__in=movedIds).update(status=status)
+
+        postIds = [postId for _, _, postId, _ in rows if postId is not None]
+        userIds = [userId for _, _, _, userId in rows if userId is not None]
+        if postIds:
+            PostReport.objects.filter(post_id__in=postIds, status__in=sources).update(status=status)
+        if userIds:
+            UserReport.objects.filter(user_id__in=userIds, community_id=communityId, status__in=sources).update(
+                status=status
+            )
+
+        deltas = Counter()
+        for _, previous, _, _ in rows:
+            deltas[previous] -= 1
+        deltas[status] += len(rows)
+        adjustQueueCounts(communityId, deltas)
+    return movedIds
+
+
+def rebuildQueueCounts():
+    """
+    Recomputes every ModerationQueueCount from the queue items, e.g. after reports were edited in the admin.
+    """
+    with transaction.atomic():
+        ModerationQueueCount.objects.all().delete()
+        ModerationQueueCount.objects.bulk_create([
+            ModerationQueueCount(community_id=row['community'], status=row['status'], count=row['count'])
+            for row in ModerationQueueItem.objects.values('community', 'status').annotate(count=Count('pk')).order_by()
+        ])
@@ -1,3 +1,103 @@
-from django.shortcuts import render
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.communities.permissions import getModeratedCommunity, getPermissionResolver
+from apps.core.mixins import PrefetchPlanMixin
+from apps.core.ratelimit import ActionRateThrottle, RateLimitAction, checkRateLimit
+from apps.posts.models import Post
+from apps.reports.models import AbstractReport, ModerationQueueItem, PostReport, UserReport
+from apps.reports.serializers import (
+    ModerationQueueItemSerializerVersion1,
+    PostReportSerializerVersion1,
+    QueueTransitionSerializerVersion1,
+    UserReportSerializerVersion1,
+)
+from apps.reports.utils import getQueueCounts, transitionQueueItems
+
+
+def createReport(serializer, model, **target):
+    # A reporter's repeat report on a target that still has an open report returns that report instead.
+    existing = model.objects.filter(**target, status__in=AbstractReport.OPEN_STATUSES).first()
+    if existing is not None:
+        return Response(type(serializer)(existing).data, status=status.HTTP_200_OK)
+    try:
+        with transaction.atomic():
+            report = serializer.save(**target)
+    except IntegrityError:
+        report = model.objects.get(**target, status__in=AbstractReport.OPEN_STATUSES)
+        return Response(type(serializer)(report).data, status=status.HTTP_200_OK)
+    return Response(type(serializer)(report).data, status=status.HTTP_201_CREATED)
+
+
+class PostReportApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ActionRateThrottle]
+    rateLimitAction = RateLimitAction.REPORT
+
+    def post(self, request, postId):
+        post = get_object_or_404(Post.objects.select_related('community'), pk=postId)
+        if not getPermissionResolver(request).canView(post.community):
+            raise PermissionDenied()
+        serializer = PostReportSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checkRateLimit(request, RateLimitAction.REPORT, post.community)
+        return createReport(serializer, PostReport, reporter=request.user, post=post)
+
+
+class UserReportApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ActionRateThrottle]
+    rateLimitAction = RateLimitAction.REPORT
+
+    def post(self, request, username):
+        user = get_object_or_404(User, username=username)
+        serializer = UserReportSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        community = serializer.validated_data.pop('community', None)
+        if community is not None:
+            checkRateLimit(request, RateLimitAction.REPORT, community)
+        return createReport(serializer, UserReport, reporter=request.user, user=user, community=community)
+
+
+class ModerationQueueApiEventVersion1(PrefetchPlanMixin, generics.ListAPIView):
+    serializer_class = ModerationQueueItemSerializerVersion1
+    permission_classes = [IsAuthenticated]
+    queryBudget = 5
+
+    def get_queryset(self):
+        itemStatus = self.request.query_params.get('status', AbstractReport.Status.INITIATED).upper()
+        if itemStatus not in AbstractReport.Status.values:
+            raise ValidationError({'status': f'Expected one of {", ".join(AbstractReport.Status.values)}.'})
+        community = getModeratedCommunity(self.request, self.kwargs['communityName'])
+        # Served by queue_item_status_idx as one index range, newest reports first.
+        return ModerationQueueItem.objects.filter(community=community, status=itemStatus).order_by(
+            '-lastReportedAt', '-id'
+        )
+
+
+class ModerationQueueCountsApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+    queryBudget = 5
+
+    def get(self, request, communityName):
+        community = getModeratedCommunity(request, communityName)
+        return Response(getQueueCounts(community.pk))
+
+
+class ModerationQueueTransitionApiEventVersion1(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, communityName):
+        community = getModeratedCommunity(request, communityName)
+        serializer = QueueTransitionSerializerVersion1(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        moved = transitionQueueItems(
+            community.pk, serializer.validated_data['items'], AbstractReport.Status(serializer.validated_data['status'])
+        )
+        return Response({'moved': moved})
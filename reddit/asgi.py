@@ -12,5 +12,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'reddit.settings')
+# Lets the settings pick ASGI defaults, e.g. no persistent database connections.
+os.environ.setdefault('SERVER_INTERFACE', 'ASGI')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from apps.core.events import EventFlushLifespan  # noqa: E402
+from apps.posts.live import PostLiveApplication  # noqa: E402
+
+# Flushes the vote and view event buffer in the background while the server runs, and serves the posts' live update
+# streams next to the Django application.
+application = EventFlushLifespan(PostLiveApplication(django_application))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
 from decouple import config
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party
     'rest_framework',
@@ -51,11 +53,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,6 +87,13 @@ WSGI_APPLICATION = 'reddit.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Persistent connections are checked before reuse so a dropped one is replaced instead of failing the request. Under
+# ASGI (reddit.asgi sets SERVER_INTERFACE=ASGI) request handling moves between threads and Django cannot reuse or
+# close persistent connections reliably, so they pile up; DATABASE_CONN_MAX_AGE then defaults to 0 and pooling is left
+# to PgBouncer in transaction mode, reached through DATABASE_PORT (e.g. 6432), with
+# DATABASE_DISABLE_SERVER_SIDE_CURSORS=True because a server-side cursor cannot outlive its pooled transaction.
+# WSGI workers keep their connections for 60 seconds.
+SERVER_INTERFACE = config('SERVER_INTERFACE', default='WSGI', cast=str)
 DATABASES = {
     'default': {
         'ENGINE': config('DATABASE_ENGINE', cast=str),
@@ -90,19 +101,181 @@ DATABASES = {
         'USER': config('DATABASE_USER', cast=str),
         'PASSWORD': config('DATABASE_PASSWORD', cast=str),
         'PORT': config('DATABASE_PORT', cast=str),
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=0 if SERVER_INTERFACE == 'ASGI' else 60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': config('DATABASE_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
     }
 }
 
+# Read replicas
+# Each comma separated host becomes a replica<N> alias with the primary's credentials. Safe requests read from a
+# random replica, see apps.core.routers.ReplicaRouter; a user's writes pin their reads to the primary for
+# REPLICA_STICKY_SECONDS, which should exceed the usual replication lag. Tests mirror the replicas onto the primary.
+DATABASE_REPLICA_HOSTS = config(
+    'DATABASE_REPLICA_HOSTS', default='', cast=lambda hosts: [host.strip() for host in hosts.split(',') if host.strip()]
+)
+for index, host in enumerate(DATABASE_REPLICA_HOSTS):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [f'replica{index}' for index in range(len(DATABASE_REPLICA_HOSTS))]
+# Tests always have a replica0 alias, so routing can be tested without replica hosts; it is only read from when a test
+# lists it in DATABASE_REPLICAS.
+if not DATABASE_REPLICA_HOSTS and sys.argv[1:2] == ['test']:
+    DATABASES['replica0'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+
 # Cache
 # https://docs.djangoproject.com/en/5.0/ref/settings/#caches
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': 'redis://:redis-password@localhost:6379',
+# An empty REDIS_LOCATION falls back to a per-process local-memory cache, e.g. for tests without a Redis server.
+REDIS_LOCATION = config('REDIS_LOCATION', default='redis://:redis-password@localhost:6379', cast=str)
+
+if REDIS_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_LOCATION,
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.pagination.KeysetPagination',
+    'PAGE_SIZE': 25,
 }
 
+# Home feed
+# PULL merges the ranked feeds of a user's communities and followed users on every read.
+# PUSH fans every new post out into bounded per-user timelines when it is created.
+HOME_FEED_MODE = config('HOME_FEED_MODE', default='PULL', cast=str)
+HOME_TIMELINE_LENGTH = config('HOME_TIMELINE_LENGTH', default=500, cast=int)
+
+# Posts in communities with archivePosts set are archived this many months after creation by archive_posts.
+ARCHIVE_POSTS_AFTER_MONTHS = config('ARCHIVE_POSTS_AFTER_MONTHS', default=6, cast=int)
+
+# Vote and view events
+# MEMORY buffers events in each process, REDIS buffers them in REDIS_LOCATION so they survive a process restart and
+# SYNC writes every vote straight through. Buffered events are flushed every EVENT_BUFFER_FLUSH_INTERVAL seconds, or
+# as soon as EVENT_BUFFER_MAX_PENDING of them are waiting in a MEMORY buffer. Only the ASGI lifespan flushes on a timer;
+# under WSGI an idle worker would hold its MEMORY buffer until it exits, so SYNC is the default there.
+EVENT_BUFFER_BACKEND = config(
+    'EVENT_BUFFER_BACKEND', default='MEMORY' if SERVER_INTERFACE == 'ASGI' else 'SYNC', cast=str
+)
+EVENT_BUFFER_FLUSH_INTERVAL = config('EVENT_BUFFER_FLUSH_INTERVAL', default=1.0, cast=float)
+EVENT_BUFFER_MAX_PENDING = config('EVENT_BUFFER_MAX_PENDING', default=5000, cast=int)
+
+# Background tasks
+# THREAD runs tasks on TASK_WORKERS in-process threads after the request's transaction commits; SYNC runs them inline.
+# Long tasks go to a queue of their own, TASK_QUEUES mapping its name to its number of threads: account data exports
+# and erasures run one at a time per process on 'accounts' (ACCOUNT_JOB_WORKERS, 0 leaves them to
+# process_account_jobs).
+TASK_BACKEND = config('TASK_BACKEND', default='THREAD', cast=str)
+TASK_WORKERS = config('TASK_WORKERS', default=2, cast=int)
+TASK_QUEUES = {
+    'accounts': config('ACCOUNT_JOB_WORKERS', default=1, cast=int),
+}
+
+# Live updates
+# /posts/v1/post/<id>/live/ streams new comments and vote changes as server-sent events, served by reddit.asgi only.
+# MEMORY delivers them within one process, REDIS through Redis pub/sub to every process. A subscriber more than
+# LIVE_QUEUE_SIZE comments or scored targets behind is sent a reset and disconnected; silent streams get a heartbeat
+# every LIVE_HEARTBEAT_SECONDS.
+LIVE_UPDATES_ENABLED = config('LIVE_UPDATES_ENABLED', default=True, cast=bool)
+LIVE_BROKER_BACKEND = config('LIVE_BROKER_BACKEND', default='MEMORY', cast=str)
+LIVE_QUEUE_SIZE = config('LIVE_QUEUE_SIZE', default=100, cast=int)
+LIVE_HEARTBEAT_SECONDS = config('LIVE_HEARTBEAT_SECONDS', default=15, cast=int)
+LIVE_MAX_SUBSCRIBERS = config('LIVE_MAX_SUBSCRIBERS', default=10000, cast=int)
+
+# Notifications
+# Only the first MAX_MENTIONS_PER_COMMENT u/name mentions of a comment are resolved and notified.
+MAX_MENTIONS_PER_COMMENT = config('MAX_MENTIONS_PER_COMMENT', default=20, cast=int)
+# A user receives at most NOTIFICATION_RATE_LIMIT notifications per NOTIFICATION_RATE_WINDOW seconds.
+NOTIFICATION_RATE_LIMIT = config('NOTIFICATION_RATE_LIMIT', default=50, cast=int)
+NOTIFICATION_RATE_WINDOW = config('NOTIFICATION_RATE_WINDOW', default=3600, cast=int)
+
+# Follow graph
+# REDIS mirrors Profile.followers and Post.followers as Redis sets in REDIS_LOCATION, so "does A follow B" for a whole
+# page and mutual follows are single set operations; DATABASE answers from the through tables. After a cache flush
+# the Redis graph answers from the database until rebuild_follow_graph (or the first question) has refilled the sets.
+FOLLOW_GRAPH_BACKEND = config('FOLLOW_GRAPH_BACKEND', default='REDIS' if REDIS_LOCATION else 'DATABASE', cast=str)
+
+# Account data
+# Data exports are assembled in ACCOUNT_EXPORT_DIR, outside MEDIA_ROOT because only their owner may download them, and
+# removed ACCOUNT_EXPORT_TTL_DAYS after they finish. Erasure blanks the user's posts and comments and credits them to
+# the DELETED_USERNAME account, so replies keep their thread. Both kinds of job work in ACCOUNT_JOB_BATCH_SIZE chunks.
+ACCOUNT_EXPORT_DIR = config('ACCOUNT_EXPORT_DIR', default=os.path.join(BASE_DIR, 'exports'), cast=str)
+ACCOUNT_EXPORT_TTL_DAYS = config('ACCOUNT_EXPORT_TTL_DAYS', default=7, cast=int)
+ACCOUNT_JOB_BATCH_SIZE = config('ACCOUNT_JOB_BATCH_SIZE', default=1000, cast=int)
+DELETED_USERNAME = '[deleted]'
+
+# Images
+# Uploads are checked from their header only; variants are built in the background at IMAGE_VARIANT_SIZES widths
+# (square crops for avatars and logos) and stored under content-hash names in MEDIA_ROOT/variants/, which never change
+# and can be served with a far-future Cache-Control.
+IMAGE_MAX_UPLOAD_BYTES = config('IMAGE_MAX_UPLOAD_BYTES', default=10 * 1024 * 1024, cast=int)
+IMAGE_MAX_PIXELS = config('IMAGE_MAX_PIXELS', default=40_000_000, cast=int)
+IMAGE_VARIANT_SIZES = {
+    'avatar': [64, 256],
+    'logo': [64, 256],
+    'banner': [640, 1280, 1920],
+}
+IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+IMAGE_VARIANT_QUALITY = config('IMAGE_VARIANT_QUALITY', default=80, cast=int)
+
+# Rate limits
+# 'count/period' per action (period s, m, h or d). Each limit applies per user across the site and, where a community
+# is involved, again per user within that community. RATE_LIMIT_COMMUNITY_OVERRIDES replaces the per-community rate
+# by community name, e.g. {'announcements': {'comment': '5/h'}}.
+RATE_LIMITS_ENABLED = config('RATE_LIMITS_ENABLED', default=True, cast=bool)
+RATE_LIMITS = {
+    'post': '10/h',
+    'comment': '60/h',
+    'vote': '600/h',
+    'report': '20/h',
+    'invite': '50/d',
+    'community': '3/d',
+}
+RATE_LIMIT_COMMUNITY_OVERRIDES = {}
+# Stricter limits: the allowance is multiplied by every factor that applies to the request.
+RATE_LIMIT_NEW_ACCOUNT_DAYS = config('RATE_LIMIT_NEW_ACCOUNT_DAYS', default=7, cast=int)
+RATE_LIMIT_FACTORS = {
+    'NEW_ACCOUNT': 0.5,
+    'RESTRICTED_COMMUNITY': 0.5,
+    'MUTED_MEMBER': 0.1,
+}
+
+# Related communities
+# compute_related_communities keeps the RELATED_COMMUNITIES_TOP_K communities whose members, favouriters and recent
+# commenters (within RELATED_COMMUNITIES_COMMENT_DAYS) overlap most. Similarity is estimated from MinHash signatures of
+# RELATED_COMMUNITIES_HASHES values; pairs are only compared when a band of RELATED_COMMUNITIES_BAND_ROWS values
+# matches. One row compares every pair sharing any minimum; wider bands compare fewer pairs but tend to miss those
+# below roughly (rows / hashes) ** (1 / rows) similarity, which overlaps with large communities rarely exceed.
+RELATED_COMMUNITIES_TOP_K = config('RELATED_COMMUNITIES_TOP_K', default=10, cast=int)
+RELATED_COMMUNITIES_HASHES = config('RELATED_COMMUNITIES_HASHES', default=128, cast=int)
+RELATED_COMMUNITIES_BAND_ROWS = config('RELATED_COMMUNITIES_BAND_ROWS', default=1, cast=int)
+RELATED_COMMUNITIES_MIN_SCORE = config('RELATED_COMMUNITIES_MIN_SCORE', default=0.02, cast=float)
+RELATED_COMMUNITIES_COMMENT_DAYS = config('RELATED_COMMUNITIES_COMMENT_DAYS', default=90, cast=int)
+
+# Community moderation
+# Bulk approvals, rejections and the mute sweeper work through COMMUNITY_MODERATION_BATCH_SIZE rows per transaction.
+# Mutes last COMMUNITY_MUTE_DAYS unless the moderator gives another duration; expire_mutes lifts them afterwards.
+COMMUNITY_MODERATION_BATCH_SIZE = config('COMMUNITY_MODERATION_BATCH_SIZE', default=1000, cast=int)
+COMMUNITY_MUTE_DAYS = config('COMMUNITY_MUTE_DAYS', default=7, cast=int)
+
+# Query metrics
+# Per-endpoint query count and latency histograms, see apps.core.middleware.QueryMetricsMiddleware.
+QUERY_METRICS_ENABLED = config('QUERY_METRICS_ENABLED', default=True, cast=bool)
+# A statement repeated this many times within one request is reported as a likely N+1.
+QUERY_DUPLICATE_THRESHOLD = config('QUERY_DUPLICATE_THRESHOLD', default=3, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 